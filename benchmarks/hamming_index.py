@@ -0,0 +1,145 @@
+"""
+Compare the search of similar images of the original script (every pair of hashes compared with
+`ImageHash.__sub__`) with the multi-index Hamming search (`find_similar_pairs` and `group_similar_pairs`).
+
+The hashes are random, and 30% of them are copies of a previous one with up to 13 bits changed. The pairs found by
+the index are checked against a brute-force search before timing it.
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.hamming_index --sizes 100 1000 4000
+"""
+
+import argparse
+import time
+
+import numpy as np
+from imagehash import ImageHash
+
+from src.features.duplicates_remover.duplicates_remover import (
+    find_similar_pairs,
+    get_max_distance,
+    group_similar_pairs,
+)
+from src.features.duplicates_remover.hamming_index import pack_hash
+
+
+def make_hashes(n: int, hash_size: int, rng: np.random.Generator):
+    hashes: list[ImageHash] = []
+    originals: list[np.ndarray] = []
+
+    for _ in range(n):
+        if originals and rng.random() < 0.3:
+            bits = originals[rng.integers(len(originals))].copy()
+            bits.flat[rng.integers(0, hash_size**2, rng.integers(0, 14))] ^= True
+        else:
+            bits = rng.random((hash_size, hash_size)) < 0.5
+            originals.append(bits)
+
+        hashes.append(ImageHash(bits))
+
+    return hashes
+
+
+def original_search(
+    files_and_hashes: list[tuple[str, ImageHash]], hash_size: int, similarity: int
+):
+    """The loop of the original script, without its output"""
+
+    duplicates_imgs = []
+
+    threshold = 1 - similarity / 100
+    diff_limit = int(threshold * (hash_size**2))
+
+    for i, file1 in enumerate(files_and_hashes):
+        duplicates: list[str] = []
+        _similarity: float
+
+        for file2 in files_and_hashes[i:]:
+            if file1[0] != file2[0]:
+                if file1[1] - file2[1] < diff_limit:
+                    if len(duplicates) == 0:
+                        duplicates.append(file1[0])
+
+                    duplicates.append(file2[0])
+                    _similarity = round(100 * ((file1[1] - file2[1]) / hash_size**2), 2)
+
+        already_found = False
+        for founded in duplicates_imgs:
+            if set(duplicates) <= set(founded[0]):
+                already_found = True
+
+        if len(duplicates) > 0 and not already_found:
+            duplicates_imgs.append((duplicates, _similarity))
+
+    return duplicates_imgs
+
+
+def index_search(paths: list[str], packed: np.ndarray, hash_size: int, similarity: int):
+    return group_similar_pairs(
+        paths, find_similar_pairs(packed, hash_size, similarity), hash_size**2
+    )
+
+
+def brute_force_pairs(packed: np.ndarray, max_distance: int):
+    pairs: set[tuple[int, int]] = set()
+
+    for i in range(len(packed) - 1):
+        xor = packed[i] ^ packed[i + 1 :]
+        distances = np.unpackbits(xor.view(np.uint8), axis=1).sum(axis=1)
+
+        pairs.update(
+            (i, i + 1 + j) for j in np.flatnonzero(distances <= max_distance).tolist()
+        )
+
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 4000])
+    parser.add_argument("--hash_size", type=int, default=16)
+    parser.add_argument("--similarity", type=int, default=96)
+    parser.add_argument(
+        "--max_original",
+        type=int,
+        default=4000,
+        help="Largest number of images timed with the original loop (it is quadratic)",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    for n in args.sizes:
+        hashes = make_hashes(n, args.hash_size, rng)
+        paths = [f"/photos/{i}.jpg" for i in range(n)]
+        packed = np.stack([pack_hash(img_hash) for img_hash in hashes])
+
+        found = {
+            (i, j)
+            for i, j, _ in find_similar_pairs(packed, args.hash_size, args.similarity)
+        }
+        expected = brute_force_pairs(
+            packed, get_max_distance(args.hash_size, args.similarity)
+        )
+        assert found == expected, f"the index misses or adds pairs (n={n})"
+
+        start = time.perf_counter()
+        index_search(paths, packed, args.hash_size, args.similarity)
+        index_seconds = time.perf_counter() - start
+
+        if n <= args.max_original:
+            start = time.perf_counter()
+            original_search(list(zip(paths, hashes)), args.hash_size, args.similarity)
+            original_time = f"{time.perf_counter() - start:9.3f}s"
+        else:
+            original_time = f"{'-':>10}"
+
+        print(
+            f"n={n:<7d} pairs={len(found):<7d} original loop {original_time}   index {index_seconds:9.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Compare the precision and recall of a single hash with the ones of the two-stage cascade (`--confirm_hash`), on a
+synthetic corpus where the true duplicates are known.
+
+The corpus has families of different low-contrast photos that share the same layout (like burst shots of a sky),
+which a loose hash confuses, and duplicates of some photos (resized, recompressed, brightened or cropped). It is
+generated once in `--work_dir`. Precision and recall are measured over the pairs of images grouped together.
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.hash_cascade
+"""
+
+import argparse
+import glob
+import itertools
+import os
+import random
+import tempfile
+import time
+from typing import Callable
+
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter
+
+from src.features.duplicates_remover.duplicates_remover import (
+    HashAlgorithm,
+    confirm_pairs,
+    find_similar_pairs,
+    group_similar_pairs,
+    hash_images,
+)
+
+
+def make_corpus(work_dir: str, seed: int):
+    """
+    Write the corpus, if it is not already in `work_dir`. Each photo is named `f<family>m<photo>_<version>.jpg`, so
+    two images are duplicates if they share the prefix `f<family>m<photo>`.
+    """
+
+    paths = sorted(glob.glob(os.path.join(work_dir, "*.jpg")))
+
+    if paths:
+        return paths
+
+    os.makedirs(work_dir, exist_ok=True)
+    rng = random.Random(seed)
+
+    for family in range(100):
+        base = rng.randint(90, 150)
+
+        layout = Image.new("RGB", (1200, 900), (base, base, base))
+        draw = ImageDraw.Draw(layout)
+
+        for _ in range(4):
+            x, y = rng.randint(0, 900), rng.randint(0, 600)
+            color = base + rng.randint(-20, 20)
+            draw.ellipse(
+                [x, y, x + rng.randint(300, 700), y + rng.randint(300, 700)],
+                fill=(color, color, color),
+            )
+
+        for photo in range(3):
+            img = layout.copy()
+            draw = ImageDraw.Draw(img)
+
+            for _ in range(25):
+                x, y = rng.randint(0, 1150), rng.randint(0, 850)
+                color = base + rng.randint(-30, 30)
+                draw.rectangle(
+                    [x, y, x + rng.randint(20, 120), y + rng.randint(20, 120)],
+                    fill=(color, color, color),
+                )
+
+            img = img.filter(ImageFilter.GaussianBlur(3))
+            name = f"f{family:03d}m{photo}"
+            img.save(os.path.join(work_dir, f"{name}_0.jpg"), quality=92)
+
+            for version in range(rng.randint(0, 1)):
+                change = rng.choice(["resize", "quality", "brightness", "crop"])
+                quality = 85
+                duplicate = img
+
+                if change == "resize":
+                    duplicate = img.resize((600, 450))
+                elif change == "quality":
+                    quality = 45
+                elif change == "brightness":
+                    duplicate = ImageEnhance.Brightness(img).enhance(1.08)
+                else:
+                    duplicate = img.crop((20, 15, 1180, 885))
+
+                duplicate.save(
+                    os.path.join(work_dir, f"{name}_{version + 1}.jpg"),
+                    quality=quality,
+                )
+
+    return sorted(glob.glob(os.path.join(work_dir, "*.jpg")))
+
+
+def single_hash(
+    paths: list[str], algorithm: HashAlgorithm, hash_size: int, similarity: int
+):
+    hashed_paths, hashes = hash_images(
+        paths, hash_size=hash_size, algorithm=algorithm, workers=1, hash_cache=None
+    )
+
+    return group_similar_pairs(
+        hashed_paths,
+        find_similar_pairs(hashes, hash_size, similarity),
+        hash_size**2,
+    )
+
+
+def cascade(
+    paths: list[str],
+    algorithm: HashAlgorithm,
+    hash_size: int,
+    prefilter_similarity: int,
+    confirm_hash: HashAlgorithm,
+    confirm_hash_size: int,
+    similarity: int,
+):
+    hashed_paths, hashes = hash_images(
+        paths, hash_size=hash_size, algorithm=algorithm, workers=1, hash_cache=None
+    )
+
+    pairs = confirm_pairs(
+        hashed_paths,
+        list(find_similar_pairs(hashes, hash_size, prefilter_similarity)),
+        hash_size=confirm_hash_size,
+        algorithm=confirm_hash,
+        similarity=similarity,
+        workers=1,
+        hash_cache=None,
+    )
+
+    return group_similar_pairs(hashed_paths, pairs, confirm_hash_size**2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--work_dir",
+        type=str,
+        default=os.path.join(tempfile.gettempdir(), "pygallery-benchmark-cascade"),
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    paths = make_corpus(args.work_dir, args.seed)
+
+    def photo_of(path: str):
+        return os.path.basename(path).split("_")[0]
+
+    true_pairs = {
+        frozenset(pair)
+        for pair in itertools.combinations(paths, 2)
+        if photo_of(pair[0]) == photo_of(pair[1])
+    }
+
+    print(f"{len(paths)} images, {len(true_pairs)} pairs of duplicates")
+
+    searches: list[tuple[str, Callable[[], list]]] = [
+        ("ahash 16 @96 (default)", lambda: single_hash(paths, "ahash", 16, 96)),
+        ("ahash 16 @90", lambda: single_hash(paths, "ahash", 16, 90)),
+        ("ahash 32 @96", lambda: single_hash(paths, "ahash", 32, 96)),
+        (
+            "dhash 8 @85 -> phash 16 @90",
+            lambda: cascade(paths, "dhash", 8, 85, "phash", 16, 90),
+        ),
+        (
+            "ahash 8 @85 -> phash 16 @90",
+            lambda: cascade(paths, "ahash", 8, 85, "phash", 16, 90),
+        ),
+    ]
+
+    for name, search in searches:
+        start = time.perf_counter()
+        groups = search()
+        seconds = time.perf_counter() - start
+
+        found_pairs = {
+            frozenset(pair)
+            for images, _, _ in groups
+            for pair in itertools.combinations(images, 2)
+        }
+        true_positives = len(found_pairs & true_pairs)
+
+        precision = true_positives / len(found_pairs) if found_pairs else 1.0
+        recall = true_positives / len(true_pairs)
+
+        print(
+            f"{name:32s} precision {precision:.3f}   recall {recall:.3f}   {seconds:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
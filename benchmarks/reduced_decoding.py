@@ -0,0 +1,142 @@
+"""
+Compare the time to hash JPEG images decoded at full resolution with the time to hash them decoded at reduced scale
+(`get_image_hash`, which asks the decoder for a downscaled grayscale image), and the distance between both hashes.
+The benchmark fails if any distance is above `--tolerance` (a percentage of the bits of the hash).
+
+By default the images are synthetic 24MP JPEGs, generated once in `--work_dir`. Use `--input_path` to measure a
+folder of real photos instead.
+
+Usage (from the root of the repository):
+
+    python -m benchmarks.reduced_decoding
+    python -m benchmarks.reduced_decoding --input_path "/path/to/photos"
+"""
+
+import argparse
+import glob
+import os
+import random
+import tempfile
+import time
+
+from imagehash import average_hash
+from PIL import Image, ImageDraw
+
+from src.features.duplicates_remover.duplicates_remover import get_image_hash
+
+
+def make_images(work_dir: str, n: int, width: int, height: int, seed: int):
+    """Write `n` JPEGs of random ellipses, if they are not already in `work_dir`"""
+
+    os.makedirs(work_dir, exist_ok=True)
+    rng = random.Random(seed)
+
+    paths = [os.path.join(work_dir, f"{i:03d}-{width}x{height}.jpg") for i in range(n)]
+
+    for path in paths:
+        if os.path.isfile(path):
+            continue
+
+        img = Image.new(
+            "RGB", (width, height), tuple(rng.randint(0, 255) for _ in range(3))
+        )
+        draw = ImageDraw.Draw(img)
+
+        for _ in range(60):
+            x, y = rng.randint(0, width), rng.randint(0, height)
+            draw.ellipse(
+                [
+                    x,
+                    y,
+                    x + rng.randint(100, width // 3),
+                    y + rng.randint(100, height // 2),
+                ],
+                fill=tuple(rng.randint(0, 255) for _ in range(3)),
+            )
+
+        img.save(path, quality=90)
+
+    return paths
+
+
+def full_decode_hash(path: str, hash_size: int):
+    with Image.open(path) as img:
+        return average_hash(img, hash_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--input_path",
+        type=str,
+        default=None,
+        help="Folder of JPEG images to measure, instead of the synthetic ones",
+    )
+    parser.add_argument(
+        "--work_dir",
+        type=str,
+        default=os.path.join(tempfile.gettempdir(), "pygallery-benchmark-jpegs"),
+    )
+    parser.add_argument("--images", type=int, default=12)
+    parser.add_argument("--width", type=int, default=6000)
+    parser.add_argument("--height", type=int, default=4000)
+    parser.add_argument("--hash_sizes", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=2,
+        help="Maximum distance between the full and reduced-scale hashes of an image, as a percentage of the bits",
+    )
+    args = parser.parse_args()
+
+    if args.input_path:
+        paths = sorted(
+            path
+            for pattern in ("*.jpg", "*.jpeg", "*.JPG", "*.JPEG")
+            for path in glob.glob(os.path.join(args.input_path, pattern))
+        )
+    else:
+        paths = make_images(
+            args.work_dir, args.images, args.width, args.height, args.seed
+        )
+
+    print(f"{len(paths)} images")
+
+    failed_hash_sizes = []
+
+    for hash_size in args.hash_sizes:
+        start = time.perf_counter()
+        full_hashes = [full_decode_hash(path, hash_size) for path in paths]
+        full_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        draft_hashes = [get_image_hash(path, hash_size) for path in paths]
+        draft_seconds = time.perf_counter() - start
+
+        distances = [
+            full_hash - draft_hash
+            for full_hash, draft_hash in zip(full_hashes, draft_hashes)
+        ]
+
+        max_distance = int(hash_size**2 * args.tolerance / 100)
+        passed = max(distances) <= max_distance
+
+        if not passed:
+            failed_hash_sizes.append(hash_size)
+
+        print(
+            f"hash_size={hash_size:<3d} full {1000 * full_seconds / len(paths):6.0f}ms/img   "
+            f"draft {1000 * draft_seconds / len(paths):6.0f}ms/img   "
+            f"max distance {max(distances)}/{hash_size**2}   "
+            f"mean distance {sum(distances) / len(distances):.2f}   "
+            f"{'pass' if passed else 'FAIL'} (tolerance {max_distance})"
+        )
+
+    assert (
+        not failed_hash_sizes
+    ), f"the reduced-scale hashes are too far from the full ones (hash_size={failed_hash_sizes})"
+
+
+if __name__ == "__main__":
+    main()
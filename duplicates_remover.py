@@ -1,9 +1,11 @@
+import os
 from time import sleep
 
 from matplotlib.pyplot import plot
 
 from src.features.duplicates_remover import duplicates_remover
 from src.features.duplicates_remover.argument_parser import parse_arguments
+from src.utils.path_rules import path_rules_from_args
 from src.utils.rich_console import displayIntro, print_separator
 
 if __name__ == "__main__":
@@ -22,4 +24,29 @@ if __name__ == "__main__":
         hash_size=args.hash_size,
         similarity=args.similarity,
         plot_disabled=args.plot_disabled,
+        cache=args.cache,
+        cache_path=args.cache_path,
+        prune_cache=args.prune_cache,
+        workers=args.workers or os.cpu_count() or 1,
+        block_size=args.block_size,
+        policy=args.policy,
+        report_path=args.report,
+        hash_algorithm=args.hash,
+        prefilter_similarity=args.prefilter_similarity,
+        confirm_hash=args.confirm_hash,
+        confirm_hash_size=args.confirm_hash_size,
+        against_index=args.against_index,
+        max_memory=args.max_memory,
+        link_mode=args.link_mode,
+        rotation_invariant=args.rotation_invariant,
+        time_window=args.time_window,
+        videos=args.videos,
+        verify_videos=args.verify_videos,
+        shard=args.shard,
+        shard_index=args.shard_index,
+        merge=args.merge,
+        sniff=args.sniff,
+        changed_only=args.changed_only,
+        manifest_path=args.manifest_path,
+        path_rules=path_rules_from_args(args),
     )
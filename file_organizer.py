@@ -2,6 +2,7 @@ from time import sleep
 
 from src.features.file_organizer import file_organizer
 from src.features.file_organizer.argument_parser import parse_arguments
+from src.utils.path_rules import path_rules_from_args
 from src.utils.rich_console import displayIntro, print_separator
 
 if __name__ == "__main__":
@@ -22,4 +23,11 @@ if __name__ == "__main__":
         recursive=args.recursive,
         copy_mode=args.copy,
         auto_clean_output=args.auto_clean_output,
+        sniff=args.sniff,
+        changed_only=args.changed_only,
+        manifest_path=args.manifest_path,
+        path_rules=path_rules_from_args(args),
+        watch_mode=args.watch,
+        watch_polling=args.watch_polling,
+        fix_metadata=args.fix_metadata,
     )
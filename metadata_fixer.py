@@ -2,6 +2,7 @@ from time import sleep
 
 from src.features.metadata_fixer import metadata_fixer
 from src.features.metadata_fixer.argument_parser import parse_arguments
+from src.utils.path_rules import path_rules_from_args
 from src.utils.rich_console import displayIntro, print_separator
 
 if __name__ == "__main__":
@@ -21,4 +22,8 @@ if __name__ == "__main__":
         os_dates=args.os_dates,
         recursive=args.recursive,
         dates_from=args.dates_from,
+        sniff=args.sniff,
+        changed_only=args.changed_only,
+        manifest_path=args.manifest_path,
+        path_rules=path_rules_from_args(args),
     )
@@ -159,4 +159,31 @@ IMG_EXTENSIONS = [
     ".tga",
     ".heic",
     ".heif",
+    ".arw",
+    ".cr3",
+    ".dng",
+    ".orf",
+    ".pef",
+    ".raf",
+    ".rw2",
+    ".sr2",
+    ".srw",
+]
+
+# Image formats that Pillow can not decode (or decodes very slowly), but that have an embedded JPEG preview
+EMBEDDED_PREVIEW_EXTENSIONS = [
+    ".arw",
+    ".cr2",
+    ".cr3",
+    ".dng",
+    ".nef",
+    ".orf",
+    ".pef",
+    ".raf",
+    ".raw",
+    ".rw2",
+    ".sr2",
+    ".srw",
+    ".heic",
+    ".heif",
 ]
@@ -3,6 +3,22 @@ import argparse
 from src.utils.add_common_args import add_common_args
 
 
+def shard_type(value: str):
+    """Parse a shard given as `i/N`, with `i` from 1 to `N`"""
+
+    try:
+        shard, shards = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a shard like 1/4")
+
+    if not 1 <= shard <= shards:
+        raise argparse.ArgumentTypeError(
+            f"The shard of '{value}' must be a number from 1 to {shards}"
+        )
+
+    return shard, shards
+
+
 def parse_arguments():
     parser = argparse.ArgumentParser(
         description="Remove duplicates/similar images",
@@ -17,6 +33,20 @@ def parse_arguments():
         help="Used for identification of similar images. With larger values the search will be more exhaustive but slower. Giving a value of 0 skips the search for duplicates/similar altogether",
     )
 
+    parser.add_argument(
+        "--hash",
+        type=str,
+        choices=["ahash", "dhash", "phash", "whash"],
+        default="ahash",
+        help="Hash algorithm used to compare the images: average hash (ahash), difference hash (dhash), perceptual hash (phash) or wavelet hash (whash)",
+    )
+
+    parser.add_argument(
+        "--rotation_invariant",
+        action="store_true",
+        help="Hash each image in a canonical orientation, so the rotated (by 90, 180 or 270 degrees) and mirrored versions of an image are found as duplicates",
+    )
+
     parser.add_argument(
         "-s",
         "--similarity",
@@ -25,6 +55,76 @@ def parse_arguments():
         help="Similarity of the images that will trigger an action (the action will be chosen by the user). It is a number from 0 to 100, with 100 being the number to pass when we want only completely identical images to appear. This parameter does not affect the speed of the process, as does `hash_size`",
     )
 
+    parser.add_argument(
+        "--time_window",
+        type=float,
+        default=None,
+        help="Only compare the images taken (according to their metadata) at most this number of seconds apart by the same camera model. Images without capture date are compared with every image. Much faster with large libraries, but duplicates with different capture dates are not found",
+    )
+
+    parser.add_argument(
+        "--videos",
+        action="store_true",
+        help="Also find the identical videos. They are compared by size, metadata (duration, resolution, codec and creation date) and 8 sampled chunks of 256KB of their content, so at most 2MB of each video is read and no video is decoded",
+    )
+
+    parser.add_argument(
+        "--verify_videos",
+        action="store_true",
+        help="With --videos, confirm the identical videos by comparing their whole content before grouping them. Every video that matches in the sampled chunks is read entirely, which takes as long as copying them (minutes for a few GB of videos)",
+    )
+
+    parser.add_argument(
+        "--confirm_hash",
+        type=str,
+        choices=["ahash", "dhash", "phash", "whash"],
+        default=None,
+        help="Hash algorithm used to confirm the similar images found with the first hash. It is only computed for the candidate images, so a cheap first hash (e.g. `--hash dhash --hash_size 8`) can be combined with a precise one here",
+    )
+
+    parser.add_argument(
+        "--confirm_hash_size",
+        type=int,
+        default=16,
+        help="Hash size of the confirmation hash",
+    )
+
+    parser.add_argument(
+        "--prefilter_similarity",
+        type=int,
+        default=None,
+        help="Similarity used with the first hash when a confirmation hash is set. A lower value than `similarity` finds more candidates to confirm. Defaults to `similarity`",
+    )
+
+    parser.add_argument(
+        "--against_index",
+        type=str,
+        default=None,
+        help="Path of a library index (created if it does not exist). The images of the input path are compared against each other and against the images of the index, and then added to the index. Use it to find duplicates of a new import in a big library without comparing the whole library again",
+    )
+
+    parser.add_argument(
+        "--shard",
+        type=shard_type,
+        default=None,
+        help="Only hash the i-th of N slices of the images of the input path (given as `i/N`, e.g. `2/4`), chosen by a hash of their path, and write their hashes to a standalone index file instead of searching the duplicates. Run one process (or machine) per shard and then combine the index files with `--merge`",
+    )
+
+    parser.add_argument(
+        "--shard_index",
+        type=str,
+        default=None,
+        help="Path of the index file written with `--shard`. Defaults to `shard-i-of-N.db` in the current directory",
+    )
+
+    parser.add_argument(
+        "--merge",
+        type=str,
+        action="append",
+        default=None,
+        help="Path of an index file written with `--shard`. Repeat the option to give the index of every shard. Their hashes are combined and the duplicates are searched (and handled) as if the images had been hashed in this run. The input path is not scanned",
+    )
+
     parser.add_argument(
         "--plot_disabled",
         default=False,
@@ -32,6 +132,72 @@ def parse_arguments():
         help="Display the images before confirm the removal",
     )
 
+    parser.add_argument(
+        "--policy",
+        type=str,
+        choices=["keep-largest", "keep-newest", "keep-oldest", "report-only"],
+        default=None,
+        help="Resolve the duplicates without asking: keep the largest/newest/oldest image of each group and remove the rest, or only report the groups. Images are not displayed in this mode",
+    )
+
+    parser.add_argument(
+        "--link_mode",
+        type=str,
+        choices=["hardlink", "reflink"],
+        default=None,
+        help="Replace the files that are identical to the kept file with a hardlink or a copy-on-write clone (reflink) of it, instead of removing them, so their paths are still valid",
+    )
+
+    parser.add_argument(
+        "--report",
+        type=str,
+        default=None,
+        help="Path of a report file where the groups of duplicates are written (CSV if the file ends with .csv, JSON Lines otherwise). Implies `--policy report-only` if no policy is given",
+    )
+
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes used to decode and hash the images. Use 0 to use all the CPU cores of the machine",
+    )
+
+    parser.add_argument(
+        "--block_size",
+        type=int,
+        default=65536,
+        help="Number of image hashes compared at once during the search. Lower values reduce the memory usage with very large libraries",
+    )
+
+    parser.add_argument(
+        "--max_memory",
+        type=int,
+        default=None,
+        help="Memory budget (in MB) of the hashing and of the similarity search. If given, the hashes are stored on disk and compared in partitions that fit in this budget, so libraries whose hashes do not fit in memory can be searched. Only the hashing and the similarity search are bounded: the list of files found (a few hundred bytes per file) and the grouping of the similar images (about 100 bytes per similar pair) are kept in memory on top of this budget",
+    )
+
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Store the hashes of the images in an on-disk cache, so the images that have not changed since the last run are not hashed again",
+    )
+
+    parser.add_argument(
+        "--cache_path",
+        type=str,
+        default=None,
+        help="Path of the hash cache database. Defaults to `pygallery/hashes.db` inside the user cache directory",
+    )
+
+    parser.add_argument(
+        "--prune_cache",
+        default=False,
+        action="store_true",
+        help="Remove from the hash cache the entries of the files that no longer exist, and from the thumbnail cache the thumbnails unused for 90 days (or over 500MB), before starting the search",
+    )
+
     add_common_args(parser)
 
     return parser.parse_args()
@@ -0,0 +1,40 @@
+class DisjointSet:
+    """Union-find structure over the integers `0..size-1`, with path compression and union by size"""
+
+    def __init__(self, size: int):
+        self._parent = list(range(size))
+        self._size = [1] * size
+
+    def add(self) -> int:
+        """Add a new item in its own set, and return it"""
+
+        self._parent.append(len(self._parent))
+        self._size.append(1)
+
+        return len(self._parent) - 1
+
+    def find(self, item: int) -> int:
+        root = item
+        while self._parent[root] != root:
+            root = self._parent[root]
+
+        while self._parent[item] != root:
+            self._parent[item], item = root, self._parent[item]
+
+        return root
+
+    def union(self, a: int, b: int) -> int:
+        """Merge the sets of `a` and `b`, and return the root of the resulting set"""
+
+        root_a, root_b = self.find(a), self.find(b)
+
+        if root_a == root_b:
+            return root_a
+
+        if self._size[root_a] < self._size[root_b]:
+            root_a, root_b = root_b, root_a
+
+        self._parent[root_b] = root_a
+        self._size[root_a] += self._size[root_b]
+
+        return root_a
@@ -1,40 +1,245 @@
 import os
-from math import ceil
-from typing import Literal
+import stat
+from collections import Counter
+from contextlib import nullcontext
+from itertools import chain, islice
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import datetime
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from typing import IO, Callable, Iterable, Iterator, Literal
 
 import matplotlib.pyplot as plt
+import numpy as np
 from exiftool import ExifToolHelper
-from imagehash import ImageHash, average_hash
+from imagehash import ImageHash, average_hash, dhash, phash, whash
 from PIL import Image
-from rich.columns import Columns
-from rich.panel import Panel
 from rich.prompt import Confirm, Prompt
+from rich.table import Table
+
+from src.features.duplicates_remover.disjoint_set import DisjointSet
+from src.features.duplicates_remover.embedded_previews import (
+    PreviewExtractor,
+    has_embedded_preview,
+)
+from src.features.duplicates_remover.exact_duplicates import (
+    drop_hardlinks,
+    find_exact_duplicates,
+)
+from src.features.duplicates_remover.group_pages import (
+    DuplicatesGroup,
+    GroupPages,
+    format_bytes,
+    format_similarity,
+)
+from src.features.duplicates_remover.hamming_index import (
+    HammingIndex,
+    hash_words,
+    pack_hash,
+    pair_distances,
+)
+from src.features.duplicates_remover.hash_cache import (
+    HashCache,
+    default_cache_dir,
+    default_cache_path,
+)
+from src.features.duplicates_remover.library_index import LibraryIndex
+from src.features.duplicates_remover.linking import (
+    LinkMode,
+    link_file,
+    reflink_supported,
+)
+from src.features.duplicates_remover.orientation import canonical_orientation
+from src.features.duplicates_remover.out_of_core import (
+    HASHING_BYTES_PER_IMAGE,
+    HashSpill,
+    find_similar_pairs_out_of_core,
+    group_spilled_pairs,
+)
+from src.features.duplicates_remover.report import GroupReportWriter, ReportAction
+from src.features.duplicates_remover.shards import (
+    add_identical_copies,
+    default_shard_index_path,
+    load_shard_indexes,
+    select_shard,
+    write_shard_index,
+)
+from src.features.duplicates_remover.thumbnails import (
+    THUMBNAIL_CACHE_MAX_BYTES,
+    THUMBNAIL_MAX_AGE_DAYS,
+    ThumbnailCache,
+    build_contact_sheet,
+    default_thumbnail_dir,
+)
+from src.features.duplicates_remover.time_windows import get_window_pairs
+from src.features.duplicates_remover.video_duplicates import find_video_duplicates
+from src.utils.file_date_getters import (
+    get_capture_infos,
+    get_datefiles_to_organize,
+)
+from src.utils.directory_scanner import ScanEntry, scan_files
+from src.utils.media_filter import MediaFilter
+from src.utils.path_rules import PathRules
+from src.utils.rich_console import (
+    console,
+    print_error,
+    print_log,
+    print_warn,
+    progress_bar,
+)
+from src.utils.scan_manifest import ScanManifest, default_manifest_path, print_changes
+
+HashAlgorithm = (
+    Literal["ahash"] | Literal["dhash"] | Literal["phash"] | Literal["whash"]
+)
+
+HASH_FUNCTIONS: dict[str, Callable[[Image.Image, int], ImageHash]] = {
+    "ahash": average_hash,
+    "dhash": dhash,
+    "phash": phash,
+    "whash": whash,
+}
+
+Policy = (
+    Literal["keep-largest"]
+    | Literal["keep-newest"]
+    | Literal["keep-oldest"]
+    | Literal["report-only"]
+)
+
+# Number of groups whose sizes or dates are read at once when a policy is applied
+POLICY_BATCH_GROUPS = 1000
+
+# Maximum number of images of a group shown in the contact sheet
+MAX_PLOTTED_IMAGES = 36
+
+# Minimum size (relative to the hash size) of the reduced image requested to the decoder before hashing
+DRAFT_SCALE = 8
+
+
+def remove_images(
+    paths_to_remove: list[str],
+    verbose: bool,
+    *,
+    link_mode: LinkMode | None = None,
+    link_targets: dict[str, str] | None = None,
+    manifest: ScanManifest | None = None,
+):
+    """
+    Remove the images. With a `link_mode`, the images that are in `link_targets` (exact copies of a kept image) are
+    replaced by a link to the kept image instead, so their paths are still valid. The images removed or linked are
+    recorded in the `manifest`, if any. The images that can not be removed are kept, and the rest are still removed.
+    """
 
-from src.constants.allowed_extensions import IMG_EXTENSIONS
-from src.utils.file_date_getters import get_datefile_to_organize
-from src.utils.path_utils import filter_filepaths, get_filepaths
-from src.utils.rich_console import console, print_log, print_warn, progress_bar
-
-
-def remove_images(paths_to_remove: list[str], verbose: bool):
     space_saved = 0
+    files_removed = 0
+    files_failed = 0
+    links_created = 0
 
     for img in paths_to_remove:
-        space_saved += os.path.getsize(img)
+        if link_mode and link_targets and img in link_targets:
+            try:
+                bytes_reclaimed = link_file(link_targets[img], img, link_mode)
+            except OSError as e:
+                print_warn(
+                    f"File {os.path.relpath(img, os.getcwd())} could not be replaced by a {link_mode} ({e.strerror}), so it has been kept"
+                )
+                continue
 
-        os.remove(img)
+            if bytes_reclaimed is None:
+                # It was already a hardlink to the kept image
+                continue
+
+            space_saved += bytes_reclaimed
+            links_created += 1
+
+            if manifest is not None:
+                manifest.record_written(img)
+
+            print_log(
+                f"🔗 File {os.path.relpath(img, os.getcwd())} replaced by a {link_mode} to {os.path.relpath(link_targets[img], os.getcwd())}",
+                verbose,
+            )
+            continue
+
+        try:
+            size = os.path.getsize(img)
+            os.remove(img)
+        except OSError as e:
+            print_warn(
+                f"File {os.path.relpath(img, os.getcwd())} could not be removed ({e.strerror}), so it has been kept"
+            )
+            files_failed += 1
+            continue
+
+        space_saved += size
+        files_removed += 1
+
+        if manifest is not None:
+            manifest.record_removed(img)
 
         print_log(f"✅ File {os.path.relpath(img, os.getcwd())} removed", verbose)
 
+    if files_failed > 0:
+        print_warn(f"{files_failed} images could not be removed")
+
+    if links_created > 0:
+        console.print(
+            f"[green bold][OK]:[/green bold] {files_removed} images deleted and {links_created} identical images replaced by a {link_mode} to the image kept. You have saved [bold]{round(space_saved / 1000000, 2)}MB[/bold] of space!"
+        )
+        return
+
     console.print(
         f"[green bold][OK]:[/green bold] All images deleted succesfully. You have saved [bold]{round(space_saved / 1000000, 2)}MB[/bold] of space!"
     )
 
 
+def get_exact_group_of(exact_groups: list[list[str]]):
+    """Index of the group of identical files of each file"""
+
+    return {
+        path: group_index
+        for group_index, group in enumerate(exact_groups)
+        for path in group
+    }
+
+
+def get_link_targets(
+    paths: list[str], kept_paths: list[str], exact_group_of: dict[str, int]
+):
+    """
+    Find, for each of the given files, a kept file with exactly the same content that the file can be linked to.
+
+    Args:
+        exact_group_of (dict[str, int]): The group of identical files of each file, from `get_exact_group_of`.
+
+    Returns:
+        dict[str, str]: The kept file of each file (not kept) that is an exact copy of a kept file.
+    """
+
+    kept_by_group = {
+        exact_group_of[path]: path for path in kept_paths if path in exact_group_of
+    }
+
+    return {
+        path: kept_by_group[exact_group_of[path]]
+        for path in paths
+        if path not in kept_paths and exact_group_of.get(path) in kept_by_group
+    }
+
+
 def plot_images(
-    paths: list[str], *, fig_title: str = "", verbose: bool, plot_disabled: bool
+    paths: list[str],
+    *,
+    fig_title: str = "",
+    verbose: bool,
+    plot_disabled: bool,
+    thumbnails: ThumbnailCache | None = None,
 ):
-    """Plot a set of images in a new window (if plotting is not disabled)."""
+    """
+    Plot a set of images in a new window (if plotting is not disabled), as a contact sheet composed from their
+    thumbnails, so the time to show a group does not depend on the size of the original images.
+    """
 
     if plot_disabled:
         return
@@ -43,12 +248,12 @@ def plot_images(
 
     to_be_plotted = paths
 
-    if len(to_be_plotted) > 16:
+    if len(to_be_plotted) > MAX_PLOTTED_IMAGES:
         print_warn(
-            "For performance reasons, only the first 16 images to be displayed in the window will be shown"
+            f"For performance reasons, only the first {MAX_PLOTTED_IMAGES} images to be displayed in the window will be shown"
         )
 
-        to_be_plotted = to_be_plotted[:16]
+        to_be_plotted = to_be_plotted[:MAX_PLOTTED_IMAGES]
 
     print_log(
         f"Plotting [bold]{len(to_be_plotted)}[/bold] images...",
@@ -56,28 +261,36 @@ def plot_images(
         start="\n",
     )
 
-    figure = plt.figure(
-        fig_title + (f" (Showing 16 of {len(paths)})" if len(paths) > 16 else "")
+    if thumbnails is None:
+        thumbnails = ThumbnailCache(default_thumbnail_dir())
+
+    thumbnails.prepare(to_be_plotted)
+
+    contact_sheet = build_contact_sheet(
+        [thumbnails.get(img) for img in to_be_plotted],
+        [f"Image [{i}]" for i in range(len(to_be_plotted))],
+        size=thumbnails.size,
     )
 
-    NUMBER_OF_COLS = ceil(len(to_be_plotted) / 3.5)
-    NUMBER_OF_ROWS = ceil(len(to_be_plotted) / NUMBER_OF_COLS)
+    figure = plt.figure(
+        fig_title
+        + (
+            f" (Showing {MAX_PLOTTED_IMAGES} of {len(paths)})"
+            if len(paths) > MAX_PLOTTED_IMAGES
+            else ""
+        )
+    )
 
-    for i, img in enumerate(to_be_plotted):
-        to_plot = figure.add_subplot(NUMBER_OF_COLS, NUMBER_OF_ROWS, i + 1)
-        to_plot.set_xticks([])
-        to_plot.set_yticks([])
-        to_plot.set_xlabel(f"Image [{i}]")
-        to_plot.imshow(plt.imread(img))
+    to_plot = figure.add_subplot()
+    to_plot.set_axis_off()
+    to_plot.imshow(contact_sheet)
 
-    PADDING = 0.075
+    PADDING = 0.02
     plt.subplots_adjust(
         left=PADDING,
         right=1 - PADDING,
         top=1 - PADDING,
         bottom=PADDING,
-        hspace=0.4,
-        wspace=0.1,
     )
 
     plt.show(block=False)
@@ -85,25 +298,815 @@ def plot_images(
 
 def find_file_to_keep(
     files: list[str],
-    order_method: Literal["size"] | Literal["date"],
-    et: ExifToolHelper,
+    sort_keys: dict[str, int] | dict[str, datetime],
+    *,
+    keep_lowest: bool = False,
 ):
-    """Finds the file to keep in a list of duplicates/similar files"""
+    """
+    Finds the file to keep in a list of duplicates/similar files: the one with the highest sort key (the biggest or the most recent one),
+    or the one with the lowest sort key if `keep_lowest` is True. Files without sort key (because they no longer exist) are ignored.
+    """
+
+    files = [file for file in files if file in sort_keys]
+
+    if len(files) == 0:
+        return None
+
+    return (min if keep_lowest else max)(files, key=lambda x: sort_keys[x])
+
 
-    files = list(filter(lambda x: os.path.exists(x) and os.path.isfile(x), files))
+def get_sort_keys(
+    files: list[str],
+    order_method: Literal["size"] | Literal["date"],
+):
+    """
+    Get the size or the date of each existing file, with a single `stat` per file and with the dates of all the files
+    read in a few batched exiftool calls.
+    """
+
+    file_stats: dict[str, os.stat_result] = {}
+    sizes: dict[str, int] = {}
+
+    for file in dict.fromkeys(files):
+        try:
+            file_stat = os.stat(file)
+        except OSError:
+            continue
+
+        if not stat.S_ISREG(file_stat.st_mode):
+            continue
+
+        # Only the sizes are kept when they are the keys, so a batch of groups takes as little memory as possible
+        if order_method == "size":
+            sizes[file] = file_stat.st_size
+        else:
+            file_stats[file] = file_stat
 
     if order_method == "size":
-        files.sort(
-            key=lambda x: os.path.getsize(x),
-            reverse=True,
+        return sizes
+
+    with ExifToolHelper() as et:
+        return get_datefiles_to_organize(list(file_stats), et, file_stats=file_stats)
+
+
+def get_cache_key(algorithm: HashAlgorithm, rotation_invariant: bool = False):
+    """Name of the hash algorithm in the hash cache. It changes with the way the images are decoded"""
+
+    return f"{HASH_FUNCTIONS[algorithm].__name__}:draft" + (
+        ":invariant" if rotation_invariant else ""
+    )
+
+
+def get_image_hash(
+    image: str | IO[bytes],
+    hash_size: int,
+    algorithm: HashAlgorithm = "ahash",
+    rotation_invariant: bool = False,
+) -> ImageHash | None:
+    """
+    Compute the hash of an image (a path or a file-like object), or None if it can not be opened as an image.
+
+    If `rotation_invariant` is True, the image is hashed in its canonical orientation (see `canonical_orientation`),
+    so the rotated and mirrored versions of an image get the same hash.
+    """
+
+    try:
+        img = Image.open(image)
+    except:
+        return None
+
+    if not img:
+        return None
+
+    with img:
+        try:
+            # Ask the decoder for a downscaled grayscale version of the image (up to 1/8 for JPEG files). The hash
+            # only needs `hash_size x hash_size` pixels, so there is no need to decode the image at full resolution
+            img.draft("L", (hash_size * DRAFT_SCALE, hash_size * DRAFT_SCALE))
+
+            # The EXIF orientation of the image is one of the 8 orientations, so there is no need to apply it first
+            to_hash = canonical_orientation(img) if rotation_invariant else img
+
+            temp_hash = HASH_FUNCTIONS[algorithm](to_hash, hash_size)
+        except:
+            return None
+
+    return temp_hash if temp_hash else None
+
+
+def _hash_chunk(
+    images: list[str | bytes],
+    hash_size: int,
+    algorithm: HashAlgorithm,
+    rotation_invariant: bool,
+):
+    return [
+        get_image_hash(
+            BytesIO(image) if isinstance(image, bytes) else image,
+            hash_size,
+            algorithm,
+            rotation_invariant,
+        )
+        for image in images
+    ]
+
+
+def hash_images(
+    filepaths: list[str],
+    *,
+    hash_size: int,
+    algorithm: HashAlgorithm = "ahash",
+    rotation_invariant: bool = False,
+    workers: int,
+    hash_cache: HashCache | None,
+    chunk_size: int = 32,
+    description: str = "Finding duplicates:",
+    file_stats: dict[str, os.stat_result] | None = None,
+):
+    """
+    Compute the hashes of a list of images, skipping the ones that can not be opened.
+
+    The images not found in the hash cache are decoded in a pool of `workers` processes, submitted in chunks of
+    `chunk_size` images. RAW and HEIC images are hashed from their embedded JPEG preview, extracted with one
+    exiftool call per chunk. The result keeps the order of `filepaths` regardless of the number of workers.
+    The stats of `file_stats` (e.g. from the directory scan) are used instead of stat'ing the files again.
+
+    Returns:
+        tuple[list[str], np.ndarray]: The paths of the images that have been hashed, and their hashes packed with `pack_hash` (one row per image).
+    """
+
+    cache_key = get_cache_key(algorithm, rotation_invariant)
+
+    hashes = np.zeros((len(filepaths), hash_words(hash_size**2)), dtype=np.uint64)
+    hashed = np.zeros(len(filepaths), dtype=bool)
+    stats: list[os.stat_result | None] = [None] * len(filepaths)
+    pending: list[int] = []
+
+    skipped: Counter[str] = Counter()
+
+    with progress_bar() as p, PreviewExtractor() as preview_extractor:
+        task = p.add_task(description, total=len(filepaths))
+
+        for i, filepath in enumerate(filepaths):
+            try:
+                stats[i] = (file_stats or {}).get(filepath) or os.stat(filepath)
+            except OSError:
+                skipped["The file can not be read"] += 1
+                p.advance(task)
+                continue
+
+            cached_hash = (
+                hash_cache.get(filepath, stats[i], cache_key, hash_size)
+                if hash_cache
+                else None
+            )
+
+            if cached_hash is None:
+                pending.append(i)
+            else:
+                hashes[i] = pack_hash(cached_hash)
+                hashed[i] = True
+                p.advance(task)
+
+        # Images hashed from their preview go in separate chunks, so each chunk needs one exiftool call at most
+        chunks = [
+            group[start : start + chunk_size]
+            for group in (
+                [i for i in pending if not has_embedded_preview(filepaths[i])],
+                [i for i in pending if has_embedded_preview(filepaths[i])],
+            )
+            for start in range(0, len(group), chunk_size)
+        ]
+
+        def load_chunk(chunk: list[int]):
+            """Get the images of a chunk to be hashed: their paths, or their embedded previews"""
+
+            if not has_embedded_preview(filepaths[chunk[-1]]):
+                return chunk, [filepaths[i] for i in chunk]
+
+            previews = preview_extractor.extract([filepaths[i] for i in chunk])
+
+            if len(previews) < len(chunk):
+                skipped[
+                    "No embedded preview"
+                    if preview_extractor.available
+                    else "Embedded preview can not be extracted (exiftool not found)"
+                ] += len(chunk) - len(previews)
+                p.advance(task, len(chunk) - len(previews))
+
+            chunk = [i for i in chunk if filepaths[i] in previews]
+
+            return chunk, [previews[filepaths[i]] for i in chunk]
+
+        def store_chunk(chunk: list[int], chunk_hashes: list[ImageHash | None]):
+            for i, temp_hash in zip(chunk, chunk_hashes):
+                if temp_hash is None:
+                    skipped["Not a supported image"] += 1
+                    continue
+
+                hashes[i] = pack_hash(temp_hash)
+                hashed[i] = True
+
+                if hash_cache:
+                    hash_cache.put(
+                        filepaths[i], stats[i], cache_key, hash_size, temp_hash
+                    )
+
+            p.advance(task, len(chunk))
+
+        if workers <= 1:
+            for chunk in chunks:
+                chunk, images = load_chunk(chunk)
+                store_chunk(
+                    chunk,
+                    _hash_chunk(images, hash_size, algorithm, rotation_invariant),
+                )
+
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures: dict[Future, list[int]] = {}
+                chunks_to_submit = iter(chunks)
+
+                while True:
+                    # Keep a bounded number of chunks in flight, so the extracted previews do not pile up in memory
+                    while len(futures) < 2 * workers and (
+                        next_chunk := next(chunks_to_submit, None)
+                    ):
+                        next_chunk, images = load_chunk(next_chunk)
+                        futures[
+                            executor.submit(
+                                _hash_chunk,
+                                images,
+                                hash_size,
+                                algorithm,
+                                rotation_invariant,
+                            )
+                        ] = next_chunk
+
+                    if len(futures) == 0:
+                        break
+
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+                    for future in done:
+                        chunk = futures.pop(future)
+
+                        try:
+                            store_chunk(chunk, future.result())
+                        except Exception:
+                            skipped["A worker process failed"] += len(chunk)
+                            p.advance(task, len(chunk))
+
+    if len(skipped) > 0:
+        table = Table(
+            title="Skipped files",
+            show_header=False,
+            show_lines=True,
+            title_justify="left",
+        )
+
+        table.add_column(no_wrap=True)
+        table.add_column(justify="right", style="bold")
+
+        for reason, count in skipped.most_common():
+            table.add_row(f"⏩ {reason}", f"{count}")
+
+        console.print(table)
+
+    return [filepath for filepath, ok in zip(filepaths, hashed) if ok], hashes[hashed]
+
+
+def get_max_distance(hash_size: int, similarity: int):
+    """Maximum distance (inclusive) between two hashes of `hash_size` for the images to be considered similar"""
+
+    threshold = 1 - similarity / 100
+
+    return int(threshold * (hash_size**2)) - 1
+
+
+def spill_hashes(
+    filepaths: list[str],
+    spill: HashSpill,
+    *,
+    hash_size: int,
+    algorithm: HashAlgorithm,
+    rotation_invariant: bool = False,
+    workers: int,
+    hash_cache: HashCache | None,
+    max_memory: int,
+):
+    """
+    Hash the images in batches that fit in `max_memory` (in bytes), and append the hashes of each batch to the
+    spill, so the hashes of the whole library are never in memory at once.
+    """
+
+    batch_size = max(1, max_memory // HASHING_BYTES_PER_IMAGE)
+    n_batches = -(-len(filepaths) // batch_size)
+
+    for batch_number, start in enumerate(range(0, len(filepaths), batch_size), 1):
+        batch_paths, batch_hashes = hash_images(
+            filepaths[start : start + batch_size],
+            hash_size=hash_size,
+            algorithm=algorithm,
+            rotation_invariant=rotation_invariant,
+            workers=workers,
+            hash_cache=hash_cache,
+            description=(
+                f"Finding duplicates ({batch_number}/{n_batches}):"
+                if n_batches > 1
+                else "Finding duplicates:"
+            ),
+        )
+
+        spill.append(batch_paths, batch_hashes)
+
+    spill.finish()
+
+
+def find_library_pairs(
+    paths: list[str],
+    hashes: np.ndarray,
+    library_index: LibraryIndex,
+    max_distance: int,
+):
+    """
+    Compare the images against the images of a library index, and add the new images to the index.
+
+    The similar images of the library are appended to `paths`, so the pairs can be grouped together with the pairs found between the images.
+
+    Returns:
+        list[tuple[int, int, int]]: The pairs of similar images (indexes in `paths`), with the distance between their hashes.
+    """
+
+    index_by_path = {os.path.abspath(path): i for i, path in enumerate(paths)}
+    pairs: list[tuple[int, int, int]] = []
+
+    for i, library_path, distance in library_index.query(hashes, max_distance):
+        if library_path not in index_by_path:
+            index_by_path[library_path] = len(paths)
+            paths.append(library_path)
+
+        j = index_by_path[library_path]
+
+        if i != j:
+            pairs.append((min(i, j), max(i, j), distance))
+
+    library_index.add(paths[: len(hashes)], hashes)
+
+    return pairs
+
+
+def find_similar_pairs(
+    hashes: np.ndarray,
+    hash_size: int,
+    similarity: int,
+    block_size: int = 65536,
+    rows: np.ndarray | None = None,
+) -> Iterator[tuple[int, int, int]]:
+    """
+    Find the pairs of images whose hashes are similar enough, based on the `similarity` percentage.
+
+    Each image is only compared against the candidates returned by a `HammingIndex`, instead of against every other image.
+
+    Args:
+        hashes (np.ndarray): The hash of each image, packed with `pack_hash`.
+        block_size (int): Number of hashes processed at once by the index. Lower values reduce the peak memory usage.
+        rows (np.ndarray | None): If given, only the pairs with at least one of these images are searched.
+
+    Yields:
+        tuple[int, int, int]: The indexes `i < j` of the two images, and the distance between their hashes.
+    """
+
+    index = HammingIndex(
+        hashes,
+        nbits=hash_size**2,
+        max_distance=get_max_distance(hash_size, similarity),
+        block_size=block_size,
+    )
+
+    if rows is None:
+        for i, neighbors, distances in index.neighbors():
+            for j, distance in zip(neighbors.tolist(), distances.tolist()):
+                if j > i:
+                    yield i, j, distance
+        return
+
+    is_row = np.zeros(len(hashes), dtype=bool)
+    is_row[rows] = True
+
+    for i, neighbors, distances in index.neighbors(rows):
+        for j, distance in zip(neighbors.tolist(), distances.tolist()):
+            # Pairs of two of the rows are found from both images, so only one of them is kept
+            if j == i or (is_row[j] and j < i):
+                continue
+
+            yield min(i, j), max(i, j), distance
+
+
+def find_time_window_pairs(
+    paths: list[str],
+    hashes: np.ndarray,
+    hash_size: int,
+    similarity: int,
+    time_window: float,
+    block_size: int = 65536,
+) -> Iterator[tuple[int, int, int]]:
+    """
+    Same as `find_similar_pairs`, but the images with a capture date are only compared with the images taken at most
+    `time_window` seconds apart by the same camera model (see `get_window_pairs`). The capture dates and camera
+    models are read in a few batched exiftool calls.
+
+    The images without a capture date (e.g. images sent through messaging apps, which remove the metadata) are
+    compared with every image, with a `HammingIndex`.
+
+    Yields:
+        tuple[int, int, int]: The indexes `i < j` of the two images, and the distance between their hashes.
+    """
+
+    try:
+        with ExifToolHelper() as et:
+            capture_infos = get_capture_infos(paths, et)
+    except Exception:
+        print_warn(
+            "The capture dates can not be read (exiftool not found), so every image will be compared with every other image"
+        )
+        capture_infos = {}
+
+    max_distance = get_max_distance(hash_size, similarity)
+
+    model_ids: dict[str, int] = {}
+    dated_rows: list[int] = []
+    timestamps: list[float] = []
+    models: list[int] = []
+
+    for i, path in enumerate(paths):
+        date, model = capture_infos.get(path, (None, None))
+
+        if date is None:
+            continue
+
+        dated_rows.append(i)
+        timestamps.append(date.timestamp())
+        models.append(model_ids.setdefault(model, len(model_ids) + 1) if model else 0)
+
+    is_dated = np.zeros(len(paths), dtype=bool)
+    is_dated[dated_rows] = True
+
+    comparisons = 0
+
+    for rows_a, rows_b in get_window_pairs(
+        np.array(dated_rows, dtype=np.int64),
+        np.array(timestamps, dtype=np.float64),
+        np.array(models, dtype=np.int64),
+        time_window,
+    ):
+        distances = pair_distances(hashes, rows_a, rows_b)
+        close = distances <= max_distance
+        comparisons += len(rows_a)
+
+        yield from zip(
+            np.minimum(rows_a[close], rows_b[close]).tolist(),
+            np.maximum(rows_a[close], rows_b[close]).tolist(),
+            distances[close].tolist(),
+        )
+
+    console.print(
+        f"[blue bold][INFO]:[/blue bold] [bold]{len(dated_rows)}[/bold] of [bold]{len(paths)}[/bold] images have a capture date. [bold]{comparisons}[/bold] pairs of images taken within {time_window} seconds have been compared"
+    )
+
+    undated_rows = np.flatnonzero(~is_dated)
+
+    if len(undated_rows) == 0:
+        return
+
+    index = HammingIndex(
+        hashes,
+        nbits=hash_size**2,
+        max_distance=max_distance,
+        block_size=block_size,
+    )
+
+    for i, neighbors, distances in index.neighbors(undated_rows):
+        for j, distance in zip(neighbors.tolist(), distances.tolist()):
+            # Pairs of two images without date are found from both images, so only one of them is kept
+            if j == i or (not is_dated[j] and j < i):
+                continue
+
+            yield min(i, j), max(i, j), distance
+
+
+def confirm_pairs(
+    paths: list[str],
+    pairs: list[tuple[int, int, int]],
+    *,
+    hash_size: int,
+    algorithm: HashAlgorithm,
+    rotation_invariant: bool = False,
+    similarity: int,
+    workers: int,
+    hash_cache: HashCache | None,
+):
+    """
+    Second stage of the search: compute a (usually stronger and slower) hash only for the images that are in some
+    candidate pair, and keep only the pairs that are still similar with this hash.
+
+    Returns:
+        list[tuple[int, int, int]]: The confirmed pairs, with the distance between their new hashes.
+    """
+
+    candidates = sorted(set(i for i, j, _ in pairs) | set(j for i, j, _ in pairs))
+
+    confirm_paths, confirm_hashes = hash_images(
+        [paths[i] for i in candidates],
+        hash_size=hash_size,
+        algorithm=algorithm,
+        rotation_invariant=rotation_invariant,
+        workers=workers,
+        hash_cache=hash_cache,
+        description="Confirming candidates:",
+    )
+
+    row_by_path = {path: row for row, path in enumerate(confirm_paths)}
+    pairs = [
+        pair
+        for pair in pairs
+        if paths[pair[0]] in row_by_path and paths[pair[1]] in row_by_path
+    ]
+
+    if len(pairs) == 0:
+        return []
+
+    distances = pair_distances(
+        confirm_hashes,
+        np.array([row_by_path[paths[i]] for i, _, _ in pairs]),
+        np.array([row_by_path[paths[j]] for _, j, _ in pairs]),
+    )
+
+    max_distance = get_max_distance(hash_size, similarity)
+
+    return [
+        (i, j, distance)
+        for (i, j, _), distance in zip(pairs, distances.tolist())
+        if distance <= max_distance
+    ]
+
+
+def group_similar_pairs(
+    paths: list[str], pairs: Iterable[tuple[int, int, int]], nbits: int
+):
+    """
+    Group the images of the similar pairs, with a disjoint-set structure. Each image belongs to one group at most,
+    so if A is similar to B and B is similar to C, the three images are in the same group.
+
+    Args:
+        paths (list[str]): The paths of the images.
+        pairs (Iterable[tuple[int, int, int]]): The indexes of each pair of similar images, and their hash distance.
+        nbits (int): Number of bits of the hashes, to turn the distances into similarities.
+
+    Returns:
+        list[DuplicatesGroup]: The groups of similar images.
+    """
+
+    disjoint_set = DisjointSet(len(paths))
+
+    # Minimum and maximum distance of the matched pairs of each group, by the root of the group
+    distance_ranges: dict[int, tuple[int, int]] = {}
+
+    for i, j, distance in pairs:
+        if paths[j] == paths[i]:
+            continue
+
+        ranges = [(distance, distance)] + [
+            distance_ranges.pop(root)
+            for root in {disjoint_set.find(i), disjoint_set.find(j)}
+            if root in distance_ranges
+        ]
+
+        distance_ranges[disjoint_set.union(i, j)] = (
+            min(low for low, _ in ranges),
+            max(high for _, high in ranges),
+        )
+
+    groups: dict[int, list[str]] = {}
+
+    for i, path in enumerate(paths):
+        root = disjoint_set.find(i)
+
+        if root in distance_ranges:
+            groups.setdefault(root, []).append(path)
+
+    def to_similarity(distance: int):
+        return round(100 * (1 - distance / nbits), 2)
+
+    return [
+        (
+            images,
+            to_similarity(distance_ranges[root][1]),
+            to_similarity(distance_ranges[root][0]),
         )
+        for root, images in groups.items()
+    ]
+
+
+def find_similar_groups(
+    paths: list[str],
+    hashes: np.ndarray,
+    hash_size: int,
+    similarity: int,
+    block_size: int = 65536,
+):
+    """Group the images whose hashes are similar enough, based on the `similarity` percentage"""
+
+    return group_similar_pairs(
+        paths,
+        find_similar_pairs(hashes, hash_size, similarity, block_size),
+        hash_size**2,
+    )
+
+
+def merge_identical_copies(
+    similar_groups: Iterable[DuplicatesGroup], exact_groups: list[list[str]]
+) -> Iterator[DuplicatesGroup]:
+    """
+    Add the identical copies of each image (that were not hashed) to the group of similar images where the image is.
+    The groups of identical files whose image is not similar to any other image are yielded as standalone groups
+    after the groups of similar images.
+    """
+
+    copies_by_image = {group[0]: group[1:] for group in exact_groups}
+    merged_images: set[str] = set()
+
+    for images, min_similarity, max_similarity in similar_groups:
+        group: list[str] = []
 
-    if order_method == "date":
-        files.sort(
-            key=lambda x: get_datefile_to_organize(filepath=x, et=et), reverse=True
+        for img in images:
+            group += [img] + copies_by_image.get(img, [])
+
+            if img in copies_by_image:
+                merged_images.add(img)
+                max_similarity = 100.0
+
+        yield group, min_similarity, max_similarity
+
+    for group in exact_groups:
+        if group[0] not in merged_images:
+            yield group, 100.0, 100.0
+
+
+def prepare_page(
+    page: list[tuple[int, DuplicatesGroup]], thumbnails: ThumbnailCache | None
+):
+    """
+    Create the thumbnails of the groups of a page when the review reaches it, so each group of the page is shown
+    without waiting and no thumbnail is created for the pages that are not reviewed.
+    """
+
+    if thumbnails:
+        thumbnails.prepare(
+            [img for _, group in page for img in group[0][:MAX_PLOTTED_IMAGES]]
         )
 
-    return files[0]
+    return page
+
+
+def apply_policy(
+    duplicates_imgs: Iterable[DuplicatesGroup],
+    policy: Policy,
+    *,
+    report_path: str | None,
+    verbose: bool,
+    link_mode: LinkMode | None = None,
+    exact_group_of: dict[str, int] | None = None,
+    manifest: ScanManifest | None = None,
+):
+    """
+    Resolve every group of duplicates with the given policy, without asking the user. Each group is written to the
+    report (if any) and its files are removed as soon as the group is processed, so nothing is rendered or accumulated.
+
+    The groups can be a stream: they are processed in batches of `POLICY_BATCH_GROUPS` groups, reading the sizes
+    or dates of the files of each batch at once.
+
+    With a `link_mode`, the files to remove that are exact copies of the kept file (see `get_link_targets`) are
+    replaced by a link to it instead. The files removed or linked are recorded in the `manifest`, if any. The files
+    that can not be removed are kept and reported with the `failed` action, and the rest are still processed.
+    """
+
+    files_removed = 0
+    files_failed = 0
+    links_created = 0
+    space_saved = 0
+    group_number = 0
+
+    with GroupReportWriter(report_path) if report_path else nullcontext() as report:
+        groups = iter(duplicates_imgs)
+
+        while batch := list(islice(groups, POLICY_BATCH_GROUPS)):
+            batch_images = [img for group in batch for img in group[0]]
+
+            sizes = get_sort_keys(batch_images, "size")
+            sort_keys = (
+                sizes
+                if policy in ("keep-largest", "report-only")
+                else get_sort_keys(batch_images, "date")
+            )
+
+            for images, min_similarity, max_similarity in batch:
+                group_number += 1
+
+                img_to_keep = (
+                    None
+                    if policy == "report-only"
+                    else find_file_to_keep(
+                        images, sort_keys, keep_lowest=policy == "keep-oldest"
+                    )
+                )
+
+                link_targets = (
+                    get_link_targets(images, [img_to_keep], exact_group_of)
+                    if link_mode and exact_group_of and img_to_keep
+                    else {}
+                )
+
+                files: list[tuple[str, int | None, ReportAction]] = []
+
+                for img in images:
+                    size = sizes.get(img)
+
+                    if img_to_keep is None or img not in sizes:
+                        action = "none"
+                    elif img == img_to_keep:
+                        action = "keep"
+                    elif img in link_targets:
+                        try:
+                            bytes_reclaimed = link_file(img_to_keep, img, link_mode)
+                            action = "link"
+
+                            # Nothing is linked if it was already a hardlink to the kept image
+                            if bytes_reclaimed is not None:
+                                space_saved += bytes_reclaimed
+                                links_created += 1
+
+                                if manifest is not None:
+                                    manifest.record_written(img)
+                        except OSError as e:
+                            print_warn(
+                                f"File {os.path.relpath(img, os.getcwd())} could not be replaced by a {link_mode} ({e.strerror}), so it has been kept"
+                            )
+                            action = "none"
+                    else:
+                        try:
+                            os.remove(img)
+
+                            files_removed += 1
+                            space_saved += size or 0
+                            action = "remove"
+
+                            if manifest is not None:
+                                manifest.record_removed(img)
+
+                            print_log(
+                                f"✅ File {os.path.relpath(img, os.getcwd())} removed",
+                                verbose,
+                            )
+                        except OSError as e:
+                            print_warn(
+                                f"File {os.path.relpath(img, os.getcwd())} could not be removed ({e.strerror}), so it has been kept"
+                            )
+                            files_failed += 1
+                            action = "failed"
+
+                    files.append((img, size, action))
+
+                if report:
+                    report.write_group(
+                        group_number, min_similarity, max_similarity, files
+                    )
+
+    if report_path:
+        console.print(
+            f"[blue bold][INFO]:[/blue bold] Report with [bold]{group_number}[/bold] groups written to {report_path}"
+        )
+
+    if policy != "report-only":
+        console.print(
+            f"[green bold][OK]:[/green bold] {files_removed} images deleted succesfully with the [i]{policy}[/i] policy"
+            + (
+                f" and {links_created} identical images replaced by a {link_mode}"
+                if links_created > 0
+                else ""
+            )
+            + f". You have saved [bold]{round(space_saved / 1000000, 2)}MB[/bold] of space!"
+        )
+
+        if files_failed > 0:
+            print_warn(
+                f"{files_failed} images could not be removed"
+                + (
+                    f" (see the [i]failed[/i] files of {report_path})"
+                    if report_path
+                    else ""
+                )
+            )
 
 
 def main(
@@ -113,100 +1116,520 @@ def main(
     recursive: bool,
     verbose: bool,
     plot_disabled: bool,
+    cache: bool = True,
+    cache_path: str | None = None,
+    prune_cache: bool = False,
+    workers: int = 1,
+    block_size: int = 65536,
+    policy: Policy | None = None,
+    report_path: str | None = None,
+    hash_algorithm: HashAlgorithm = "ahash",
+    prefilter_similarity: int | None = None,
+    confirm_hash: HashAlgorithm | None = None,
+    confirm_hash_size: int = 16,
+    against_index: str | None = None,
+    max_memory: int | None = None,
+    link_mode: LinkMode | None = None,
+    rotation_invariant: bool = False,
+    time_window: float | None = None,
+    videos: bool = False,
+    verify_videos: bool = False,
+    shard: tuple[int, int] | None = None,
+    shard_index: str | None = None,
+    merge: list[str] | None = None,
+    sniff: bool = False,
+    changed_only: bool = False,
+    manifest_path: str | None = None,
+    path_rules: PathRules | None = None,
 ):
     """Optionally find and remove duplicate images"""
 
+    if report_path and policy is None:
+        policy = "report-only"
+
+    if max_memory and (confirm_hash or against_index or time_window is not None):
+        print_error(
+            "The --max_memory option can not be combined with --confirm_hash, --against_index or --time_window",
+            descr="The out-of-core search compares the images with a single hash, and only within the input directory.",
+        )
+
+    if shard and (merge or max_memory):
+        print_error(
+            "The --shard option can not be combined with --merge or --max_memory",
+            descr="Each shard only hashes its images and writes them to an index file. Search the duplicates by merging the index files of every shard with --merge.",
+        )
+
+    if merge and (max_memory or videos):
+        print_error(
+            "The --merge option can not be combined with --max_memory or --videos",
+            descr="The images are read from the index files of the shards instead of scanning the input path.",
+        )
+
+    if changed_only and (max_memory or shard or merge):
+        print_error(
+            "The --changed_only option can not be combined with --max_memory, --shard or --merge",
+            descr="The new and modified images are compared with the rest of the library, whose hashes must be in memory.",
+        )
+
+    for shard_path in merge or []:
+        if not os.path.isfile(shard_path):
+            print_error(f"The shard index {shard_path} does not exist")
+
+    if link_mode == "reflink" and not reflink_supported():
+        print_error(
+            "Reflinks are not supported in this system",
+            descr="Copy-on-write clones can only be created on Linux, in filesystems like Btrfs or XFS. Use --link_mode hardlink instead.",
+        )
+
     console.print(
         f"[blue bold][INFO]:[/blue bold] Preparing the search for similar images with the following parameters:\n"
     )
 
     console.print(f"\t[blue]-[/blue] Similarity: [bold]{similarity}%[/bold]")
+    console.print(f"\t[blue]-[/blue] Hash: [bold]{hash_algorithm}[/bold]")
     console.print(f"\t[blue]-[/blue] Hash size: [bold]{hash_size}[/bold]")
 
+    if time_window is not None:
+        console.print(
+            f"\t[blue]-[/blue] Capture time window: [bold]{time_window}s[/bold]"
+        )
+
+    if rotation_invariant:
+        console.print(
+            f"\t[blue]-[/blue] Rotation and mirroring invariant: [bold]Yes[/bold]"
+        )
+
+    if confirm_hash:
+        console.print(
+            f"\t[blue]-[/blue] Confirmation hash: [bold]{confirm_hash}[/bold] (size [bold]{confirm_hash_size}[/bold])"
+        )
+    console.print(f"\t[blue]-[/blue] Workers: [bold]{workers}[/bold]")
+
+    if max_memory:
+        console.print(f"\t[blue]-[/blue] Memory budget: [bold]{max_memory}MB[/bold]")
+
+    if link_mode:
+        console.print(
+            f"\t[blue]-[/blue] Identical copies replaced by a: [bold]{link_mode}[/bold]"
+        )
+
+    if videos:
+        console.print(
+            f"\t[blue]-[/blue] Identical videos: [bold]Yes[/bold]{' (verified by their whole content)' if verify_videos else ''}"
+        )
+
+    if shard:
+        console.print(f"\t[blue]-[/blue] Shard: [bold]{shard[0]}/{shard[1]}[/bold]")
+
+    if merge:
+        console.print(
+            f"\t[blue]-[/blue] Merged shard indexes: [bold]{len(merge)}[/bold]"
+        )
+
+    if changed_only:
+        console.print(
+            f"\t[blue]-[/blue] Only new and modified files: [bold]Yes[/bold]"
+        )
+
     print()
 
-    filepaths = filter_filepaths(
-        get_filepaths(input_path, recursive),
-        allowed_ext=set(IMG_EXTENSIONS),
+    media_filter = MediaFilter(
+        ["image", "video"] if videos else ["image"], sniff=sniff, rules=path_rules
     )
 
-    duplicates_imgs: list[tuple[list[str], float]] = []
+    manifest = (
+        ScanManifest(
+            manifest_path
+            or default_manifest_path("duplicates_remover", input_path, recursive)
+        )
+        if changed_only
+        else None
+    )
 
-    files_and_hashes: list[tuple[str, ImageHash]] = []
+    # Files added or modified since the last run. Only the groups with some of them are shown
+    changed_paths: set[str] | None = None
+
+    # When the shards are merged, the images are read from their index files instead. The stats of the files are
+    # read by the scan threads, except with a memory budget, where they would not fit in memory
+    scanned_files: list[ScanEntry] = []
+
+    if manifest is not None:
+        changes = manifest.scan(input_path, recursive, media_filter)
+        scanned_files = changes.files
+        changed_paths = changes.changed
+    elif not merge:
+        # The scanner yields the files in the same order in every run, so the groups and the file kept of each one
+        # do not depend on the timing of the scan threads
+        scanned_files = list(
+            scan_files(
+                input_path,
+                recursive,
+                media_filter=media_filter,
+                with_stat=not max_memory,
+            )
+        )
 
-    with progress_bar() as p:
-        for path, filename in p.track(filepaths, description="Finding duplicates:"):
-            full_path_to_file = os.path.join(path, filename)
+    if not merge:
+        console.print(media_filter.summary())
+        print()
+
+    if manifest is not None:
+        print_changes(changes)
+
+    file_stats = {
+        os.path.join(dirpath, filename): file_stat
+        for dirpath, filename, file_stat in scanned_files
+        if file_stat is not None
+    }
+    scanned_paths = [
+        os.path.join(dirpath, filename) for dirpath, filename, _ in scanned_files
+    ]
+
+    del scanned_files
+
+    image_paths = [
+        path for path in scanned_paths if media_filter.kind_of(path) == "image"
+    ]
+
+    video_groups: list[list[str]] = []
+
+    if videos:
+        video_groups = find_video_duplicates(
+            drop_hardlinks(
+                [
+                    path
+                    for path in scanned_paths
+                    if media_filter.kind_of(path) == "video"
+                ],
+                file_stats,
+            ),
+            file_stats,
+            verify=verify_videos,
+        )
 
-            try:
-                img = Image.open(full_path_to_file)
-            except:
-                continue
+        console.print(
+            f"[blue bold][INFO]:[/blue bold] [bold]{sum(len(group) for group in video_groups)}[/bold] identical videos found in [bold]{len(video_groups)}[/bold] groups\n"
+        )
 
-            if not img:
-                continue
+    if shard and not cache_path:
+        # Each shard uses its own cache, so several shards can run at once in the same machine
+        cache_path = os.path.join(
+            default_cache_dir(), f"hashes-shard-{shard[0]}-of-{shard[1]}.db"
+        )
 
-            with img:
-                try:
-                    temp_hash = average_hash(img, hash_size)
+    hash_cache = HashCache(cache_path or default_cache_path()) if cache else None
 
-                    if temp_hash:
-                        files_and_hashes.append((full_path_to_file, temp_hash))
-                except:
-                    continue
+    # The thumbnails are stored next to the hash cache
+    thumbnail_dir = (
+        os.path.join(os.path.dirname(os.path.abspath(cache_path)), "thumbnails")
+        if cache_path
+        else default_thumbnail_dir()
+    )
 
-    threshold = 1 - similarity / 100
-    diff_limit = int(threshold * (hash_size**2))
+    # The hashes computed so far are kept in the cache even if the run fails or is interrupted
+    try:
+        if hash_cache and prune_cache:
+            console.print(
+                f"[blue bold][INFO]:[/blue bold] {hash_cache.prune()} entries of files that no longer exist have been removed from the hash cache"
+            )
 
-    print()
+            if os.path.isdir(thumbnail_dir):
+                console.print(
+                    f"[blue bold][INFO]:[/blue bold] {ThumbnailCache(thumbnail_dir).prune()} thumbnails unused for {THUMBNAIL_MAX_AGE_DAYS} days, or over the size limit of {THUMBNAIL_CACHE_MAX_BYTES // 10**6}MB, have been removed from the thumbnail cache"
+                )
+
+            print()
+
+        # The hardlinks of an image (e.g. created by --link_mode in a previous run) are the same file, not duplicates
+        full_filepaths = drop_hardlinks(image_paths, file_stats)
+
+        if shard:
+            full_filepaths = select_shard(full_filepaths, input_path, *shard)
+
+            console.print(
+                f"[blue bold][INFO]:[/blue bold] [bold]{len(full_filepaths)}[/bold] of [bold]{len(image_paths)}[/bold] images belong to the shard {shard[0]}/{shard[1]}\n"
+            )
+
+        exact_groups = find_exact_duplicates(full_filepaths, file_stats)
+
+        if len(exact_groups) > 0:
+            console.print(
+                f"[blue bold][INFO]:[/blue bold] [bold]{sum(len(group) for group in exact_groups)}[/bold] identical files found in [bold]{len(exact_groups)}[/bold] groups. Only one file of each group will be compared by similarity\n"
+            )
+
+        if changed_paths is not None:
+            # The hashed image of a group of identical files stands for the new copies of the group too
+            changed_paths = changed_paths | {
+                group[0]
+                for group in exact_groups
+                if not changed_paths.isdisjoint(group)
+            }
+
+        # Identical copies of a kept file are replaced by links instead of being removed
+        exact_group_of = (
+            get_exact_group_of(exact_groups + video_groups) if link_mode else {}
+        )
+
+        # Only one copy of each group of identical files needs to be hashed
+        identical_copies = set(path for group in exact_groups for path in group[1:])
+
+        filepaths_to_hash = [
+            path for path in full_filepaths if path not in identical_copies
+        ]
+
+        if max_memory:
+            # The hashes are stored on disk, and the pairs are searched (and grouped) while the groups are consumed
+            spill_dir = TemporaryDirectory(prefix="pygallery-spill-")
+            spill = HashSpill(spill_dir.name, hash_size**2)
+
+            spill_hashes(
+                filepaths_to_hash,
+                spill,
+                hash_size=hash_size,
+                algorithm=hash_algorithm,
+                rotation_invariant=rotation_invariant,
+                workers=workers,
+                hash_cache=hash_cache,
+                max_memory=max_memory * 2**20,
+            )
+
+            similar_groups = group_spilled_pairs(
+                spill,
+                find_similar_pairs_out_of_core(
+                    spill,
+                    get_max_distance(hash_size, similarity),
+                    work_dir=spill_dir.name,
+                    max_memory=max_memory * 2**20,
+                ),
+            )
+
+        else:
+            if merge:
+                hashed_paths, hashes = load_shard_indexes(
+                    merge,
+                    algorithm=get_cache_key(hash_algorithm, rotation_invariant),
+                    hash_size=hash_size,
+                )
+
+                console.print(
+                    f"[blue bold][INFO]:[/blue bold] [bold]{len(hashed_paths)}[/bold] images read from [bold]{len(merge)}[/bold] shard indexes\n"
+                )
+
+                if link_mode:
+                    # The identical copies of the shards have been hashed (and indexed), so they are only needed to link them
+                    exact_group_of = get_exact_group_of(
+                        find_exact_duplicates(hashed_paths)
+                    )
+            else:
+                hashed_paths, hashes = hash_images(
+                    filepaths_to_hash,
+                    hash_size=hash_size,
+                    algorithm=hash_algorithm,
+                    rotation_invariant=rotation_invariant,
+                    workers=workers,
+                    hash_cache=hash_cache,
+                    file_stats=file_stats,
+                )
+
+            if shard:
+                shard_index = shard_index or default_shard_index_path(*shard)
+
+                # The identical copies (that have not been hashed) are indexed with the hash of their original
+                write_shard_index(
+                    shard_index,
+                    *add_identical_copies(hashed_paths, hashes, exact_groups),
+                    algorithm=get_cache_key(hash_algorithm, rotation_invariant),
+                    hash_size=hash_size,
+                    max_distance=get_max_distance(hash_size, similarity),
+                )
+
+                console.print(
+                    f"\n[green bold][OK]:[/green bold] The hashes of the shard {shard[0]}/{shard[1]} have been written to {shard_index}. Search the duplicates of every shard with --merge"
+                )
+                return
+
+            first_similarity = (
+                (prefilter_similarity or similarity) if confirm_hash else similarity
+            )
+
+            changed_rows = (
+                np.array(
+                    [i for i, path in enumerate(hashed_paths) if path in changed_paths],
+                    dtype=np.int64,
+                )
+                if changed_paths is not None
+                else None
+            )
+
+            pairs = list(
+                find_similar_pairs(
+                    hashes,
+                    hash_size,
+                    first_similarity,
+                    block_size=block_size,
+                    rows=changed_rows,
+                )
+                if time_window is None
+                else find_time_window_pairs(
+                    hashed_paths,
+                    hashes,
+                    hash_size,
+                    first_similarity,
+                    time_window,
+                    block_size=block_size,
+                )
+            )
+
+            if changed_paths is not None and time_window is not None:
+                pairs = [
+                    pair
+                    for pair in pairs
+                    if hashed_paths[pair[0]] in changed_paths
+                    or hashed_paths[pair[1]] in changed_paths
+                ]
+
+            if against_index:
+                with LibraryIndex(
+                    against_index,
+                    get_cache_key(hash_algorithm, rotation_invariant),
+                    hash_size,
+                    get_max_distance(hash_size, first_similarity),
+                ) as library_index:
+                    console.print(
+                        f"[blue bold][INFO]:[/blue bold] Comparing the images against the [bold]{len(library_index)}[/bold] images of the index {against_index}"
+                    )
+
+                    # Images of the library are appended to `hashed_paths`, after the images that have been hashed
+                    library_pairs = find_library_pairs(
+                        hashed_paths,
+                        hashes,
+                        library_index,
+                        get_max_distance(hash_size, first_similarity),
+                    )
+
+                if changed_paths is not None:
+                    library_pairs = [
+                        pair
+                        for pair in library_pairs
+                        if hashed_paths[pair[0]] in changed_paths
+                        or hashed_paths[pair[1]] in changed_paths
+                    ]
+
+                pairs += library_pairs
+
+            if confirm_hash:
+                # The first hash only generates the candidates, which are confirmed (or discarded) by the second one
+                pairs = confirm_pairs(
+                    hashed_paths,
+                    pairs,
+                    hash_size=confirm_hash_size,
+                    algorithm=confirm_hash,
+                    rotation_invariant=rotation_invariant,
+                    similarity=similarity,
+                    workers=workers,
+                    hash_cache=hash_cache,
+                )
+
+            similar_groups = group_similar_pairs(
+                hashed_paths,
+                pairs,
+                (confirm_hash_size if confirm_hash else hash_size) ** 2,
+            )
+    finally:
+        if hash_cache:
+            hash_cache.close()
 
-    for i, file1 in enumerate(files_and_hashes):
-        duplicates: list[str] = []
-        _similarity: float
+    if hash_cache:
+        console.print(
+            f"[blue bold][INFO]:[/blue bold] Hash cache: [bold]{hash_cache.hits}[/bold] hits, [bold]{hash_cache.misses}[/bold] misses, [bold]{hash_cache.evictions}[/bold] evictions"
+        )
 
-        for file2 in files_and_hashes[i:]:
-            if file1[0] != file2[0]:
-                if file1[1] - file2[1] < diff_limit:
-                    if len(duplicates) == 0:
-                        duplicates.append(file1[0])
+    print()
 
-                    duplicates.append(file2[0])
-                    _similarity = round(100 * ((file1[1] - file2[1]) / hash_size**2), 2)
+    duplicates_stream = chain(
+        merge_identical_copies(similar_groups, exact_groups),
+        # The videos are only found when identical
+        ((group, 100.0, 100.0) for group in video_groups),
+    )
 
-        already_found = False
-        for founded in duplicates_imgs:
-            if set(duplicates) <= set(founded[0]):
-                already_found = True
+    if changed_paths is not None:
+        duplicates_stream = (
+            group
+            for group in duplicates_stream
+            if not changed_paths.isdisjoint(group[0])
+        )
 
-        if len(duplicates) > 0 and not already_found:
-            duplicates_imgs.append((duplicates, _similarity))
+    first_group = next(duplicates_stream, None)
 
     console.print(
         f"[green bold][OK]:[/green bold] Duplicate search finished with success.\n"
     )
 
-    if len(duplicates_imgs) == 0:
+    if first_group is None:
         console.print(
             "[green bold][INFO]:[/green bold] No duplicates found. Nothing more to do in this step"
         )
+
+        if manifest is not None:
+            manifest.save()
+            manifest.close()
+        return
+
+    if policy is not None:
+        console.print(
+            f"[blue bold][INFO]:[/blue bold] Applying the [i]{policy}[/i] policy to the groups of similar images...\n"
+        )
+
+        apply_policy(
+            chain([first_group], duplicates_stream),
+            policy,
+            report_path=report_path,
+            verbose=verbose,
+            link_mode=link_mode,
+            exact_group_of=exact_group_of,
+            manifest=manifest,
+        )
+
+        if manifest is not None:
+            manifest.save()
+            manifest.close()
         return
 
+    duplicates_imgs = [first_group] + list(duplicates_stream)
+    pages = GroupPages(duplicates_imgs)
+
     console.print(
         f"[blue bold][INFO]:[/blue bold] Some similar images has been found:\n"
     )
 
-    columns_panels_to_print: list[str] = []
+    console.print(pages.summary())
 
-    for duplication_group_info in duplicates_imgs:
-        text_to_append = f"Similarity: {100 - duplication_group_info[1]}%:\n\n"
-        for img in duplication_group_info[0]:
-            text_to_append += f"[blue]-[/blue] {os.path.relpath(img, os.getcwd())}\n"
+    print()
 
-        columns_panels_to_print.append(text_to_append)
+    page_number = 0
 
-    console.print(
-        Columns([Panel(panel, expand=True) for panel in columns_panels_to_print])
-    )
+    while True:
+        console.print(pages.render(page_number))
+
+        if len(pages) == 1:
+            break
+
+        page_choices = {
+            "n": page_number + 1 < len(pages),
+            "p": page_number > 0,
+            "c": True,
+        }
+
+        page_selection = Prompt.ask(
+            f"\nPage [bold]{page_number + 1}/{len(pages)}[/bold]. Show the next page (n), the previous page (p) or continue to the actions (c)",
+            choices=[choice for choice, enabled in page_choices.items() if enabled],
+            default="n" if page_choices["n"] else "c",
+        )
+
+        if page_selection == "c":
+            break
+
+        page_number += 1 if page_selection == "n" else -1
 
     print()
 
@@ -227,24 +1650,48 @@ def main(
         console.print(
             "\n[bold blue][INFO]:[/bold blue] The duplicates remover will not make any action"
         )
+
+        if manifest is not None:
+            manifest.save()
+            manifest.close()
         return
 
+    thumbnails: ThumbnailCache | None = None
+
+    if not plot_disabled:
+        if cache:
+            thumbnails = ThumbnailCache(thumbnail_dir, workers=workers)
+        else:
+            # Removed when the script finishes
+            thumbnails_dir = TemporaryDirectory(prefix="pygallery-thumbnails-")
+            thumbnails = ThumbnailCache(thumbnails_dir.name, workers=workers)
+
     if action_selection == "1" or action_selection == "2":
         paths_to_remove: list[str] = []
+        link_targets: dict[str, str] = {}
 
-        with ExifToolHelper() as et:
-            for duplication_group_info in duplicates_imgs:
-                IMG_TO_REMOVE = find_file_to_keep(
-                    duplication_group_info[0],
-                    "date" if action_selection == "2" else "size",
-                    et,
+        sort_keys = get_sort_keys(
+            [img for group in duplicates_imgs for img in group[0]],
+            "date" if action_selection == "2" else "size",
+        )
+
+        for duplication_group_info in duplicates_imgs:
+            IMG_TO_KEEP = find_file_to_keep(duplication_group_info[0], sort_keys)
+
+            if IMG_TO_KEEP is None:
+                continue
+
+            link_targets.update(
+                get_link_targets(
+                    duplication_group_info[0], [IMG_TO_KEEP], exact_group_of
                 )
+            )
 
-                duplication_group_info[0].remove(IMG_TO_REMOVE)
+            duplication_group_info[0].remove(IMG_TO_KEEP)
 
-                for img in duplication_group_info[0]:
-                    if os.path.exists(img) and os.path.isfile(img):
-                        paths_to_remove.append(img)
+            for img in duplication_group_info[0]:
+                if img in sort_keys:
+                    paths_to_remove.append(img)
 
         paths_to_remove = list(
             set(paths_to_remove)
@@ -255,10 +1702,17 @@ def main(
             fig_title="Images to be removed",
             verbose=verbose,
             plot_disabled=plot_disabled,
+            thumbnails=thumbnails,
         )
 
         confirm_remove = Confirm.ask(
-            f"\nThis action will delete [bold]{len(paths_to_remove)}[/bold] images from the output directory. Are you sure?",
+            f"\nThis action will delete [bold]{len(paths_to_remove)}[/bold] images from the output directory"
+            + (
+                f" ([bold]{len(link_targets)}[/bold] of them are identical copies that will be replaced by a {link_mode})"
+                if len(link_targets) > 0
+                else ""
+            )
+            + ". Are you sure?",
             default=False,
         )
 
@@ -266,7 +1720,13 @@ def main(
             plt.close()
 
         if confirm_remove is True:
-            remove_images(paths_to_remove=paths_to_remove, verbose=verbose)
+            remove_images(
+                paths_to_remove=paths_to_remove,
+                verbose=verbose,
+                link_mode=link_mode,
+                link_targets=link_targets,
+                manifest=manifest,
+            )
 
         else:
             console.print(
@@ -274,20 +1734,23 @@ def main(
             )
 
     elif action_selection == "3" or action_selection == "4":
-        for index, duplication_group_info in enumerate(duplicates_imgs):
+        for index, duplication_group_info in (
+            group for page in pages for group in prepare_page(page, thumbnails)
+        ):
             # For each group of duplicates:
 
             images_in_group = duplication_group_info[0]
 
             plot_images(
                 paths=images_in_group,
-                fig_title=f"Group {index + 1}/{len(duplicates_imgs)}",
+                fig_title=f"Group {index + 1}/{len(pages.groups)}",
                 verbose=verbose,
                 plot_disabled=plot_disabled,
+                thumbnails=thumbnails,
             )
 
             console.print(
-                f"\n[bold]Group {index}[/bold] [i](similarity: {100 - duplication_group_info[1]}%)[/i]:"
+                f"\n[bold]Group {index + 1}[/bold] [i](similarity: {format_similarity(duplication_group_info)})[/i]:"
             )
 
             img_text: str = ""
@@ -295,7 +1758,7 @@ def main(
             for i, img in enumerate(images_in_group):
                 img_text += (
                     f"\n\t[{i}] - {os.path.relpath(img, os.getcwd())}"
-                    f" - [i]{round(os.path.getsize(img) / 1000000, 2)}MB[/i]"
+                    f" - [i]{format_bytes(pages.sizes.get(img, 0))}[/i]"
                 )
 
             console.print(img_text)
@@ -363,7 +1826,22 @@ def main(
                 f"\n[blue bold][INFO]:[/blue bold] Number of images to be removed: {len(paths_to_remove)}\n"
             )
 
-            remove_images(paths_to_remove=paths_to_remove, verbose=verbose)
+            remove_images(
+                paths_to_remove=paths_to_remove,
+                verbose=verbose,
+                link_mode=link_mode,
+                link_targets=get_link_targets(
+                    paths_to_remove,
+                    [img for img in images_in_group if img not in paths_to_remove],
+                    exact_group_of,
+                ),
+                manifest=manifest,
+            )
 
             if not plot_disabled:
                 plt.close()
+
+    if manifest is not None:
+        # The images removed or linked by this run are recorded, so they are not reported again by the next run
+        manifest.save()
+        manifest.close()
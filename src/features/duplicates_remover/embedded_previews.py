@@ -0,0 +1,101 @@
+import base64
+import os
+from typing import Any
+
+from exiftool import ExifToolHelper
+
+from src.constants.allowed_extensions import EMBEDDED_PREVIEW_EXTENSIONS
+
+# Tags that can contain an embedded JPEG version of the image
+PREVIEW_TAGS = ["JpgFromRaw", "PreviewImage", "ThumbnailImage"]
+
+
+def has_embedded_preview(filepath: str):
+    """Whether the image should be hashed from its embedded preview, because Pillow can not decode it (or it is very slow to decode)"""
+
+    return os.path.splitext(filepath)[-1].lower() in EMBEDDED_PREVIEW_EXTENSIONS
+
+
+def _biggest_preview(metadata: dict[str, Any]) -> bytes | None:
+    previews = [
+        base64.b64decode(str(value)[len("base64:") :])
+        for key, value in metadata.items()
+        if key.split(":")[-1] in PREVIEW_TAGS and str(value).startswith("base64:")
+    ]
+
+    return max(previews, key=len) if len(previews) > 0 else None
+
+
+class PreviewExtractor:
+    """
+    Extract the embedded JPEG previews of RAW and HEIC files, using a single exiftool process.
+
+    The exiftool process is only started when the first preview is requested. If exiftool is not available, no preview is extracted.
+    """
+
+    def __init__(self):
+        self._et: ExifToolHelper | None = None
+        self._started = False
+
+    def __enter__(self):
+        return self
+
+    def _start(self):
+        self._started = True
+
+        try:
+            self._et = ExifToolHelper()
+            self._et.run()
+        except Exception:
+            self._et = None
+
+    def __exit__(self, *_):
+        if self._et is not None:
+            self._et.terminate()
+
+    @property
+    def available(self):
+        if not self._started:
+            self._start()
+
+        return self._et is not None
+
+    def extract(self, filepaths: list[str]):
+        """
+        Extract the biggest embedded preview of each file, reading the binary tags of all the files in one exiftool call.
+
+        Returns:
+            dict[str, bytes]: The preview of each file. Files without preview are not included.
+        """
+
+        if len(filepaths) == 0 or not self.available:
+            return {}
+
+        try:
+            batch_metadata: list[dict[str, Any]] = self._et.get_tags(
+                filepaths, tags=PREVIEW_TAGS, params=["-b"]
+            )
+        except Exception:
+            batch_metadata = []
+
+        if len(batch_metadata) != len(filepaths):
+            # Some file of the batch can not be read, so fall back to one call per file
+            batch_metadata = []
+
+            for filepath in filepaths:
+                try:
+                    batch_metadata += self._et.get_tags(
+                        filepath, tags=PREVIEW_TAGS, params=["-b"]
+                    )
+                except Exception:
+                    batch_metadata.append({})
+
+        previews: dict[str, bytes] = {}
+
+        for filepath, metadata in zip(filepaths, batch_metadata):
+            preview = _biggest_preview(metadata)
+
+            if preview is not None:
+                previews[filepath] = preview
+
+        return previews
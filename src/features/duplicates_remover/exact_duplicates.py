@@ -0,0 +1,147 @@
+import os
+from collections import Counter, defaultdict
+from hashlib import blake2b
+from typing import Callable, Hashable
+
+# Bytes read from the start and from the end of each file to compute its partial digest
+PARTIAL_DIGEST_BYTES = 64 * 1024
+
+FULL_DIGEST_CHUNK_BYTES = 1024 * 1024
+
+
+def partial_digest(filepath: str, size: int):
+    """Digest of the first and last bytes of a file, cheap to compute and enough to tell apart most files with the same size"""
+
+    with open(filepath, "rb") as f:
+        digest = blake2b(f.read(PARTIAL_DIGEST_BYTES))
+
+        if size > PARTIAL_DIGEST_BYTES:
+            f.seek(max(PARTIAL_DIGEST_BYTES, size - PARTIAL_DIGEST_BYTES))
+            digest.update(f.read())
+
+    return digest.digest()
+
+
+def full_digest(filepath: str):
+    digest = blake2b()
+
+    with open(filepath, "rb") as f:
+        while chunk := f.read(FULL_DIGEST_CHUNK_BYTES):
+            digest.update(chunk)
+
+    return digest.digest()
+
+
+def get_sizes(
+    filepaths: list[str], file_stats: dict[str, os.stat_result] | None = None
+):
+    """Size of each existing file, from its stat in `file_stats` if it is there"""
+
+    sizes: dict[str, int] = {}
+
+    for filepath in filepaths:
+        if file_stats and filepath in file_stats:
+            sizes[filepath] = file_stats[filepath].st_size
+            continue
+
+        try:
+            sizes[filepath] = os.path.getsize(filepath)
+        except OSError:
+            continue
+
+    return sizes
+
+
+def drop_hardlinks(
+    filepaths: list[str], file_stats: dict[str, os.stat_result] | None = None
+):
+    """
+    Keep only the first path of each file, by its device and inode: the rest of its paths are hardlinks to the same
+    data, so they are not copies of it and removing them would not save any space. The stats are taken from
+    `file_stats` when given. The files that can not be stat'ed are kept.
+    """
+
+    seen: set[tuple[int, int]] = set()
+    unique_filepaths: list[str] = []
+
+    for filepath in filepaths:
+        try:
+            file_stat = (
+                file_stats[filepath]
+                if file_stats and filepath in file_stats
+                else os.stat(filepath)
+            )
+        except OSError:
+            unique_filepaths.append(filepath)
+            continue
+
+        key = (file_stat.st_dev, file_stat.st_ino)
+
+        if key not in seen:
+            seen.add(key)
+            unique_filepaths.append(filepath)
+
+    return unique_filepaths
+
+
+def split_groups(groups: list[list[str]], key: Callable[[str], Hashable]):
+    """Split each group by the given key, keeping only the subgroups with more than one file"""
+
+    new_groups: list[list[str]] = []
+
+    for group in groups:
+        buckets: dict[Hashable, list[str]] = defaultdict(list)
+
+        for filepath in group:
+            try:
+                buckets[key(filepath)].append(filepath)
+            except OSError:
+                continue
+
+        new_groups += [bucket for bucket in buckets.values() if len(bucket) > 1]
+
+    return new_groups
+
+
+def find_exact_duplicates(
+    filepaths: list[str], file_stats: dict[str, os.stat_result] | None = None
+):
+    """
+    Find the files with exactly the same content.
+
+    The search is done in stages, so the expensive ones only run for the files that can still be duplicates:
+    files are grouped by size, then by a partial digest of their first and last bytes and finally by a
+    digest of their whole content. The sizes are taken from `file_stats` when given (e.g. from the directory scan).
+    The hardlinks of a file are reported as identical files, so drop them first with `drop_hardlinks`.
+
+    Returns:
+        list[list[str]]: The groups of identical files, each one in the same order as in `filepaths`.
+    """
+
+    sizes = get_sizes(filepaths, file_stats)
+
+    # Most files have a unique size, so they are discarded before building the groups of files by size
+    size_counts = Counter(sizes.values())
+    sizes = {
+        filepath: size for filepath, size in sizes.items() if size_counts[size] > 1
+    }
+    del size_counts
+
+    groups = split_groups([list(sizes)], lambda filepath: sizes[filepath])
+    groups = split_groups(
+        groups, lambda filepath: partial_digest(filepath, sizes[filepath])
+    )
+
+    # The partial digest already covers the whole content of the smallest files
+    fully_read = [
+        group for group in groups if sizes[group[0]] <= 2 * PARTIAL_DIGEST_BYTES
+    ]
+    groups = fully_read + split_groups(
+        [group for group in groups if sizes[group[0]] > 2 * PARTIAL_DIGEST_BYTES],
+        full_digest,
+    )
+
+    order = {filepath: i for i, filepath in enumerate(filepaths)}
+    groups.sort(key=lambda group: order[group[0]])
+
+    return groups
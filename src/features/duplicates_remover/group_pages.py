@@ -0,0 +1,140 @@
+import os
+from typing import Iterator
+
+from rich.columns import Columns
+from rich.panel import Panel
+from rich.table import Table
+
+# A group of similar images, with the minimum and maximum similarity (in %) between the matched images of the group
+DuplicatesGroup = tuple[list[str], float, float]
+
+# Number of groups shown (and reviewed) at once
+GROUPS_PER_PAGE = 24
+
+# Upper bounds (exclusive, in bytes) of the buckets of the histogram of reclaimable space per group
+RECLAIMABLE_BUCKETS: list[tuple[str, float]] = [
+    ("< 1MB", 1e6),
+    ("1MB - 10MB", 1e7),
+    ("10MB - 100MB", 1e8),
+    ("100MB - 1GB", 1e9),
+    (">= 1GB", float("inf")),
+]
+
+
+def format_similarity(group: DuplicatesGroup):
+    _, min_similarity, max_similarity = group
+
+    if min_similarity == max_similarity:
+        return f"{min_similarity}%"
+
+    return f"{min_similarity}% - {max_similarity}%"
+
+
+def format_bytes(size: float):
+    return f"{round(size / 1000000, 2)}MB"
+
+
+class GroupPages:
+    """
+    Pages of `per_page` groups of duplicates. The sizes of the files are read once, when the pages are created, to
+    compute the summary of the groups, but each page is only rendered when it is shown.
+    """
+
+    def __init__(self, groups: list[DuplicatesGroup], per_page: int = GROUPS_PER_PAGE):
+        self.groups = groups
+        self.per_page = per_page
+
+        self.sizes: dict[str, int] = {}
+
+        for images, _, _ in groups:
+            for img in images:
+                try:
+                    self.sizes[img] = os.path.getsize(img)
+                except OSError:
+                    continue
+
+    def __len__(self):
+        return -(-len(self.groups) // self.per_page)
+
+    def __iter__(self) -> Iterator[list[tuple[int, DuplicatesGroup]]]:
+        for number in range(len(self)):
+            yield self.page(number)
+
+    def page(self, number: int):
+        """The groups of a page, with their index in the list of groups"""
+
+        start = number * self.per_page
+
+        return list(enumerate(self.groups[start : start + self.per_page], start=start))
+
+    def reclaimable_bytes(self, group: DuplicatesGroup):
+        """Bytes freed by keeping only the largest file of a group"""
+
+        sizes = [self.sizes[img] for img in group[0] if img in self.sizes]
+
+        return sum(sizes) - max(sizes, default=0)
+
+    def summary(self):
+        """Table with the number of groups and files, the reclaimable space and its histogram per group"""
+
+        counts = [0] * len(RECLAIMABLE_BUCKETS)
+        bucket_bytes = [0] * len(RECLAIMABLE_BUCKETS)
+
+        for group in self.groups:
+            reclaimable = self.reclaimable_bytes(group)
+            bucket = next(
+                i
+                for i, (_, upper_bound) in enumerate(RECLAIMABLE_BUCKETS)
+                if reclaimable < upper_bound
+            )
+
+            counts[bucket] += 1
+            bucket_bytes[bucket] += reclaimable
+
+        table = Table(
+            title="Duplicates summary",
+            show_header=False,
+            show_lines=True,
+            title_justify="left",
+        )
+
+        table.add_column(no_wrap=True)
+        table.add_column(justify="right", style="bold")
+        table.add_column(justify="right")
+
+        table.add_row("Groups", f"{len(self.groups)}", "")
+        table.add_row(
+            "Files", f"{sum(len(images) for images, _, _ in self.groups)}", ""
+        )
+        table.add_row(
+            "Reclaimable space (keeping the largest file)",
+            format_bytes(sum(bucket_bytes)),
+            "",
+        )
+
+        for (label, _), count, reclaimable in zip(
+            RECLAIMABLE_BUCKETS, counts, bucket_bytes
+        ):
+            if count > 0:
+                table.add_row(
+                    f"Groups reclaiming {label}",
+                    f"{count}",
+                    format_bytes(reclaimable),
+                )
+
+        return table
+
+    def render(self, number: int):
+        """Panels of the groups of a page"""
+
+        panels: list[Panel] = []
+
+        for index, group in self.page(number):
+            text = f"Group {index + 1}. Similarity: {format_similarity(group)}:\n\n"
+
+            for img in group[0]:
+                text += f"[blue]-[/blue] {os.path.relpath(img, os.getcwd())}\n"
+
+            panels.append(Panel(text, expand=True))
+
+        return Columns(panels)
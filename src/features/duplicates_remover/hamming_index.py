@@ -0,0 +1,191 @@
+from typing import Iterator
+
+import numpy as np
+from imagehash import ImageHash
+
+# Number of set bits of every possible byte, used to count bits when `np.bitwise_count` is not available (numpy < 2.0)
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def hash_words(nbits: int):
+    """Number of uint64 words needed to store a hash of `nbits` bits"""
+
+    return -(-nbits // 64)
+
+
+def pack_hash(img_hash: ImageHash) -> np.ndarray:
+    """Pack the bits of an image hash into an array of uint64 words (8 bytes every 64 bits of the hash)"""
+
+    bits = img_hash.hash.flatten()
+
+    packed = np.zeros(hash_words(len(bits)) * 8, dtype=np.uint8)
+    packed_bits = np.packbits(bits)
+    packed[: len(packed_bits)] = packed_bits
+
+    return packed.view(np.uint64)
+
+
+def unpack_bits(hashes: np.ndarray, nbits: int) -> np.ndarray:
+    """Inverse of `pack_hash` for a matrix of packed hashes. Returns a boolean matrix with a row of `nbits` bits per hash"""
+
+    return np.unpackbits(hashes.view(np.uint8), axis=1)[:, :nbits].astype(bool)
+
+
+def _count_bits(xor: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor).sum(axis=1, dtype=np.int64)
+
+    return _POPCOUNT_TABLE[xor.view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+
+def hamming_distances(hashes: np.ndarray, img_hash: np.ndarray) -> np.ndarray:
+    """Distance between each packed hash of `hashes` and `img_hash`, computed with XOR + popcount"""
+
+    return _count_bits(np.bitwise_xor(hashes, img_hash))
+
+
+def pair_distances(hashes: np.ndarray, rows_a: np.ndarray, rows_b: np.ndarray):
+    """Distance between the packed hashes `hashes[rows_a[k]]` and `hashes[rows_b[k]]`, for each k"""
+
+    return _count_bits(np.bitwise_xor(hashes[rows_a], hashes[rows_b]))
+
+
+def get_chunks(nbits: int, max_distance: int) -> list[tuple[int, int]]:
+    """
+    Split the bits of a hash in (at least) `max_distance + 1` disjoint chunks, so two hashes with a distance of
+    at most `max_distance` must have at least one identical chunk (pigeonhole principle).
+
+    Returns:
+        list[tuple[int, int]]: The start and end bit of each chunk.
+    """
+
+    if max_distance < 0 or nbits <= 0:
+        return []
+
+    # More chunks than needed keep the pigeonhole guarantee, and ensure that each chunk fits in a uint64 key
+    n_chunks = min(max(max_distance + 1, hash_words(nbits)), nbits)
+
+    chunks: list[tuple[int, int]] = []
+
+    start = 0
+    for i in range(n_chunks):
+        width = nbits // n_chunks + (1 if i < nbits % n_chunks else 0)
+        chunks.append((start, start + width))
+        start += width
+
+    return chunks
+
+
+def get_chunk_keys(
+    hashes: np.ndarray, nbits: int, chunks: list[tuple[int, int]]
+) -> np.ndarray:
+    """Value of each chunk of the given packed hashes, as a uint64 matrix of shape (chunks, hashes)"""
+
+    bits = unpack_bits(hashes, nbits)
+    keys = np.empty((len(chunks), len(hashes)), dtype=np.uint64)
+
+    for i, (start, end) in enumerate(chunks):
+        packed = np.packbits(bits[:, start:end], axis=1, bitorder="little")
+
+        padded = np.zeros((len(hashes), 8), dtype=np.uint8)
+        padded[:, : packed.shape[1]] = packed
+
+        keys[i] = padded.view(np.uint64)[:, 0]
+
+    return keys
+
+
+class HammingIndex:
+    """
+    Near-neighbor index in Hamming space based on multi-index hashing.
+
+    Every hash is split in disjoint substrings (see `get_chunks`) and each substring is stored in its own sorted
+    table, so only the hashes that share a substring with the query have to be compared.
+
+    The hashes are stored packed in a contiguous uint64 matrix, and are processed in blocks of `block_size`
+    hashes to bound the memory used to compute the substrings.
+    """
+
+    def __init__(
+        self,
+        hashes: np.ndarray,
+        nbits: int,
+        max_distance: int,
+        block_size: int = 65536,
+    ):
+        """
+        Args:
+            hashes (np.ndarray): Matrix with a row per hash, packed with `pack_hash`.
+            nbits (int): Number of bits of each hash (`hash_size**2`).
+            max_distance (int): Maximum distance (inclusive) that a hash can have to be considered a neighbor.
+            block_size (int): Number of hashes processed at once.
+        """
+
+        self.hashes = hashes
+        self.nbits = nbits
+        self.max_distance = max_distance
+        self.block_size = max(1, block_size)
+
+        self._chunks = get_chunks(nbits, max_distance)
+
+        if len(self._chunks) == 0:
+            return
+
+        keys = np.empty((len(self._chunks), len(hashes)), dtype=np.uint64)
+
+        for block_start in range(0, len(hashes), self.block_size):
+            block = hashes[block_start : block_start + self.block_size]
+            keys[:, block_start : block_start + len(block)] = get_chunk_keys(
+                block, nbits, self._chunks
+            )
+
+        self._order = np.argsort(keys, axis=1, kind="stable")
+        self._sorted_keys = np.take_along_axis(keys, self._order, axis=1)
+
+    def neighbors(
+        self, rows: np.ndarray | None = None
+    ) -> Iterator[tuple[int, np.ndarray, np.ndarray]]:
+        """
+        Find the neighbors of every hash in the index (including the hash itself). Nothing is yielded if `max_distance` is negative.
+
+        Args:
+            rows (np.ndarray | None): Indexes of the hashes whose neighbors are searched. All the hashes by default.
+
+        Yields:
+            tuple[int, np.ndarray, np.ndarray]: The index of each hash, the indexes of its neighbors
+            (sorted) and the distance to each neighbor.
+        """
+
+        if len(self._chunks) == 0:
+            return
+
+        if rows is None:
+            rows = np.arange(len(self.hashes))
+
+        for block_start in range(0, len(rows), self.block_size):
+            block_rows = rows[block_start : block_start + self.block_size]
+            block = self.hashes[block_rows]
+            keys = get_chunk_keys(block, self.nbits, self._chunks)
+
+            bounds = [
+                (
+                    np.searchsorted(sorted_keys, chunk_keys, side="left"),
+                    np.searchsorted(sorted_keys, chunk_keys, side="right"),
+                )
+                for sorted_keys, chunk_keys in zip(self._sorted_keys, keys)
+            ]
+
+            for offset in range(len(block)):
+                candidates = np.unique(
+                    np.concatenate(
+                        [
+                            order[left[offset] : right[offset]]
+                            for order, (left, right) in zip(self._order, bounds)
+                        ]
+                    )
+                )
+
+                distances = hamming_distances(self.hashes[candidates], block[offset])
+                close = distances <= self.max_distance
+
+                yield int(block_rows[offset]), candidates[close], distances[close]
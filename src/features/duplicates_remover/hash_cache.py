@@ -0,0 +1,155 @@
+import os
+import sqlite3
+import time
+
+from imagehash import ImageHash, hex_to_hash
+
+from src.utils.cache_dir import default_cache_dir
+
+# The new hashes are committed every `COMMIT_EVERY_PUTS` hashes or `COMMIT_EVERY_SECONDS` seconds, so an interrupted
+# run only loses the last hashes computed
+COMMIT_EVERY_PUTS = 1000
+COMMIT_EVERY_SECONDS = 30.0
+
+
+def default_cache_path():
+    """Path of the hash cache database"""
+
+    return os.path.join(default_cache_dir(), "hashes.db")
+
+
+class HashCache:
+    """
+    On-disk cache of image hashes, stored in a SQLite database.
+
+    An entry is only served if the file has the same size, modification time and inode as when it was hashed,
+    and if it was hashed with the same algorithm and hash size. Otherwise the entry is considered stale and
+    it is replaced the next time the file is hashed.
+
+    The new entries are committed periodically (see `COMMIT_EVERY_PUTS` and `COMMIT_EVERY_SECONDS`) and when the cache
+    is closed.
+    """
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._uncommitted_puts = 0
+        self._last_commit = time.monotonic()
+        self._closed = False
+
+        self._connection = sqlite3.connect(db_path)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS hashes (
+                path TEXT NOT NULL,
+                algorithm TEXT NOT NULL,
+                hash_size INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (path, algorithm, hash_size)
+            )
+            """
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def commit(self):
+        self._connection.commit()
+
+        self._uncommitted_puts = 0
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        if self._closed:
+            return
+
+        self.commit()
+        self._connection.close()
+        self._closed = True
+
+    def get(
+        self, path: str, file_stat: os.stat_result, algorithm: str, hash_size: int
+    ) -> ImageHash | None:
+        """Return the cached hash of a file, or None if the file is not in the cache or has changed since it was hashed"""
+
+        row = self._connection.execute(
+            "SELECT size, mtime_ns, inode, hash FROM hashes WHERE path = ? AND algorithm = ? AND hash_size = ?",
+            (os.path.abspath(path), algorithm, hash_size),
+        ).fetchone()
+
+        if row is None or tuple(row[:3]) != (
+            file_stat.st_size,
+            file_stat.st_mtime_ns,
+            file_stat.st_ino,
+        ):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return hex_to_hash(row[3])
+
+    def put(
+        self,
+        path: str,
+        file_stat: os.stat_result,
+        algorithm: str,
+        hash_size: int,
+        img_hash: ImageHash,
+    ):
+        cursor = self._connection.execute(
+            "DELETE FROM hashes WHERE path = ? AND algorithm = ? AND hash_size = ?",
+            (os.path.abspath(path), algorithm, hash_size),
+        )
+        self.evictions += cursor.rowcount
+
+        self._connection.execute(
+            "INSERT INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                os.path.abspath(path),
+                algorithm,
+                hash_size,
+                file_stat.st_size,
+                file_stat.st_mtime_ns,
+                file_stat.st_ino,
+                str(img_hash),
+            ),
+        )
+
+        self._uncommitted_puts += 1
+
+        if (
+            self._uncommitted_puts >= COMMIT_EVERY_PUTS
+            or time.monotonic() - self._last_commit >= COMMIT_EVERY_SECONDS
+        ):
+            self.commit()
+
+    def prune(self):
+        """Remove the entries of the files that no longer exist. Returns the number of entries removed"""
+
+        missing_paths = [
+            (path,)
+            for (path,) in self._connection.execute(
+                "SELECT DISTINCT path FROM hashes"
+            )
+            if not os.path.isfile(path)
+        ]
+
+        removed = self._connection.total_changes
+        self._connection.executemany("DELETE FROM hashes WHERE path = ?", missing_paths)
+        removed = self._connection.total_changes - removed
+
+        self.commit()
+        self.evictions += removed
+
+        return removed
@@ -0,0 +1,259 @@
+import os
+import sqlite3
+
+import numpy as np
+
+from src.features.duplicates_remover.hamming_index import (
+    get_chunk_keys,
+    get_chunks,
+    hamming_distances,
+    hash_words,
+)
+from src.utils.rich_console import print_error
+
+# Maximum number of variables in a single SQLite statement (the limit of old SQLite versions)
+_SQLITE_MAX_VARIABLES = 999
+
+
+class LibraryIndex:
+    """
+    Persistent index with the hashes of a library, stored in a SQLite database.
+
+    Besides the packed hash of each image, the database stores the substrings of the hashes used by `HammingIndex`
+    in an indexed table, so the images of a new batch can be compared against the library with a few indexed
+    lookups per image, without loading or scanning the whole library.
+    """
+
+    def __init__(self, db_path: str, algorithm: str, hash_size: int, max_distance: int):
+        """
+        Args:
+            db_path (str): Path of the database. It is created if it does not exist.
+            algorithm (str): Name of the hash algorithm. An existing index can only be used with the same algorithm and hash size.
+            max_distance (int): Maximum distance (inclusive) that the queries will use.
+        """
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self.db_path = db_path
+        self.nbits = hash_size**2
+
+        self._connection = sqlite3.connect(db_path)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS settings (
+                algorithm TEXT NOT NULL,
+                hash_size INTEGER NOT NULL,
+                max_distance INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS images (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                hash BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk INTEGER NOT NULL,
+                key INTEGER NOT NULL,
+                image INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS chunks_by_key ON chunks (chunk, key);
+            CREATE INDEX IF NOT EXISTS chunks_by_image ON chunks (image);
+            """
+        )
+
+        settings = self._connection.execute(
+            "SELECT algorithm, hash_size, max_distance FROM settings"
+        ).fetchone()
+
+        if settings is None:
+            self._connection.execute(
+                "INSERT INTO settings VALUES (?, ?, ?)",
+                (algorithm, hash_size, max_distance),
+            )
+            settings = (algorithm, hash_size, max_distance)
+
+        if tuple(settings[:2]) != (algorithm, hash_size):
+            print_error(
+                f"The index {db_path} was created with another hash",
+                descr=f"The index uses the {settings[0]} algorithm with a hash size of {settings[1]}. Run the script with the same hash options, or use another index.",
+            )
+
+        self._max_distance = settings[2]
+
+        if max_distance > self._max_distance:
+            # The stored substrings are too long to find every image at this distance
+            self._max_distance = max_distance
+            self._rebuild_chunks()
+
+        self._chunks = get_chunks(self.nbits, self._max_distance)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self._connection.commit()
+        self._connection.close()
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def _insert_chunks(self, ids: list[int], hashes: np.ndarray):
+        keys = get_chunk_keys(hashes, self.nbits, self._chunks).view(np.int64)
+
+        self._connection.executemany(
+            "INSERT INTO chunks VALUES (?, ?, ?)",
+            (
+                (chunk, key, image_id)
+                for chunk, chunk_keys in enumerate(keys.tolist())
+                for key, image_id in zip(chunk_keys, ids)
+            ),
+        )
+
+    def _rebuild_chunks(self):
+        self._chunks = get_chunks(self.nbits, self._max_distance)
+
+        self._connection.execute("DELETE FROM chunks")
+        self._connection.execute(
+            "UPDATE settings SET max_distance = ?", (self._max_distance,)
+        )
+
+        rows = self._connection.execute("SELECT id, hash FROM images").fetchall()
+
+        if len(rows) > 0:
+            self._insert_chunks(
+                [image_id for image_id, _ in rows],
+                self._load_hashes([image_hash for _, image_hash in rows]),
+            )
+
+    def _load_hashes(self, blobs: list[bytes]):
+        return np.frombuffer(b"".join(blobs), dtype=np.uint64).reshape(
+            len(blobs), hash_words(self.nbits)
+        )
+
+    def _remove(self, ids: list[int]):
+        for start in range(0, len(ids), _SQLITE_MAX_VARIABLES):
+            batch = ids[start : start + _SQLITE_MAX_VARIABLES]
+            placeholders = ",".join("?" * len(batch))
+
+            self._connection.execute(
+                f"DELETE FROM chunks WHERE image IN ({placeholders})", batch
+            )
+            self._connection.execute(
+                f"DELETE FROM images WHERE id IN ({placeholders})", batch
+            )
+
+    def load(self):
+        """
+        Read every image of the index.
+
+        Returns:
+            tuple[list[str], np.ndarray]: The paths of the images and their packed hashes, in the order they were added.
+        """
+
+        rows = self._connection.execute(
+            "SELECT path, hash FROM images ORDER BY id"
+        ).fetchall()
+
+        return [path for path, _ in rows], self._load_hashes(
+            [image_hash for _, image_hash in rows]
+        )
+
+    def query(self, hashes: np.ndarray, max_distance: int):
+        """
+        Find the images of the library similar to each of the given hashes. Images of the index that no longer exist
+        are removed from it instead of being returned.
+
+        Args:
+            hashes (np.ndarray): Packed hashes (one row per image) to compare against the library.
+            max_distance (int): Maximum distance (inclusive) of the returned images. It can not be greater than the one used to open the index.
+
+        Returns:
+            list[tuple[int, str, int]]: The row of the hash in `hashes`, the path of the similar image of the library, and their distance.
+        """
+
+        if len(self._chunks) == 0 or len(hashes) == 0:
+            return []
+
+        keys = get_chunk_keys(hashes, self.nbits, self._chunks).view(np.int64)
+
+        matches: list[tuple[int, str, int]] = []
+        missing_ids: list[int] = []
+
+        for row in range(len(hashes)):
+            candidate_ids: set[int] = set()
+
+            for chunk, key in enumerate(keys[:, row].tolist()):
+                candidate_ids.update(
+                    image_id
+                    for (image_id,) in self._connection.execute(
+                        "SELECT image FROM chunks WHERE chunk = ? AND key = ?",
+                        (chunk, key),
+                    )
+                )
+
+            candidate_ids_list = sorted(candidate_ids)
+
+            for start in range(0, len(candidate_ids_list), _SQLITE_MAX_VARIABLES):
+                batch = candidate_ids_list[start : start + _SQLITE_MAX_VARIABLES]
+
+                candidates = self._connection.execute(
+                    f"SELECT id, path, hash FROM images WHERE id IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+
+                distances = hamming_distances(
+                    self._load_hashes([image_hash for _, _, image_hash in candidates]),
+                    hashes[row],
+                )
+
+                for (image_id, path, _), distance in zip(
+                    candidates, distances.tolist()
+                ):
+                    if distance > max_distance:
+                        continue
+
+                    if not os.path.isfile(path):
+                        missing_ids.append(image_id)
+                        continue
+
+                    matches.append((row, path, distance))
+
+        self._remove(sorted(set(missing_ids)))
+
+        return matches
+
+    def add(self, paths: list[str], hashes: np.ndarray):
+        """Add the images to the index, replacing the images already indexed with the same path"""
+
+        paths = [os.path.abspath(path) for path in paths]
+
+        existing_ids: list[int] = []
+
+        for start in range(0, len(paths), _SQLITE_MAX_VARIABLES):
+            batch = paths[start : start + _SQLITE_MAX_VARIABLES]
+
+            existing_ids += [
+                image_id
+                for (image_id,) in self._connection.execute(
+                    f"SELECT id FROM images WHERE path IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+            ]
+
+        self._remove(existing_ids)
+
+        ids: list[int] = []
+
+        for path, image_hash in zip(paths, hashes):
+            cursor = self._connection.execute(
+                "INSERT INTO images (path, hash) VALUES (?, ?)",
+                (path, image_hash.tobytes()),
+            )
+            ids.append(cursor.lastrowid)
+
+        if len(ids) > 0:
+            self._insert_chunks(ids, hashes)
+
+        self._connection.commit()
@@ -0,0 +1,63 @@
+import os
+import shutil
+import sys
+from typing import Literal
+
+LinkMode = Literal["hardlink"] | Literal["reflink"]
+
+# ioctl request to clone a file with copy-on-write (FICLONE, from linux/fs.h)
+_FICLONE = 0x40049409
+
+
+def reflink_supported():
+    return sys.platform.startswith("linux")
+
+
+def _clone(source: str, destination: str):
+    import fcntl
+
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+
+
+def link_file(kept_path: str, path: str, link_mode: LinkMode):
+    """
+    Replace `path` with a hardlink or a copy-on-write clone (reflink) of `kept_path`, which must have the same content.
+
+    The link is created with a temporary name in the same directory and then renamed over `path`, so `path` always
+    exists, either with the original file or with the link. A clone keeps the permissions and dates of the replaced file.
+
+    Returns:
+        int | None: The bytes reclaimed (0 if the data of the replaced file is still used by other hardlinks), or
+        None if `path` is already a hardlink to `kept_path`, so nothing has been linked.
+
+    Raises:
+        OSError: If the link can not be created (e.g. the files are in different filesystems, or the filesystem
+        does not support clones). The original file is kept in this case.
+    """
+
+    if os.path.samefile(kept_path, path):
+        return None
+
+    file_stat = os.stat(path)
+
+    temp_path = os.path.join(
+        os.path.dirname(path),
+        f".{os.path.basename(path)}.{os.getpid()}.pygallery-tmp",
+    )
+
+    try:
+        if link_mode == "hardlink":
+            os.link(kept_path, temp_path)
+        else:
+            _clone(kept_path, temp_path)
+            shutil.copystat(path, temp_path)
+
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.lexists(temp_path):
+            os.remove(temp_path)
+
+        raise
+
+    return file_stat.st_size if file_stat.st_nlink == 1 else 0
@@ -0,0 +1,54 @@
+import numpy as np
+from PIL import Image
+
+# The 8 orientations of an image: the 4 rotations by 90 degrees, with and without mirroring (None is the identity)
+DIHEDRAL_TRANSFORMS: list[Image.Transpose | None] = [
+    None,
+    Image.Transpose.ROTATE_90,
+    Image.Transpose.ROTATE_180,
+    Image.Transpose.ROTATE_270,
+    Image.Transpose.FLIP_LEFT_RIGHT,
+    Image.Transpose.FLIP_TOP_BOTTOM,
+    Image.Transpose.TRANSPOSE,
+    Image.Transpose.TRANSVERSE,
+]
+
+# Size of the grayscale grid used to choose the canonical orientation of an image
+ORIENTATION_GRID_SIZE = 16
+
+
+def _quadrant_brightness(grid: Image.Image):
+    """Brightness of the top-left, top-right and bottom-left quadrants of a square grid"""
+
+    pixels = np.asarray(grid, dtype=np.float64)
+    half = len(pixels) // 2
+
+    return (
+        pixels[:half, :half].sum(),
+        pixels[:half, half:].sum(),
+        pixels[half:, :half].sum(),
+    )
+
+
+def canonical_orientation(img: Image.Image):
+    """
+    Rotate and/or mirror an image to a canonical orientation, so any of its 8 orientations gives the same image.
+
+    The canonical orientation places the brightest quadrant of the image at the top-left corner, and the brightest
+    of its two neighbour quadrants at the top-right corner. It is chosen from the brightness of whole quadrants
+    (instead of, for example, the smallest of the 8 hashes of the image), so small changes in the image, like a
+    new compression, do not change the orientation chosen.
+    """
+
+    grid = img.convert("L").resize(
+        (ORIENTATION_GRID_SIZE, ORIENTATION_GRID_SIZE), Image.Resampling.BOX
+    )
+
+    best_transform = max(
+        DIHEDRAL_TRANSFORMS,
+        key=lambda transform: _quadrant_brightness(
+            grid if transform is None else grid.transpose(transform)
+        ),
+    )
+
+    return img if best_transform is None else img.transpose(best_transform)
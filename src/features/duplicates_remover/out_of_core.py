@@ -0,0 +1,362 @@
+import os
+from itertools import islice
+from typing import Iterator
+
+import numpy as np
+
+from src.features.duplicates_remover.hamming_index import (
+    get_chunk_keys,
+    get_chunks,
+    hash_words,
+    pair_distances,
+)
+
+# Record of the spill files: the value of a chunk of a hash and the row of the hash
+_RECORD = np.dtype([("key", "<u8"), ("id", "<u8")])
+
+# Odd 64-bit constant used to spread the chunk keys between the partitions (Fibonacci hashing)
+_PARTITION_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+# Rough memory used by each image while it is hashed (its path, stat result and Python objects)
+HASHING_BYTES_PER_IMAGE = 4096
+
+# Rough memory used outside of the budget for each file found in the input directory: its path in the lists of files
+# of the run, and its size while the identical files are searched and while a policy is applied to its group
+SCANNED_BYTES_PER_FILE = 512
+
+# Pair found by the search: the rows of its two hashes and their distance
+_PAIR = np.dtype([("i", "<i8"), ("j", "<i8"), ("distance", "<u2")])
+
+# Number of pairs converted to an array at once while they are grouped
+GROUPING_BLOCK_PAIRS = 65536
+
+# Maximum memory used to group the pairs, for each pair and for each image in some pair
+GROUPING_BYTES_PER_PAIR = 96
+GROUPING_BYTES_PER_IMAGE = 64
+
+
+class HashSpill:
+    """
+    Append-only on-disk store of the packed hashes of the images and their paths, so neither of them has to be kept
+    in memory. The images are identified by their row in the store.
+    """
+
+    def __init__(self, directory: str, nbits: int):
+        self.nbits = nbits
+        self.words = hash_words(nbits)
+
+        self._hashes_path = os.path.join(directory, "hashes.bin")
+        self._paths_path = os.path.join(directory, "paths.bin")
+        self._offsets_path = os.path.join(directory, "offsets.bin")
+
+        self._hashes_file = open(self._hashes_path, "wb")
+        self._paths_file = open(self._paths_path, "wb")
+        self._offsets_file = open(self._offsets_path, "wb")
+
+        self._length = 0
+        self._paths_size = 0
+        self._hashes: np.memmap | None = None
+        self._offsets: np.memmap | None = None
+
+    def __len__(self):
+        return self._length
+
+    def append(self, paths: list[str], hashes: np.ndarray):
+        encoded_paths = [path.encode("utf-8", "surrogateescape") for path in paths]
+
+        offsets = np.cumsum([0] + [len(path) for path in encoded_paths[:-1]])
+        (offsets + self._paths_size).astype(np.uint64).tofile(self._offsets_file)
+
+        for path in encoded_paths:
+            self._paths_file.write(path)
+            self._paths_size += len(path)
+
+        np.ascontiguousarray(hashes, dtype=np.uint64).tofile(self._hashes_file)
+        self._length += len(paths)
+
+    def finish(self):
+        """Stop appending images, and map the stored hashes to be read"""
+
+        for file in (self._hashes_file, self._paths_file, self._offsets_file):
+            file.close()
+
+        if self._length > 0:
+            self._hashes = np.memmap(
+                self._hashes_path, dtype=np.uint64, mode="r"
+            ).reshape(self._length, self.words)
+            self._offsets = np.memmap(self._offsets_path, dtype=np.uint64, mode="r")
+
+    @property
+    def hashes(self) -> np.ndarray:
+        if self._hashes is None:
+            return np.zeros((0, self.words), dtype=np.uint64)
+
+        return self._hashes
+
+    def paths(self, ids: list[int]):
+        """Read the paths of the given rows"""
+
+        paths: list[str] = []
+
+        with open(self._paths_path, "rb") as f:
+            for i in ids:
+                start = int(self._offsets[i])
+                end = (
+                    int(self._offsets[i + 1])
+                    if i + 1 < self._length
+                    else self._paths_size
+                )
+
+                f.seek(start)
+                paths.append(f.read(end - start).decode("utf-8", "surrogateescape"))
+
+        return paths
+
+
+def _write_partitions(
+    spill: HashSpill,
+    chunk: tuple[int, int],
+    partition_paths: list[str],
+    block_rows: int,
+):
+    """Write a record for each hash with the value of one of its chunks to the partition given by that value"""
+
+    files = [open(path, "wb") for path in partition_paths]
+    shift = np.uint64(64 - max(1, (len(files) - 1).bit_length()))
+
+    try:
+        for block_start in range(0, len(spill), block_rows):
+            block = np.asarray(spill.hashes[block_start : block_start + block_rows])
+
+            records = np.empty(len(block), dtype=_RECORD)
+            records["key"] = get_chunk_keys(block, spill.nbits, [chunk])[0]
+            records["id"] = np.arange(block_start, block_start + len(block))
+
+            if len(files) == 1:
+                records.tofile(files[0])
+                continue
+
+            partitions = (records["key"] * _PARTITION_MULTIPLIER) >> shift
+            partitions %= np.uint64(len(files))
+
+            for partition in np.unique(partitions).tolist():
+                records[partitions == partition].tofile(files[partition])
+    finally:
+        for file in files:
+            file.close()
+
+
+def _bucket_bounds(keys: np.ndarray):
+    """End (exclusive) and size of the bucket of each key of a sorted array of keys"""
+
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    sizes = np.diff(np.append(starts, len(keys)))
+
+    return np.repeat(starts + sizes, sizes), np.repeat(sizes, sizes)
+
+
+def _partition_pairs(
+    spill: HashSpill,
+    records: np.ndarray,
+    chunks: list[tuple[int, int]],
+    chunk_index: int,
+    max_distance: int,
+) -> Iterator[tuple[int, int, int]]:
+    """Find the similar pairs between the hashes of each bucket (records with the same key) of a partition"""
+
+    records = records[np.argsort(records["key"], kind="stable")]
+
+    # Records alone in their bucket can not be in any pair
+    _, sizes = _bucket_bounds(records["key"])
+    records = records[sizes > 1]
+
+    if len(records) == 0:
+        return
+
+    ends, _ = _bucket_bounds(records["key"])
+
+    ids = records["id"].astype(np.int64)
+    hashes = np.asarray(spill.hashes[ids])
+
+    del records, sizes
+
+    # Compare each record with the record `offset` positions after it in the same bucket, for all the records at once
+    active = np.arange(len(ids))
+    offset = 0
+
+    while True:
+        offset += 1
+        active = active[active + offset < ends[active]]
+
+        if len(active) == 0:
+            break
+
+        distances = pair_distances(hashes, active, active + offset)
+        close = distances <= max_distance
+
+        rows_a, rows_b = active[close], active[close] + offset
+        distances = distances[close]
+
+        if chunk_index > 0 and len(rows_a) > 0:
+            # A pair that also shares a previous chunk has already been found with that chunk
+            previous = chunks[:chunk_index]
+            new_pair = ~np.any(
+                get_chunk_keys(hashes[rows_a], spill.nbits, previous)
+                == get_chunk_keys(hashes[rows_b], spill.nbits, previous),
+                axis=0,
+            )
+
+            rows_a, rows_b, distances = (
+                rows_a[new_pair],
+                rows_b[new_pair],
+                distances[new_pair],
+            )
+
+        yield from zip(
+            np.minimum(ids[rows_a], ids[rows_b]).tolist(),
+            np.maximum(ids[rows_a], ids[rows_b]).tolist(),
+            distances.tolist(),
+        )
+
+
+def find_similar_pairs_out_of_core(
+    spill: HashSpill,
+    max_distance: int,
+    *,
+    work_dir: str,
+    max_memory: int,
+) -> Iterator[tuple[int, int, int]]:
+    """
+    Out-of-core version of the multi-index hashing search of `HammingIndex`, for hashes that do not fit in memory.
+
+    For each chunk of the hashes (see `get_chunks`), a record with the value of the chunk and the row of the hash
+    is written to a spill file, partitioned by value so the search of each partition fits in `max_memory`. Each partition is then
+    loaded and sorted on its own, and the hashes that share the value of the chunk (a bucket) are compared.
+
+    Args:
+        spill (HashSpill): The hashes, already finished.
+        max_distance (int): Maximum distance (inclusive) of the similar pairs.
+        work_dir (str): Directory for the spill files.
+        max_memory (int): Memory budget in bytes for the records and hashes loaded at once.
+
+    Yields:
+        tuple[int, int, int]: The rows `i < j` of each pair of similar hashes, and their distance. Each pair is yielded once.
+    """
+
+    chunks = get_chunks(spill.nbits, max_distance)
+
+    if len(chunks) == 0 or len(spill) < 2:
+        return
+
+    # Memory used by each record of a partition while it is searched: the record and its sorted copy, the bucket
+    # bounds, the hash of the record and the temporary arrays of the comparisons (about 4 hashes per record)
+    bytes_per_record = 128 + 4 * spill.words * 8
+    partition_records = max(1, max_memory // 2 // bytes_per_record)
+    n_partitions = -(-len(spill) // partition_records)
+
+    # Memory used by each hash while the records are written: its bits unpacked (one byte per bit), and its record
+    bytes_per_row = spill.nbits + spill.words * 8 + 64
+    block_rows = max(1, max_memory // 2 // bytes_per_row)
+
+    partition_paths = [
+        os.path.join(work_dir, f"partition-{i}.bin") for i in range(n_partitions)
+    ]
+
+    for chunk_index, chunk in enumerate(chunks):
+        _write_partitions(spill, chunk, partition_paths, block_rows)
+
+        for partition_path in partition_paths:
+            records = np.fromfile(partition_path, dtype=_RECORD)
+
+            yield from _partition_pairs(
+                spill, records, chunks, chunk_index, max_distance
+            )
+
+            del records
+
+    for partition_path in partition_paths:
+        os.remove(partition_path)
+
+
+def group_spilled_pairs(
+    spill: HashSpill,
+    pairs: Iterator[tuple[int, int, int]],
+    *,
+    block_pairs: int = GROUPING_BLOCK_PAIRS,
+) -> Iterator[tuple[list[str], float, float]]:
+    """
+    Same as `group_similar_pairs`, for the images of a `HashSpill`.
+
+    The pairs are stored in arrays (read from `pairs` in blocks of `block_pairs`) and grouped at once, with rounds of
+    vectorized union-find over the images that are in some pair. This memory is not part of the `max_memory` budget
+    of the search: at most about `GROUPING_BYTES_PER_PAIR` bytes per pair and `GROUPING_BYTES_PER_IMAGE` bytes per
+    image in some pair. The groups are yielded one by one (ordered by their first row), reading their paths from the
+    spill.
+    """
+
+    pairs = iter(pairs)
+    blocks: list[np.ndarray] = []
+
+    while len(block := np.fromiter(islice(pairs, block_pairs), dtype=_PAIR)) > 0:
+        blocks.append(block)
+
+    if len(blocks) == 0:
+        return
+
+    found = np.concatenate(blocks)
+    del blocks
+
+    # Compact index of each image that is in some pair (`rows` is sorted), and of the two images of each pair
+    rows, endpoints = np.unique(
+        np.concatenate((found["i"], found["j"])), return_inverse=True
+    )
+    a, b = endpoints[: len(found)], endpoints[len(found) :]
+    distances = found["distance"]
+
+    del found, endpoints
+
+    # Each image points to the smallest image of its group once no pair joins two different labels
+    labels = np.arange(len(rows))
+
+    while True:
+        labels_a, labels_b = labels[a], labels[b]
+        unmerged = labels_a != labels_b
+
+        if not unmerged.any():
+            break
+
+        np.minimum.at(
+            labels,
+            np.maximum(labels_a, labels_b)[unmerged],
+            np.minimum(labels_a, labels_b)[unmerged],
+        )
+
+        while not np.array_equal(jumped := labels[labels], labels):
+            labels = jumped
+
+    del labels_a, labels_b, unmerged
+
+    # Minimum and maximum distance of the matched pairs of each group, by the root of the group
+    low = np.full(len(rows), spill.nbits, dtype=np.int32)
+    high = np.zeros(len(rows), dtype=np.int32)
+    np.minimum.at(low, labels[a], distances)
+    np.maximum.at(high, labels[a], distances)
+
+    del a, b, distances
+
+    order = np.argsort(labels, kind="stable")
+    roots = labels[order]
+    starts = np.flatnonzero(np.concatenate(([True], roots[1:] != roots[:-1])))
+    ends = np.append(starts[1:], len(order))
+
+    def to_similarity(distance: int):
+        return round(100 * (1 - distance / spill.nbits), 2)
+
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        root = roots[start]
+
+        yield (
+            spill.paths(rows[order[start:end]].tolist()),
+            to_similarity(int(high[root])),
+            to_similarity(int(low[root])),
+        )
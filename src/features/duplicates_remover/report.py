@@ -0,0 +1,75 @@
+import csv
+import json
+import os
+from typing import Literal
+
+ReportAction = (
+    Literal["keep"]
+    | Literal["remove"]
+    | Literal["link"]
+    | Literal["none"]
+    | Literal["failed"]
+)
+
+
+class GroupReportWriter:
+    """
+    Write the groups of duplicates to a report file as they are processed, without keeping them in memory.
+
+    The format is chosen by the extension of the file: `.csv` writes a row for each file of each group, and any
+    other extension writes a JSON object for each group (JSON Lines).
+    """
+
+    CSV_COLUMNS = ["group", "min_similarity", "max_similarity", "path", "size", "action"]
+
+    def __init__(self, report_path: str):
+        self.report_path = report_path
+        self.is_csv = os.path.splitext(report_path)[-1].lower() == ".csv"
+
+        self._file = open(report_path, "w", newline="", encoding="utf-8")
+        self._csv_writer = None
+
+        if self.is_csv:
+            self._csv_writer = csv.writer(self._file)
+            self._csv_writer.writerow(self.CSV_COLUMNS)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self._file.close()
+
+    def write_group(
+        self,
+        group_number: int,
+        min_similarity: float,
+        max_similarity: float,
+        files: list[tuple[str, int | None, ReportAction]],
+    ):
+        """
+        Args:
+            files (list[tuple[str, int | None, ReportAction]]): The path, size (None if the file no longer exists) and action of each file of the group.
+        """
+
+        if self._csv_writer is not None:
+            for path, size, action in files:
+                self._csv_writer.writerow(
+                    [group_number, min_similarity, max_similarity, path, size, action]
+                )
+
+        else:
+            self._file.write(
+                json.dumps(
+                    {
+                        "group": group_number,
+                        "min_similarity": min_similarity,
+                        "max_similarity": max_similarity,
+                        "files": [
+                            {"path": path, "size": size, "action": action}
+                            for path, size, action in files
+                        ],
+                    },
+                    ensure_ascii=False,
+                )
+                + "\n"
+            )
@@ -0,0 +1,105 @@
+import os
+from hashlib import blake2b
+
+import numpy as np
+
+from src.features.duplicates_remover.hamming_index import hash_words
+from src.features.duplicates_remover.library_index import LibraryIndex
+
+
+def shard_of(path: str, root: str, shards: int):
+    """
+    Shard (from 0 to `shards - 1`) of a file, given by a hash of its path relative to the input directory. It is the
+    same in every run and in every machine, even if the input directory is mounted in a different path.
+    """
+
+    relative_path = os.path.relpath(path, root).replace(os.sep, "/")
+
+    digest = blake2b(
+        relative_path.encode("utf-8", "surrogateescape"), digest_size=8
+    ).digest()
+
+    return int.from_bytes(digest, "little") % shards
+
+
+def select_shard(paths: list[str], root: str, shard: int, shards: int):
+    """The files of a shard (numbered from 1 to `shards`), keeping their order"""
+
+    return [path for path in paths if shard_of(path, root, shards) == shard - 1]
+
+
+def default_shard_index_path(shard: int, shards: int):
+    return f"shard-{shard}-of-{shards}.db"
+
+
+def write_shard_index(
+    db_path: str,
+    paths: list[str],
+    hashes: np.ndarray,
+    *,
+    algorithm: str,
+    hash_size: int,
+    max_distance: int,
+):
+    """
+    Write the hashes of a shard to a standalone index file (a `LibraryIndex`), replacing the file if it exists, so
+    an index never keeps images of a previous run.
+    """
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    with LibraryIndex(db_path, algorithm, hash_size, max_distance) as index:
+        index.add(paths, hashes)
+
+
+def load_shard_indexes(db_paths: list[str], *, algorithm: str, hash_size: int):
+    """
+    Read the images of several shard indexes. Each image is kept once (the first time it is found), and the images
+    that no longer exist are skipped.
+
+    Returns:
+        tuple[list[str], np.ndarray]: The paths of the images and their packed hashes.
+    """
+
+    paths: list[str] = []
+    hashes: list[np.ndarray] = []
+    seen_paths: set[str] = set()
+
+    for db_path in db_paths:
+        # A maximum distance of 0 avoids rebuilding the substrings stored in the index, which are not used here
+        with LibraryIndex(db_path, algorithm, hash_size, 0) as index:
+            shard_paths, shard_hashes = index.load()
+
+        keep = [path not in seen_paths and os.path.isfile(path) for path in shard_paths]
+
+        for path, kept in zip(shard_paths, keep):
+            if kept:
+                paths.append(path)
+                seen_paths.add(path)
+
+        hashes.append(shard_hashes[np.array(keep, dtype=bool)])
+
+    if len(hashes) == 0:
+        return paths, np.zeros((0, hash_words(hash_size**2)), dtype=np.uint64)
+
+    return paths, np.concatenate(hashes)
+
+
+def add_identical_copies(
+    paths: list[str], hashes: np.ndarray, exact_groups: list[list[str]]
+):
+    """Add the identical copies of the hashed images (the rest of their exact group) with the hash of the image"""
+
+    row_of = {path: i for i, path in enumerate(paths)}
+
+    copies = [
+        (copy, row_of[group[0]])
+        for group in exact_groups
+        if group[0] in row_of
+        for copy in group[1:]
+    ]
+
+    return paths + [copy for copy, _ in copies], np.concatenate(
+        (hashes, hashes[[row for _, row in copies]])
+    )
@@ -0,0 +1,266 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import blake2b
+from io import BytesIO
+from math import ceil, sqrt
+
+from PIL import Image, ImageDraw, ImageOps
+
+from src.features.duplicates_remover.embedded_previews import (
+    PreviewExtractor,
+    has_embedded_preview,
+)
+from src.features.duplicates_remover.exact_duplicates import partial_digest
+from src.utils.cache_dir import default_cache_dir
+from src.utils.rich_console import progress_bar
+
+# Maximum width and height (in pixels) of the thumbnails
+THUMBNAIL_SIZE = 256
+
+# Thumbnails removed by `ThumbnailCache.prune`: the ones not used for this number of days, and the least recently used
+# ones while the cache is larger than this size
+THUMBNAIL_MAX_AGE_DAYS = 90
+THUMBNAIL_CACHE_MAX_BYTES = 500 * 10**6
+
+# Height of the label drawn under each image of a contact sheet
+_LABEL_HEIGHT = 20
+
+_SHEET_BACKGROUND = (255, 255, 255)
+
+
+def default_thumbnail_dir():
+    return os.path.join(default_cache_dir(), "thumbnails")
+
+
+def thumbnail_fingerprint(filepath: str):
+    """
+    Fingerprint of the content of a file: a digest of its size and its first and last bytes. Copies of a file
+    share the same thumbnail, and a modified file gets a new one.
+    """
+
+    size = os.path.getsize(filepath)
+
+    return blake2b(
+        partial_digest(filepath, size) + size.to_bytes(8, "little"), digest_size=16
+    ).hexdigest()
+
+
+def make_thumbnail(image: str | bytes, thumbnail_path: str, size: int):
+    """
+    Save a JPEG thumbnail of an image (a path or the bytes of an embedded preview), in the right orientation.
+    Errors (like a truncated image or a full disk) are not raised, so a single image does not stop the others.
+
+    Returns:
+        bool: Whether the thumbnail has been created.
+    """
+
+    # Write to a temporary file first, so a thumbnail is never read half-written
+    temp_path = f"{thumbnail_path}.{os.getpid()}.tmp"
+
+    try:
+        with Image.open(BytesIO(image) if isinstance(image, bytes) else image) as img:
+            # Let the decoder downscale the image while decoding it (up to 1/8 for JPEG files)
+            img.draft("RGB", (size, size))
+
+            thumbnail = ImageOps.exif_transpose(img).convert("RGB")
+            thumbnail.thumbnail((size, size))
+
+        thumbnail.save(temp_path, "JPEG", quality=85)
+        os.replace(temp_path, thumbnail_path)
+    except Exception:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+        return False
+
+    return True
+
+
+def _make_thumbnails(jobs: list[tuple[str | bytes, str]], size: int):
+    return [
+        make_thumbnail(image, thumbnail_path, size) for image, thumbnail_path in jobs
+    ]
+
+
+class ThumbnailCache:
+    """
+    Directory with a small JPEG thumbnail of each image, named after the fingerprint of its content
+    (see `thumbnail_fingerprint`), so the thumbnails are reused between groups and between runs. The modification
+    time of a thumbnail is updated each time it is reused, so `prune` removes the ones that are no longer used.
+    """
+
+    def __init__(self, cache_dir: str, *, size: int = THUMBNAIL_SIZE, workers: int = 1):
+        """
+        Args:
+            cache_dir (str): Directory of the thumbnails. It is created if it does not exist.
+            size (int): Maximum width and height of the thumbnails.
+            workers (int): Number of processes used to create the thumbnails.
+        """
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.cache_dir = cache_dir
+        self.size = size
+        self.workers = workers
+
+        self._thumbnails: dict[str, str | None] = {}
+
+    def _thumbnail_path(self, fingerprint: str):
+        return os.path.join(self.cache_dir, f"{fingerprint}-{self.size}.jpg")
+
+    def prepare(self, filepaths: list[str], *, chunk_size: int = 16):
+        """
+        Create the missing thumbnails of the given images before they are displayed.
+        RAW and HEIC images are thumbnailed from their embedded JPEG preview.
+        """
+
+        missing: list[tuple[str, str]] = []
+
+        for filepath in dict.fromkeys(filepaths):
+            if filepath in self._thumbnails:
+                continue
+
+            try:
+                thumbnail_path = self._thumbnail_path(thumbnail_fingerprint(filepath))
+            except OSError:
+                self._thumbnails[filepath] = None
+                continue
+
+            self._thumbnails[filepath] = thumbnail_path
+
+            try:
+                # Mark the thumbnail as used
+                os.utime(thumbnail_path)
+            except OSError:
+                missing.append((filepath, thumbnail_path))
+
+        if len(missing) == 0:
+            return
+
+        with PreviewExtractor() as preview_extractor:
+            previews = preview_extractor.extract(
+                [filepath for filepath, _ in missing if has_embedded_preview(filepath)]
+            )
+
+        jobs = [
+            (previews.get(filepath, filepath), thumbnail_path)
+            for filepath, thumbnail_path in missing
+        ]
+        chunks = [
+            jobs[start : start + chunk_size]
+            for start in range(0, len(jobs), chunk_size)
+        ]
+
+        with progress_bar() as p:
+            task = p.add_task("Creating thumbnails:", total=len(jobs))
+
+            if self.workers <= 1:
+                for chunk in chunks:
+                    _make_thumbnails(chunk, self.size)
+                    p.advance(task, len(chunk))
+
+            else:
+                with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                    for chunk_results in executor.map(
+                        _make_thumbnails, chunks, [self.size] * len(chunks)
+                    ):
+                        p.advance(task, len(chunk_results))
+
+        for filepath, thumbnail_path in missing:
+            if not os.path.isfile(thumbnail_path):
+                self._thumbnails[filepath] = None
+
+    def prune(
+        self,
+        *,
+        max_age_days: float = THUMBNAIL_MAX_AGE_DAYS,
+        max_bytes: int = THUMBNAIL_CACHE_MAX_BYTES,
+    ):
+        """
+        Remove the thumbnails not used in the last `max_age_days` days, and then the least recently used ones until
+        the cache takes at most `max_bytes`. Returns the number of thumbnails removed.
+        """
+
+        thumbnails: list[tuple[float, int, str]] = []
+
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        file_stat = entry.stat(follow_symlinks=False)
+                        thumbnails.append(
+                            (file_stat.st_mtime, file_stat.st_size, entry.path)
+                        )
+                except OSError:
+                    continue
+
+        # Least recently used first
+        thumbnails.sort()
+
+        min_mtime = time.time() - max_age_days * 24 * 60 * 60
+        total_bytes = sum(size for _, size, _ in thumbnails)
+        removed = 0
+
+        for mtime, size, path in thumbnails:
+            if mtime >= min_mtime and total_bytes <= max_bytes:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+            total_bytes -= size
+            removed += 1
+
+        return removed
+
+    def get(self, filepath: str) -> str | None:
+        """Path of the thumbnail of an image, or None if the image can not be thumbnailed"""
+
+        if filepath not in self._thumbnails:
+            self.prepare([filepath])
+
+        return self._thumbnails[filepath]
+
+
+def build_contact_sheet(
+    thumbnails: list[str | None], labels: list[str], *, size: int = THUMBNAIL_SIZE
+):
+    """
+    Compose the thumbnails of a group of images in a single image, with a grid of cells of `size` pixels
+    and a label under each thumbnail. Missing thumbnails leave their cell empty.
+    """
+
+    n_cols = max(1, ceil(sqrt(len(thumbnails))))
+    n_rows = max(1, ceil(len(thumbnails) / n_cols))
+
+    cell_height = size + _LABEL_HEIGHT
+
+    sheet = Image.new("RGB", (n_cols * size, n_rows * cell_height), _SHEET_BACKGROUND)
+    draw = ImageDraw.Draw(sheet)
+
+    for i, (thumbnail_path, label) in enumerate(zip(thumbnails, labels)):
+        left, top = (i % n_cols) * size, (i // n_cols) * cell_height
+
+        if thumbnail_path is not None:
+            try:
+                with Image.open(thumbnail_path) as thumbnail:
+                    sheet.paste(
+                        thumbnail,
+                        (
+                            left + (size - thumbnail.width) // 2,
+                            top + (size - thumbnail.height) // 2,
+                        ),
+                    )
+            except OSError:
+                label += " (no preview)"
+        else:
+            label += " (no preview)"
+
+        draw.text((left + 4, top + size + 4), label, fill=(0, 0, 0))
+
+    return sheet
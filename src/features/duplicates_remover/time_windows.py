@@ -0,0 +1,48 @@
+from typing import Iterator
+
+import numpy as np
+
+
+def get_window_pairs(
+    rows: np.ndarray,
+    timestamps: np.ndarray,
+    models: np.ndarray,
+    window: float,
+) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """
+    Generate the candidate pairs of images taken at most `window` seconds apart, by the same camera model.
+    Images with an unknown camera model (0) can be paired with any model.
+
+    The images are sorted by capture time, and each one is paired with the image `offset` positions after it, for
+    all the images at once and for increasing offsets, until no image has another one inside its window.
+
+    Args:
+        rows (np.ndarray): Index of each image.
+        timestamps (np.ndarray): Capture time of each image, in seconds.
+        models (np.ndarray): Integer id of the camera model of each image (0 if it is unknown).
+
+    Yields:
+        tuple[np.ndarray, np.ndarray]: The indexes of the images of each candidate pair, for a batch of pairs.
+    """
+
+    order = np.argsort(timestamps, kind="stable")
+
+    rows, timestamps, models = rows[order], timestamps[order], models[order]
+
+    # End (exclusive) of the window of each image
+    ends = np.searchsorted(timestamps, timestamps + window, side="right")
+
+    active = np.arange(len(rows))
+    offset = 0
+
+    while True:
+        offset += 1
+        active = active[active + offset < ends[active]]
+
+        if len(active) == 0:
+            break
+
+        models_a, models_b = models[active], models[active + offset]
+        same_camera = (models_a == models_b) | (models_a == 0) | (models_b == 0)
+
+        yield rows[active[same_camera]], rows[active[same_camera] + offset]
@@ -0,0 +1,159 @@
+import os
+from hashlib import blake2b
+from typing import Any
+
+from exiftool import ExifToolHelper
+
+from src.features.duplicates_remover.exact_duplicates import (
+    full_digest,
+    get_sizes,
+    split_groups,
+)
+
+# Metadata tags compared between videos. Tags of any group (QuickTime, Matroska, RIFF...) are used
+VIDEO_METADATA_TAGS = [
+    "Duration",
+    "ImageWidth",
+    "ImageHeight",
+    "CompressorID",
+    "VideoCodec",
+    "CodecID",
+    "CreateDate",
+    "MediaCreateDate",
+]
+
+# Number of chunks read from each video, at evenly spaced offsets from its start to its end
+SAMPLED_CHUNKS = 8
+
+SAMPLED_CHUNK_BYTES = 256 * 1024
+
+
+def sampled_digest(filepath: str, size: int):
+    """
+    Digest of `SAMPLED_CHUNKS` chunks of a file at fixed offsets, so at most `SAMPLED_CHUNKS * SAMPLED_CHUNK_BYTES`
+    bytes are read regardless of the size of the file.
+    """
+
+    digest = blake2b()
+
+    with open(filepath, "rb") as f:
+        if size <= SAMPLED_CHUNKS * SAMPLED_CHUNK_BYTES:
+            digest.update(f.read())
+            return digest.digest()
+
+        last_offset = size - SAMPLED_CHUNK_BYTES
+
+        for i in range(SAMPLED_CHUNKS):
+            f.seek(last_offset * i // (SAMPLED_CHUNKS - 1))
+            digest.update(f.read(SAMPLED_CHUNK_BYTES))
+
+    return digest.digest()
+
+
+def _metadata_key(metadata: dict[str, Any]):
+    values = {
+        key.split(":")[-1]: str(value)
+        for key, value in metadata.items()
+        if key.split(":")[-1] in VIDEO_METADATA_TAGS
+    }
+
+    return tuple(sorted(values.items()))
+
+
+def read_video_metadata(filepaths: list[str], *, batch_size: int = 500):
+    """
+    Read the metadata tags of `VIDEO_METADATA_TAGS` of each video, with one exiftool call per batch of `batch_size`
+    videos. If exiftool is not available, no metadata is returned.
+
+    Returns:
+        dict[str, tuple[tuple[str, str], ...]]: The tags of each video, as a hashable tuple of (tag, value) pairs.
+    """
+
+    metadata_keys: dict[str, tuple[tuple[str, str], ...]] = {}
+
+    try:
+        et = ExifToolHelper()
+        et.run()
+    except Exception:
+        return metadata_keys
+
+    try:
+        for start in range(0, len(filepaths), batch_size):
+            batch = filepaths[start : start + batch_size]
+
+            try:
+                batch_metadata: list[dict[str, Any]] = et.get_tags(
+                    batch, tags=VIDEO_METADATA_TAGS
+                )
+            except Exception:
+                batch_metadata = []
+
+            if len(batch_metadata) != len(batch):
+                # Some file of the batch can not be read, so fall back to one call per file
+                batch_metadata = []
+
+                for filepath in batch:
+                    try:
+                        batch_metadata += et.get_tags(
+                            filepath, tags=VIDEO_METADATA_TAGS
+                        )
+                    except Exception:
+                        batch_metadata.append({})
+
+            for filepath, metadata in zip(batch, batch_metadata):
+                metadata_keys[filepath] = _metadata_key(metadata)
+
+    finally:
+        et.terminate()
+
+    return metadata_keys
+
+
+def find_video_duplicates(
+    filepaths: list[str],
+    file_stats: dict[str, os.stat_result] | None = None,
+    *,
+    verify: bool = False,
+):
+    """
+    Find the identical videos without decoding any frame.
+
+    The videos are grouped by size, then by their duration, resolution, codec and creation date (read in a few
+    batched exiftool calls) and then by a digest of some chunks sampled at fixed offsets (see `sampled_digest`), so
+    at most `SAMPLED_CHUNKS * SAMPLED_CHUNK_BYTES` bytes of each video are read. Each stage only runs for the videos
+    that can still be duplicates.
+
+    If `verify` is True, the groups are finally split by a digest of the whole content of their videos, so only
+    byte-identical videos are grouped, at the cost of reading every grouped video entirely.
+
+    Returns:
+        list[list[str]]: The groups of duplicated videos, each one in the same order as in `filepaths`.
+    """
+
+    sizes = get_sizes(filepaths, file_stats)
+
+    groups = split_groups([list(sizes)], lambda filepath: sizes[filepath])
+
+    if len(groups) == 0:
+        return groups
+
+    metadata_keys = read_video_metadata([path for group in groups for path in group])
+
+    groups = split_groups(groups, lambda filepath: metadata_keys.get(filepath, ()))
+    groups = split_groups(
+        groups, lambda filepath: sampled_digest(filepath, sizes[filepath])
+    )
+
+    if verify:
+        # The sampled chunks do not see a change between them, so only the whole content proves that they are
+        # identical. The videos smaller than the sampled chunks have already been read entirely
+        groups = split_groups(
+            groups,
+            lambda filepath: sizes[filepath] <= SAMPLED_CHUNKS * SAMPLED_CHUNK_BYTES
+            or full_digest(filepath),
+        )
+
+    order = {filepath: i for i, filepath in enumerate(filepaths)}
+    groups.sort(key=lambda group: order[group[0]])
+
+    return groups
@@ -48,6 +48,27 @@ def parse_arguments():
         help="Copy files instead of moving. Note that moving is generally faster than copying, specially with big files",
     )
 
+    parser.add_argument(
+        "--fix_metadata",
+        action="store_true",
+        default=False,
+        help="Fix the dates and GPS metadata of each file (like the metadata fixer, with its default options) before organizing it",
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        default=False,
+        help="Keep running and organize the files as they land in the input directory, until the script is stopped with Ctrl+C. The files are processed once they have not changed for a few seconds, so the files that are still being copied are not moved",
+    )
+
+    parser.add_argument(
+        "--watch_polling",
+        action="store_true",
+        default=False,
+        help="In the watch mode, scan the input directory every few seconds instead of using inotify. Needed for network shares, where inotify does not see the files written by other machines. Used automatically if inotify is not available",
+    )
+
     add_common_args(parser)
 
     return parser.parse_args()
@@ -2,8 +2,10 @@ import filecmp
 import os
 import re
 import shutil
+import tempfile
+import time
 from datetime import datetime
-from typing import Any, List
+from typing import Any, List, Literal
 
 import exiftool
 from exiftool import ExifToolHelper
@@ -12,10 +14,21 @@ from src.features.file_organizer.key_directives import (
     custom_app_directives,
     python_date_directives,
 )
+from src.features.metadata_fixer.metadata_fixer import fix_file_metadata
 from src.utils import rich_console
 from src.utils.check_input_path import check_input_path
 from src.utils.confirm import confirm_question
 from src.utils.file_date_getters import get_datefile_to_organize
+from src.utils.file_watcher import (
+    WATCH_BATCH_SIZE,
+    WATCH_POLL_SECONDS,
+    InotifyWatcher,
+    SettleQueue,
+    WatchCounters,
+    open_watcher,
+)
+from src.utils.media_filter import MediaFilter
+from src.utils.path_rules import PathRules
 from src.utils.path_utils import get_filepaths
 from src.utils.rich_console import (
     console,
@@ -24,6 +37,7 @@ from src.utils.rich_console import (
     print_warn,
     progress_bar,
 )
+from src.utils.scan_manifest import ScanManifest, default_manifest_path, print_changes
 
 
 def get_metadata_str(metadata: dict[str, Any], keys: list[str]):
@@ -169,6 +183,203 @@ def make_unique_filename(new_filepath: str, current_filepath: str):
     return new_filepath
 
 
+OrganizeStatus = Literal["moved"] | Literal["not_moved"] | Literal["in_place"]
+
+
+def organize_file(
+    filepath: str,
+    et: ExifToolHelper,
+    *,
+    input_path: str,
+    output_path: str,
+    folder_structure: str,
+    copy_mode: bool,
+    verbose: bool,
+    fix_metadata: bool = False,
+    manifest: ScanManifest | None = None,
+) -> OrganizeStatus:
+    """
+    Move (or copy) a file to its folder of the output directory. The changes are recorded in the `manifest`, if any.
+
+    With `fix_metadata`, the metadata of the file is fixed before its folder is found. In copy mode the original file
+    is not modified: it is copied to a temporary folder of the output directory, and the copy is fixed and then moved
+    to its folder.
+
+    Returns:
+        OrganizeStatus: "moved" if the file has been moved or copied, "not_moved" if its folder can not be found
+        from its metadata and "in_place" if it is already in its folder.
+    """
+
+    source_path = filepath
+    staging_dir: str | None = None
+
+    try:
+        if fix_metadata and copy_mode:
+            staging_dir = tempfile.mkdtemp(prefix=".pygallery-fix-", dir=output_path)
+            filepath = os.path.join(staging_dir, os.path.basename(source_path))
+            shutil.copy2(source_path, filepath)
+
+        if fix_metadata:
+            fix_file_metadata(filepath, et, verbose=verbose)
+
+            if manifest is not None and staging_dir is None:
+                manifest.record_written(filepath)
+
+        file_location = get_file_location(
+            folder_structure.split("/"), output_path, filepath, et
+        )
+
+        if file_location == "Unknown":
+            print_log(
+                f"❌ File {os.path.relpath(source_path, input_path)} not moved, its folder can not be found from its metadata",
+                verbose,
+            )
+            return "not_moved"
+
+        new_file_location = os.path.join(
+            file_location,
+            get_new_file_name(filepath, et),
+        )
+
+        new_file_location = os.path.abspath(new_file_location)
+        new_file_location = make_unique_filename(new_file_location, source_path)
+
+        if new_file_location is None:
+            return "in_place"
+
+        paths_to_log = (
+            os.path.relpath(source_path, input_path),
+            os.path.relpath(new_file_location, output_path),
+        )
+
+        if copy_mode:
+            if staging_dir is None:
+                shutil.copy2(filepath, new_file_location)
+            else:
+                shutil.move(filepath, new_file_location)
+
+            print_log(
+                f"✅ File {paths_to_log[0]} copied to {paths_to_log[1]}",
+                verbose,
+            )
+        else:
+            shutil.move(filepath, new_file_location)
+            print_log(
+                f"✅ File {paths_to_log[0]} moved to {paths_to_log[1]}",
+                verbose,
+            )
+
+        if manifest is not None:
+            if not copy_mode:
+                manifest.record_removed(source_path)
+
+            manifest.record_written(new_file_location)
+
+        return "moved"
+    finally:
+        if staging_dir is not None:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def watch(
+    input_path: str,
+    *,
+    output_path: str,
+    recursive: bool,
+    folder_structure: str,
+    copy_mode: bool,
+    verbose: bool,
+    media_filter: MediaFilter,
+    fix_metadata: bool,
+    polling: bool,
+):
+    """
+    Organize the files as they land in the input directory, until the script is interrupted (Ctrl+C).
+
+    The files are reported by inotify (or by a periodic scan) and processed once they are complete (see
+    `SettleQueue`), in batches of at most `WATCH_BATCH_SIZE` files, with a single exiftool process for the whole run.
+    The files that are already in the input directory are processed first.
+    """
+
+    watcher = open_watcher(
+        input_path,
+        recursive,
+        polling=polling,
+        exclude=[output_path],
+        rules=media_filter.rules,
+    )
+    queue = SettleQueue()
+    counters = WatchCounters()
+
+    console.print(
+        f"[blue bold][INFO]:[/blue bold] Watching the input directory "
+        + (
+            "with inotify"
+            if isinstance(watcher, InotifyWatcher)
+            else f"with a scan every {WATCH_POLL_SECONDS}s"
+        )
+        + ". Press Ctrl+C to stop\n"
+    )
+
+    try:
+        with exiftool.ExifToolHelper() as et:
+            while True:
+                for filepath in watcher.read(queue.timeout()):
+                    queue.add(filepath)
+
+                ready: list[tuple[str, float]] = []
+
+                for filepath, first_seen in queue.pop_ready():
+                    kind, rule = media_filter.classify(
+                        filepath, os.path.basename(filepath)
+                    )
+                    media_filter.counts[rule] += 1
+
+                    if kind is not None:
+                        ready.append((filepath, first_seen))
+
+                for start in range(0, len(ready), WATCH_BATCH_SIZE):
+                    batch = ready[start : start + WATCH_BATCH_SIZE]
+                    batch_start = time.monotonic()
+
+                    latencies: list[float] = []
+                    errors = 0
+
+                    for filepath, first_seen in batch:
+                        try:
+                            organize_file(
+                                filepath,
+                                et,
+                                input_path=input_path,
+                                output_path=output_path,
+                                folder_structure=folder_structure,
+                                copy_mode=copy_mode,
+                                verbose=verbose,
+                                fix_metadata=fix_metadata,
+                            )
+                        except Exception as e:
+                            # A single file must not stop the watch
+                            print_log(f"❌ File {filepath} -> {e}", True)
+                            errors += 1
+
+                        latencies.append(time.monotonic() - first_seen)
+
+                    counters.add_batch(
+                        latencies, errors, time.monotonic() - batch_start
+                    )
+
+                    console.print(
+                        f"[blue bold][INFO]:[/blue bold] Batch of [bold]{len(batch)}[/bold] files organized. Total: {counters.line()}"
+                    )
+    except KeyboardInterrupt:
+        print()
+    finally:
+        watcher.close()
+
+    console.print(media_filter.summary())
+    console.print(counters.summary())
+
+
 def main(
     input_path: str,
     *,
@@ -179,6 +390,13 @@ def main(
     folder_structure: str,
     file_name_template: str | None,
     copy_mode: bool,
+    sniff: bool = False,
+    changed_only: bool = False,
+    manifest_path: str | None = None,
+    path_rules: PathRules | None = None,
+    watch_mode: bool = False,
+    watch_polling: bool = False,
+    fix_metadata: bool = False,
 ):
     check_input_path(input_path)
 
@@ -199,6 +417,14 @@ def main(
         if output_path is None or output_path.strip() == "":
             output_path = default_path
 
+    if watch_mode and (
+        changed_only or os.path.abspath(output_path) == os.path.abspath(input_path)
+    ):
+        print_error(
+            "The --watch option can not be combined with --changed_only, or with an output directory equal to the input directory",
+            descr="The watch mode only processes the files that land in the input directory, and skips the output directory.",
+        )
+
     print()
 
     # Creating output directory if not exists
@@ -243,12 +469,46 @@ def main(
     # ----------- MAIN EXECUTION PROCCESS ------------- #
     # ------------------------------------------------- #
 
-    filepaths = get_filepaths(input_path, recursive)
+    if watch_mode:
+        watch(
+            input_path,
+            output_path=output_path,
+            recursive=recursive,
+            folder_structure=folder_structure,
+            copy_mode=copy_mode,
+            verbose=verbose,
+            media_filter=MediaFilter(sniff=sniff, rules=path_rules),
+            fix_metadata=fix_metadata,
+            polling=watch_polling,
+        )
+        return
+
+    manifest = (
+        ScanManifest(
+            manifest_path
+            or default_manifest_path("file_organizer", input_path, recursive)
+        )
+        if changed_only
+        else None
+    )
+
+    media_filter = MediaFilter(sniff=sniff, rules=path_rules)
+    filepaths = get_filepaths(input_path, recursive, media_filter, manifest)
+
+    console.print(media_filter.summary())
+
+    if manifest is not None and manifest.last_changes is not None:
+        print_changes(manifest.last_changes)
 
     if len(filepaths) == 0:
         console.print(
             f"[green bold][OK]:[/green bold] Ops! We can not find files to organize in your input directory. Program finish with success.\n"
         )
+
+        if manifest is not None:
+            manifest.save()
+            manifest.close()
+
         return
 
     files_moved = 0
@@ -260,43 +520,26 @@ def main(
             ):
                 filepath = os.path.join(path, filename)
 
-                print(f'filepath\t:\t{filepath}')
-
-                file_location = get_file_location(
-                    folder_structure.split("/"), output_path, filepath, et
+                status = organize_file(
+                    filepath,
+                    et,
+                    input_path=input_path,
+                    output_path=output_path,
+                    folder_structure=folder_structure,
+                    copy_mode=copy_mode,
+                    verbose=verbose,
+                    fix_metadata=fix_metadata,
+                    manifest=manifest,
                 )
 
-                if file_location != "Unknown":
-                    new_file_location = os.path.join(
-                        file_location,
-                        get_new_file_name(filepath, et),
-                    )
-
-                    new_file_location = os.path.abspath(new_file_location)
-                    new_file_location = make_unique_filename(new_file_location, filepath)
-
-                    if new_file_location is not None:
-                        paths_to_log = (
-                            os.path.relpath(filepath, input_path),
-                            os.path.relpath(new_file_location, output_path),
-                        )
-
-                        if copy_mode:
-                            shutil.copy2(filepath, new_file_location)
-                            print_log(
-                                f"✅ File {paths_to_log[0]} copied to {paths_to_log[1]}",
-                                verbose,
-                            )
-                            files_moved += 1
-                        else:
-                            shutil.move(filepath, new_file_location)
-                            print_log(
-                                f"✅ File {paths_to_log[0]} moved to {paths_to_log[1]}",
-                                verbose,
-                            )
-                            files_moved += 1
-                else:
-                    print(f'NOT MOVING\t:\t{filepath}')
+                if status == "moved":
+                    files_moved += 1
+                elif status == "not_moved":
                     files_not_moved += 1
     print(f'files move = {files_moved}')
     print(f'files not move = {files_not_moved}')
+
+    if manifest is not None:
+        # The files moved by this run are recorded, so they are not reported as removed or added next time
+        manifest.save()
+        manifest.close()
@@ -1,6 +1,8 @@
 import argparse
 from argparse import ArgumentParser
 
+from src.utils.path_rules import parse_date, parse_size
+
 
 def add_common_args(parser: ArgumentParser):
     parser.add_argument(
@@ -14,6 +16,78 @@ def add_common_args(parser: ArgumentParser):
         help="Wheter we should search for files in subdirectories of the input directory",
     )
 
+    parser.add_argument(
+        "--sniff",
+        action="store_true",
+        default=False,
+        help="Recognize the images and videos by the first bytes of their content, and not only by their extension, so files with a missing or wrong extension are found and files that are not media are skipped",
+    )
+
+    parser.add_argument(
+        "--include",
+        type=str,
+        action="append",
+        default=[],
+        help="Only process the files that match this glob pattern (e.g. '*.jpg' or 'DCIM/**'). Repeat the option to give several patterns. Patterns without a slash match the file name at any depth, and patterns with a slash match the path inside the input directory. Case insensitive",
+    )
+
+    parser.add_argument(
+        "--exclude",
+        type=str,
+        action="append",
+        default=[],
+        help="Skip the files and directories that match this glob pattern (e.g. '@eaDir', '*.lrdata' or '.thumbnails'). Repeat the option to give several patterns. The excluded directories are not listed at all. Case insensitive",
+    )
+
+    parser.add_argument(
+        "--rules_file",
+        type=str,
+        default=None,
+        help="JSON file with the `include` and `exclude` patterns and the `min_size`, `max_size`, `newer_than` and `older_than` limits. The patterns of the command line are added to the ones of the file, and the limits of the command line replace the ones of the file",
+    )
+
+    parser.add_argument(
+        "--min_size",
+        type=parse_size,
+        default=None,
+        help="Skip the files smaller than this size (e.g. 50KB)",
+    )
+
+    parser.add_argument(
+        "--max_size",
+        type=parse_size,
+        default=None,
+        help="Skip the files larger than this size (e.g. 2GB)",
+    )
+
+    parser.add_argument(
+        "--newer_than",
+        type=parse_date,
+        default=None,
+        help="Skip the files modified before this date (YYYY-MM-DD or YYYY-MM-DDTHH:MM)",
+    )
+
+    parser.add_argument(
+        "--older_than",
+        type=parse_date,
+        default=None,
+        help="Skip the files modified on or after this date (YYYY-MM-DD or YYYY-MM-DDTHH:MM)",
+    )
+
+    parser.add_argument(
+        "--changed_only",
+        action="store_true",
+        default=False,
+        help="Only process the files added or modified since the last run with this option. A manifest of the input directory is saved at the end of each run, so the next runs only list the directories that have changed",
+    )
+
+    parser.add_argument(
+        "--manifest_path",
+        type=str,
+        default=None,
+        help="Path of the manifest used by `--changed_only`. Defaults to a file of the `pygallery/manifests` folder inside the user cache directory, for each tool and input directory",
+    )
+
     parser.add_argument(
         "-v",
         "--verbose",
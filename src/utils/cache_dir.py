@@ -0,0 +1,14 @@
+import os
+
+
+def default_cache_dir():
+    """Directory of the caches of PyGallery, inside the user cache directory (following the XDG spec on Unix)"""
+
+    if os.name == "nt":
+        cache_dir = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+
+    return os.path.join(cache_dir, "pygallery")
@@ -0,0 +1,148 @@
+import os
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator
+
+from src.utils.media_filter import MediaFilter
+from src.utils.path_rules import PathRules
+
+# Number of directories listed at once. Listing a directory is mostly waiting for the filesystem (specially in network
+# filesystems), so it is done with threads
+SCAN_WORKERS = 8
+
+# A file found by the scanner: its directory, its name and its stat (if requested)
+ScanEntry = tuple[str, str, os.stat_result | None]
+
+
+def scan_directory(
+    dirpath: str,
+    *,
+    recursive: bool,
+    media_filter: MediaFilter | None,
+    with_stat: bool,
+    rules: PathRules | None = None,
+):
+    """
+    List the files (and, if `recursive`, the subdirectories) of a single directory, both sorted by name. The
+    subdirectories excluded by the rules of `media_filter` (or by `rules`) are skipped, so they are never listed.
+    """
+
+    if rules is None and media_filter is not None:
+        rules = media_filter.rules
+
+    files: list[ScanEntry] = []
+    subdirectories: list[str] = []
+    rule_counts: Counter[str] = Counter()
+
+    try:
+        with os.scandir(dirpath) as entries:
+            for entry in entries:
+                try:
+                    # The type of the entry comes from the directory listing, so no stat is needed
+                    if recursive and entry.is_dir(follow_symlinks=False):
+                        if rules is None or rules.accepts_directory(entry.path):
+                            subdirectories.append(entry.path)
+                        else:
+                            rule_counts["❌ Excluded directory"] += 1
+                        continue
+
+                    # The recursive search skips the links, the flat one follows them (like `os.path.isfile`)
+                    if not entry.is_file(follow_symlinks=not recursive):
+                        continue
+
+                    if media_filter is not None:
+                        kind, rule = media_filter.classify(
+                            entry.path,
+                            entry.name,
+                            lambda: entry.stat(follow_symlinks=not recursive),
+                        )
+                        rule_counts[rule] += 1
+
+                        if kind is None:
+                            continue
+
+                    files.append(
+                        (
+                            dirpath,
+                            entry.name,
+                            (
+                                entry.stat(follow_symlinks=not recursive)
+                                if with_stat
+                                else None
+                            ),
+                        )
+                    )
+                except OSError:
+                    continue
+    except OSError:
+        # Directories that can not be read are skipped, like `os.walk` does
+        pass
+
+    # The order of `os.scandir` depends on the filesystem, so it is sorted to be the same in every run
+    files.sort(key=lambda entry: entry[1])
+    subdirectories.sort()
+
+    return files, subdirectories, rule_counts
+
+
+def scan_files(
+    path: str,
+    recursive: bool,
+    *,
+    media_filter: MediaFilter | None = None,
+    with_stat: bool = False,
+    workers: int = SCAN_WORKERS,
+    rules: PathRules | None = None,
+) -> Iterator[ScanEntry]:
+    """
+    Find the files of a directory with `os.scandir`, yielding them as soon as their directory has been listed.
+
+    The subdirectories are listed concurrently by a pool of `workers` threads, so the latency of each listing (and of
+    each stat, if `with_stat` is True) is overlapped with the others. The type of each entry is taken from the
+    directory listing, so no file is stat'ed unless `with_stat` is True, and then only the files accepted by the
+    `media_filter` (whose counts of each rule are updated as the directories are listed).
+
+    The order is the same in every run over the same tree, regardless of the timing of the threads: the directories
+    are yielded breadth first (each one after its parent, and the subdirectories of a directory by name), and the
+    files of each directory together and by name. A directory is only yielded once the directories before it have
+    been yielded, while the threads keep listing the ones after it.
+
+    Args:
+        path (str): The directory to search for files.
+        recursive (bool): If True, search for files in all the subdirectories too (without following links).
+        media_filter (MediaFilter | None): If given, only the files accepted by it are yielded.
+        with_stat (bool): If True, the stat of each file is yielded too. Otherwise, the stat is None.
+        rules (PathRules | None): Rules of the directories to skip. Defaults to the rules of `media_filter`.
+
+    Yields:
+        ScanEntry: The absolute path of the directory, the name of the file and its stat.
+    """
+
+    def scan(dirpath: str):
+        return scan_directory(
+            dirpath,
+            recursive=recursive,
+            media_filter=media_filter,
+            with_stat=with_stat,
+            rules=rules,
+        )
+
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+
+    try:
+        # Directories submitted to the threads, in the order they are yielded
+        pending: deque[Future] = deque([executor.submit(scan, os.path.abspath(path))])
+
+        while pending:
+            files, subdirectories, rule_counts = pending.popleft().result()
+
+            if media_filter is not None:
+                media_filter.counts.update(rule_counts)
+
+            pending.extend(
+                executor.submit(scan, subdirectory) for subdirectory in subdirectories
+            )
+
+            yield from files
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
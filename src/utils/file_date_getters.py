@@ -44,29 +44,39 @@ def get_datetime_from_filename(filename: str) -> datetime | None:
     return None
 
 
-def get_date_from_os(filepath: str):
+# Metadata tags with the capture date of a file, in order of preference
+EXIF_DATE_KEYS = [
+    "EXIF:DateTimeOriginal",
+    "XMP:DateTimeOriginal",
+    "QuickTime:CreateDate",
+    "EXIF:CreateDate",
+    "EXIF:ModifyDate",
+]
+
+
+# Metadata tags with the model of the camera that took a photo or video, in order of preference
+CAMERA_MODEL_KEYS = [
+    "EXIF:Model",
+    "XMP:Model",
+    "QuickTime:Model",
+]
+
+
+def get_date_from_stat(file_stat: os.stat_result):
     return min(
-        datetime.fromtimestamp(os.path.getctime(filepath)),
-        datetime.fromtimestamp(os.path.getmtime(filepath)),
+        datetime.fromtimestamp(file_stat.st_ctime),
+        datetime.fromtimestamp(file_stat.st_mtime),
     )
 
 
-def get_date_from_exif(filepath: str, et: ExifToolHelper):
-    """Get the datetime of the file based on its metadata."""
-
-    metadata: dict[str, Any] = et.get_metadata(filepath)[0]
+def get_date_from_os(filepath: str):
+    return get_date_from_stat(os.stat(filepath))
 
-    # print(json.dumps(str(metadata)))
 
-    keys = [
-        "EXIF:DateTimeOriginal",
-        "XMP:DateTimeOriginal",
-        "QuickTime:CreateDate",
-        "EXIF:CreateDate",
-        "EXIF:ModifyDate",
-    ]
+def get_date_from_metadata(metadata: dict[str, Any]):
+    """Get the datetime of a file from its metadata (as returned by exiftool)"""
 
-    for key in keys:
+    for key in EXIF_DATE_KEYS:
         if metadata.get(key):
             return datetime.strptime(
                 str(metadata.get(key)),
@@ -74,6 +84,16 @@ def get_date_from_exif(filepath: str, et: ExifToolHelper):
             )
 
 
+def get_date_from_exif(filepath: str, et: ExifToolHelper):
+    """Get the datetime of the file based on its metadata."""
+
+    metadata: dict[str, Any] = et.get_metadata(filepath)[0]
+
+    # print(json.dumps(str(metadata)))
+
+    return get_date_from_metadata(metadata)
+
+
 def get_filedate(
     way: Literal["filename"] | Literal["filedate"] | Literal["fileexif"],
     filename: str,
@@ -103,3 +123,117 @@ def get_datefile_to_organize(filepath: str, et: ExifToolHelper):
         to_return = get_date_from_os(filepath)
 
     return to_return
+
+
+def get_datefiles_to_organize(
+    filepaths: list[str],
+    et: ExifToolHelper,
+    *,
+    file_stats: dict[str, os.stat_result] | None = None,
+    batch_size: int = 500,
+):
+    """
+    Batched version of `get_datefile_to_organize`. Only the date tags are requested to exiftool, with one call for
+    each batch of `batch_size` files instead of one call per file.
+
+    Args:
+        file_stats (dict[str, os.stat_result] | None): Already known stat results of the files, used for the OS date fallback.
+
+    Returns:
+        dict[str, datetime]: The datetime of each file.
+    """
+
+    dates: dict[str, datetime] = {}
+
+    for start in range(0, len(filepaths), batch_size):
+        batch = filepaths[start : start + batch_size]
+
+        try:
+            batch_metadata: list[dict[str, Any]] = et.get_tags(
+                batch, tags=EXIF_DATE_KEYS
+            )
+        except:
+            batch_metadata = []
+
+        if len(batch_metadata) != len(batch):
+            # Some file of the batch can not be read, so fall back to one call per file
+            for filepath in batch:
+                dates[filepath] = get_datefile_to_organize(filepath, et)
+
+            continue
+
+        for filepath, metadata in zip(batch, batch_metadata):
+            try:
+                date = get_date_from_metadata(metadata)
+            except ValueError:
+                date = None
+
+            if not date:
+                date = (
+                    get_date_from_stat(file_stats[filepath])
+                    if file_stats and filepath in file_stats
+                    else get_date_from_os(filepath)
+                )
+
+            dates[filepath] = date
+
+    return dates
+
+
+def get_capture_infos(
+    filepaths: list[str],
+    et: ExifToolHelper,
+    *,
+    batch_size: int = 500,
+):
+    """
+    Get the capture date and the camera model of each file from its metadata, requesting only these tags to
+    exiftool in one call for each batch of `batch_size` files. Unlike `get_datefiles_to_organize`, the OS date
+    is never used, so files without a capture date in their metadata get None.
+
+    Returns:
+        dict[str, tuple[datetime | None, str | None]]: The capture date and the camera model of each file.
+    """
+
+    infos: dict[str, tuple[datetime | None, str | None]] = {}
+
+    for start in range(0, len(filepaths), batch_size):
+        batch = filepaths[start : start + batch_size]
+
+        try:
+            batch_metadata: list[dict[str, Any]] = et.get_tags(
+                batch, tags=EXIF_DATE_KEYS + CAMERA_MODEL_KEYS
+            )
+        except:
+            batch_metadata = []
+
+        if len(batch_metadata) != len(batch):
+            # Some file of the batch can not be read, so fall back to one call per file
+            batch_metadata = []
+
+            for filepath in batch:
+                try:
+                    batch_metadata += et.get_tags(
+                        filepath, tags=EXIF_DATE_KEYS + CAMERA_MODEL_KEYS
+                    )
+                except:
+                    batch_metadata.append({})
+
+        for filepath, metadata in zip(batch, batch_metadata):
+            try:
+                date = get_date_from_metadata(metadata)
+            except ValueError:
+                date = None
+
+            model = next(
+                (
+                    str(metadata[key]).strip()
+                    for key in CAMERA_MODEL_KEYS
+                    if str(metadata.get(key) or "").strip()
+                ),
+                None,
+            )
+
+            infos[filepath] = (date, model)
+
+    return infos
@@ -0,0 +1,423 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from collections import deque
+from typing import Iterable
+
+from rich.table import Table
+
+from src.utils.directory_scanner import scan_directory, scan_files
+from src.utils.path_rules import PathRules
+
+# Seconds that a file must stay unchanged (same size and modification time) before it is processed, so the files
+# that are still being written or copied are not processed
+WATCH_SETTLE_SECONDS = 2.0
+
+# Seconds between two scans of the input directory, when it can not be watched with inotify
+WATCH_POLL_SECONDS = 5.0
+
+# Maximum number of files processed together
+WATCH_BATCH_SIZE = 200
+
+# Maximum seconds that the watcher waits for new events, so it can be interrupted
+WATCH_IDLE_SECONDS = 1.0
+
+# Number of recent files whose latency is kept to compute its percentiles
+LATENCY_WINDOW = 1000
+
+# inotify events (see `man 7 inotify`)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+# The files are reported when they are created, closed after being written, or moved into a watched directory
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# Header of each inotify event: watch descriptor, mask, cookie and length of the name
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """
+    Watcher of a directory tree with the inotify API of Linux, called through `ctypes` so no extra dependency is needed.
+
+    Each directory has its own watch, added before listing it, so no file is missed between the listing and the
+    watch. The files that are already in the directory are reported by the first `read`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        recursive: bool,
+        *,
+        exclude: Iterable[str] = (),
+        rules: PathRules | None = None,
+    ):
+        self.path = os.path.abspath(path)
+        self.recursive = recursive
+        self.exclude = [os.path.abspath(directory) for directory in exclude]
+        self.rules = rules
+
+        # The excluded directories are skipped by the scans, so they are never listed
+        self._scan_rules = (rules or PathRules()).excluding_directories(self.exclude)
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+
+        # Raises AttributeError if the C library has no inotify (e.g. in macOS)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        self._directories: dict[int, str] = {}
+
+        try:
+            self._initial_paths = self._add_tree(self.path)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_tree(self, path: str):
+        """Watch a directory (and its subdirectories), and list the files that are already in it"""
+
+        filepaths: list[str] = []
+        pending = [path]
+
+        while pending:
+            dirpath = pending.pop()
+
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(dirpath), WATCH_MASK
+            )
+
+            if wd < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, os.strerror(errno), dirpath)
+
+            self._directories[wd] = dirpath
+
+            files, subdirectories, _ = scan_directory(
+                dirpath,
+                recursive=self.recursive,
+                media_filter=None,
+                with_stat=False,
+                rules=self._scan_rules,
+            )
+
+            filepaths += [os.path.join(dirpath, name) for _, name, _ in files]
+            pending += subdirectories
+
+        return filepaths
+
+    def read(self, timeout: float):
+        """Wait at most `timeout` seconds for events, and return the paths of the files created or written"""
+
+        if self._initial_paths:
+            filepaths, self._initial_paths = self._initial_paths, []
+            return filepaths
+
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+
+        if not ready:
+            return []
+
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        filepaths: list[str] = []
+        offset = 0
+
+        while offset < len(data):
+            wd, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[
+                offset + EVENT_HEADER.size : offset + EVENT_HEADER.size + name_length
+            ]
+            offset += EVENT_HEADER.size + name_length
+
+            if mask & IN_Q_OVERFLOW:
+                # Some events have been lost, so every file is reported again
+                filepaths += [
+                    os.path.join(directory, filename)
+                    for directory, filename, _ in scan_files(
+                        self.path, self.recursive, rules=self._scan_rules
+                    )
+                ]
+                continue
+
+            if mask & IN_IGNORED:
+                self._directories.pop(wd, None)
+                continue
+
+            dirpath = self._directories.get(wd)
+
+            if dirpath is None:
+                continue
+
+            path = os.path.join(dirpath, os.fsdecode(name.rstrip(b"\0")))
+
+            if mask & IN_ISDIR:
+                if (
+                    self.recursive
+                    and mask & (IN_CREATE | IN_MOVED_TO)
+                    and self._scan_rules.accepts_directory(path)
+                ):
+                    # The files copied into the new directory before its watch was added are listed now
+                    filepaths += self._add_tree(path)
+                continue
+
+            filepaths.append(path)
+
+        return filepaths
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """
+    Watcher of a directory tree that scans it every `interval` seconds, and reports the files that are new or have
+    changed since the previous scan. It works in every system and filesystem (like network shares, where inotify does
+    not see the changes made by other machines), but each scan lists the whole tree (except the excluded directories,
+    which are never listed).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        recursive: bool,
+        *,
+        exclude: Iterable[str] = (),
+        rules: PathRules | None = None,
+        interval: float = WATCH_POLL_SECONDS,
+    ):
+        self.path = os.path.abspath(path)
+        self.recursive = recursive
+        self.exclude = [os.path.abspath(directory) for directory in exclude]
+        self.rules = rules
+
+        # The excluded directories are skipped by the scans, so they are never listed
+        self._scan_rules = (rules or PathRules()).excluding_directories(self.exclude)
+        self.interval = interval
+
+        self._snapshot: dict[str, tuple[int, int]] = {}
+        self._next_scan = 0.0
+
+    def read(self, timeout: float):
+        """Wait at most `timeout` seconds for the next scan, and return the paths of the files new or changed"""
+
+        wait = self._next_scan - time.monotonic()
+
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+
+        time.sleep(max(0.0, wait))
+        self._next_scan = time.monotonic() + self.interval
+
+        snapshot = {
+            os.path.join(dirpath, name): (file_stat.st_size, file_stat.st_mtime_ns)
+            for dirpath, name, file_stat in scan_files(
+                self.path, self.recursive, with_stat=True, rules=self._scan_rules
+            )
+            if file_stat is not None
+        }
+
+        filepaths = [
+            path
+            for path, signature in snapshot.items()
+            if self._snapshot.get(path) != signature
+        ]
+        self._snapshot = snapshot
+
+        return filepaths
+
+    def close(self):
+        pass
+
+
+def open_watcher(
+    path: str,
+    recursive: bool,
+    *,
+    polling: bool = False,
+    exclude: Iterable[str] = (),
+    rules: PathRules | None = None,
+) -> InotifyWatcher | PollingWatcher:
+    """
+    Watch a directory with inotify, or by scanning it periodically if `polling` is True or inotify is not available
+    (e.g. outside Linux, or when the limit of watches of the system has been reached). The directories excluded by
+    the `rules` are not watched.
+    """
+
+    if not polling:
+        try:
+            return InotifyWatcher(path, recursive, exclude=exclude, rules=rules)
+        except (OSError, AttributeError):
+            pass
+
+    return PollingWatcher(path, recursive, exclude=exclude, rules=rules)
+
+
+class SettleQueue:
+    """
+    Files reported by a watcher that are waiting to be complete. A file is ready when its size and modification time
+    have not changed for `settle` seconds since it was last reported.
+    """
+
+    def __init__(self, settle: float = WATCH_SETTLE_SECONDS):
+        self.settle = settle
+
+        # First time each file was reported, last time it was reported (or changed) and its size and modification time
+        self._pending: dict[str, tuple[float, float, tuple[int, int] | None]] = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, path: str, now: float | None = None):
+        now = time.monotonic() if now is None else now
+        first_seen = self._pending[path][0] if path in self._pending else now
+
+        self._pending[path] = (first_seen, now, self._signature(path))
+
+    def _signature(self, path: str):
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            return None
+
+        return file_stat.st_size, file_stat.st_mtime_ns
+
+    def pop_ready(self, now: float | None = None):
+        """
+        Remove the files that are ready from the queue. The files that no longer exist are removed too.
+
+        Returns:
+            list[tuple[str, float]]: The path of each ready file and the time when it was first reported.
+        """
+
+        now = time.monotonic() if now is None else now
+        ready: list[tuple[str, float]] = []
+
+        for path, (first_seen, last_seen, signature) in list(self._pending.items()):
+            if now - last_seen < self.settle:
+                continue
+
+            current_signature = self._signature(path)
+
+            if current_signature is None:
+                del self._pending[path]
+            elif current_signature == signature:
+                del self._pending[path]
+                ready.append((path, first_seen))
+            else:
+                # Still being written
+                self._pending[path] = (first_seen, now, current_signature)
+
+        return ready
+
+    def timeout(self, now: float | None = None):
+        """Seconds until the next file could be ready (at most `WATCH_IDLE_SECONDS`)"""
+
+        now = time.monotonic() if now is None else now
+
+        return min(
+            [WATCH_IDLE_SECONDS]
+            + [
+                max(0.0, last_seen + self.settle - now)
+                for _, last_seen, _ in self._pending.values()
+            ]
+        )
+
+
+class WatchCounters:
+    """Number of files and batches processed by the watch mode, with its throughput and the latency of each file"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+
+        self.files = 0
+        self.errors = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def add_batch(self, latencies: list[float], errors: int, seconds: float):
+        """
+        Add a processed batch: the end-to-end latency of each file (from when it was first reported until it has
+        been processed), the number of files that have failed and the seconds spent processing the batch.
+        """
+
+        self.batches += 1
+        self.files += len(latencies)
+        self.errors += errors
+        self.busy_seconds += seconds
+
+        self.total_latency += sum(latencies)
+        self.max_latency = max([self.max_latency] + latencies)
+        self._latencies.extend(latencies)
+
+    @property
+    def throughput(self):
+        """Files processed per second of work"""
+
+        return self.files / self.busy_seconds if self.busy_seconds > 0 else 0.0
+
+    def latency_percentile(self, percentile: float):
+        """Percentile of the latency of the last `LATENCY_WINDOW` files"""
+
+        if not self._latencies:
+            return 0.0
+
+        latencies = sorted(self._latencies)
+
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile))]
+
+    def line(self):
+        """Counters of a single line, printed after each batch"""
+
+        return (
+            f"[bold]{self.files}[/bold] files in [bold]{self.batches}[/bold] batches "
+            f"([bold]{self.errors}[/bold] errors), [bold]{self.throughput:.1f}[/bold] files/s, "
+            f"latency p50 [bold]{self.latency_percentile(0.5):.1f}s[/bold] "
+            f"p95 [bold]{self.latency_percentile(0.95):.1f}s[/bold]"
+        )
+
+    def summary(self):
+        table = Table(
+            title="Watch counters",
+            show_header=False,
+            show_lines=True,
+            title_justify="left",
+        )
+
+        table.add_column(no_wrap=True)
+        table.add_column(justify="right", style="bold")
+
+        table.add_row("Files processed", f"{self.files}")
+        table.add_row("Files with error", f"{self.errors}")
+        table.add_row("Batches", f"{self.batches}")
+        table.add_row("Uptime", f"{round(time.monotonic() - self.started)}s")
+        table.add_row("Throughput (files/s of work)", f"{self.throughput:.1f}")
+        table.add_row(
+            "Mean latency",
+            f"{self.total_latency / self.files if self.files else 0.0:.2f}s",
+        )
+        table.add_row("p50 latency", f"{self.latency_percentile(0.5):.2f}s")
+        table.add_row("p95 latency", f"{self.latency_percentile(0.95):.2f}s")
+        table.add_row("Max latency", f"{self.max_latency:.2f}s")
+
+        return table
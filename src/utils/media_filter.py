@@ -0,0 +1,239 @@
+import os
+from collections import Counter
+from typing import Callable, Iterable, Literal
+
+from rich.table import Table
+
+from src.constants.allowed_extensions import IMG_EXTENSIONS, VIDEO_EXTENSIONS
+from src.utils.path_rules import PathRules
+
+MediaKind = Literal["image"] | Literal["video"]
+
+# Bytes read from the start of each file to recognize its format when sniffing
+SNIFF_BYTES = 32
+
+# Signatures at the start of the media files: (offset, bytes, kind). TIFF covers most RAW formats (CR2, NEF, ARW, DNG...)
+MEDIA_SIGNATURES: list[tuple[int, bytes, MediaKind]] = [
+    (0, b"\xff\xd8\xff", "image"),
+    (0, b"\x89PNG\r\n\x1a\n", "image"),
+    (0, b"GIF87a", "image"),
+    (0, b"GIF89a", "image"),
+    (0, b"II*\x00", "image"),
+    (0, b"MM\x00*", "image"),
+    (0, b"IIRO", "image"),
+    (0, b"IIRS", "image"),
+    (0, b"IIU\x00", "image"),
+    (0, b"FUJIFILMCCD-RAW", "image"),
+    (0, b"8BPS", "image"),
+    (0, b"\x00\x00\x01\x00", "image"),
+    (0, b"\x00\x00\x00\x0cjP  \r\n\x87\n", "image"),
+    (0, b"\x1a\x45\xdf\xa3", "video"),
+    (0, b"FLV\x01", "video"),
+    (0, b"\x00\x00\x01\xba", "video"),
+    (0, b"\x00\x00\x01\xb3", "video"),
+    (0, b"OggS", "video"),
+    (0, b"\x30\x26\xb2\x75\x8e\x66\xcf\x11", "video"),
+    (4, b"moov", "video"),
+    (4, b"mdat", "video"),
+    (4, b"wide", "video"),
+]
+
+# Kind of the RIFF containers, by their form type (bytes 8 to 12)
+RIFF_KINDS: dict[bytes, MediaKind] = {b"WEBP": "image", b"AVI ": "video"}
+
+# Brands of the ISO base media files (bytes 8 to 12, after `ftyp`) that are images. The rest are videos (MP4, MOV...)
+IMAGE_BRANDS = {
+    b"heic",
+    b"heix",
+    b"hevc",
+    b"heim",
+    b"heis",
+    b"mif1",
+    b"msf1",
+    b"avif",
+    b"crx ",
+}
+
+# Signatures of common files that are not media, even if they have a media extension
+NON_MEDIA_SIGNATURES = [
+    b"%PDF",
+    b"PK\x03\x04",
+    b"<!DOCTYPE",
+    b"<html",
+    b"{\\rtf",
+    b"\x7fELF",
+]
+
+
+def sniff_kind(header: bytes) -> MediaKind | Literal["other"] | None:
+    """
+    Recognize the kind of a file from its first bytes.
+
+    Returns:
+        MediaKind | "other" | None: The kind of media, "other" if the file is known not to be media (e.g. an empty
+        file or a PDF) or None if the format is not recognized.
+    """
+
+    if len(header) == 0 or header.startswith(tuple(NON_MEDIA_SIGNATURES)):
+        return "other"
+
+    if header.startswith(b"RIFF"):
+        return RIFF_KINDS.get(header[8:12])
+
+    if header[4:8] == b"ftyp":
+        return "image" if header[8:12] in IMAGE_BRANDS else "video"
+
+    for offset, signature, kind in MEDIA_SIGNATURES:
+        if header[offset : offset + len(signature)] == signature:
+            return kind
+
+    return None
+
+
+class MediaFilter:
+    """
+    Filter of the files found by the scanner, built once from `IMG_EXTENSIONS` and `VIDEO_EXTENSIONS`.
+
+    Files are accepted by their extension (in any case). With `sniff`, the first bytes of each file are read too, so
+    files with a missing or wrong extension are accepted by their content, and files with a media extension that
+    are not media (e.g. empty files or PDFs) are rejected. The files (and directories) rejected by the `rules` are
+    skipped before reading them. The number of files of each rule is kept in `counts`.
+    """
+
+    def __init__(
+        self,
+        kinds: Iterable[MediaKind] = ("image", "video"),
+        *,
+        sniff: bool = False,
+        rules: PathRules | None = None,
+    ):
+        self.kinds = set(kinds)
+        self.sniff = sniff
+        self.rules = rules or PathRules()
+        self.counts: Counter[str] = Counter()
+
+        # Images first, so the extensions that are in both lists (like .mng) are images
+        self.extensions: dict[str, MediaKind] = {
+            extension.lower(): "video" for extension in VIDEO_EXTENSIONS
+        }
+        self.extensions.update(
+            {extension.lower(): "image" for extension in IMG_EXTENSIONS}
+        )
+
+        # Files whose kind comes from their content, and not from their extension
+        self._content_kinds: dict[str, MediaKind] = {}
+
+    def signature(self):
+        """Text that identifies the rules of the filter (e.g. to know if a saved scan used the same rules)"""
+
+        return f"{','.join(sorted(self.kinds))}:{'sniff' if self.sniff else 'extension'}:{self.rules.signature()}"
+
+    def extension_kind(self, name: str):
+        return self.extensions.get(os.path.splitext(name)[1].lower())
+
+    def classify(
+        self,
+        path: str,
+        name: str,
+        stat: Callable[[], os.stat_result] | None = None,
+    ) -> tuple[MediaKind | None, str]:
+        """
+        Kind of a file (None if it is rejected), and the rule that accepted or rejected it. It can be called from
+        several threads at once.
+
+        Args:
+            stat (Callable[[], os.stat_result] | None): Function that returns the stat of the file (like
+                `os.DirEntry.stat`), only called if the rules check its size or modification time.
+        """
+
+        rejected_rule = self.rules.check_path(path)
+
+        if rejected_rule is not None:
+            return None, rejected_rule
+
+        if self.rules.needs_stat:
+            try:
+                rejected_rule = self.rules.check_stat(
+                    stat() if stat is not None else os.stat(path)
+                )
+            except OSError:
+                return None, "❌ Can not be read"
+
+            if rejected_rule is not None:
+                return None, rejected_rule
+
+        extension_kind = self.extension_kind(name)
+
+        if not self.sniff:
+            if extension_kind is None:
+                return None, "❌ Not a media extension"
+
+            if extension_kind not in self.kinds:
+                return None, f"❌ {extension_kind.capitalize()} extension"
+
+            return extension_kind, f"✅ {extension_kind.capitalize()} extension"
+
+        try:
+            with open(path, "rb") as f:
+                content_kind = sniff_kind(f.read(SNIFF_BYTES))
+        except OSError:
+            return None, "❌ Can not be read"
+
+        if content_kind == "other":
+            return None, "❌ Not media content"
+
+        if content_kind is None:
+            # Formats without a known signature are accepted by their extension
+            if extension_kind is None:
+                return None, "❌ Not a media extension or content"
+
+            if extension_kind not in self.kinds:
+                return None, f"❌ {extension_kind.capitalize()} extension"
+
+            return extension_kind, f"✅ {extension_kind.capitalize()} extension"
+
+        if content_kind not in self.kinds:
+            return None, f"❌ {content_kind.capitalize()} content"
+
+        if content_kind != extension_kind:
+            self._content_kinds[path] = content_kind
+
+            return (
+                content_kind,
+                f"✅ {content_kind.capitalize()} content, with another extension",
+            )
+
+        return content_kind, f"✅ {content_kind.capitalize()} content"
+
+    def kind_of(self, path: str):
+        """Kind of a file accepted by the filter"""
+
+        return self._content_kinds.get(path) or self.extension_kind(path)
+
+    def content_kind(self, path: str):
+        """Kind of a file accepted by its content with another extension, or None if its extension gives its kind"""
+
+        return self._content_kinds.get(path)
+
+    def restore_content_kind(self, path: str, kind: MediaKind):
+        """Set the kind of a file accepted by its content in an earlier scan (e.g. a file served by a manifest)"""
+
+        self._content_kinds[path] = kind
+
+    def summary(self):
+        """Table with the number of files accepted and rejected by each rule"""
+
+        table = Table(
+            title="Scanned files",
+            show_header=False,
+            show_lines=True,
+            title_justify="left",
+        )
+
+        table.add_column(no_wrap=True)
+        table.add_column(justify="right", style="bold")
+
+        for rule, count in sorted(self.counts.items()):
+            table.add_row(rule, f"{count}")
+
+        return table
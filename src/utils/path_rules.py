@@ -0,0 +1,360 @@
+import copy
+import json
+import os
+import re
+from argparse import ArgumentTypeError, Namespace
+from datetime import datetime
+from typing import Iterable
+
+from src.utils.rich_console import print_error
+
+# Multipliers of the units accepted by the size options (decimal, like the sizes shown by the scripts)
+SIZE_UNITS = {
+    "": 1,
+    "B": 1,
+    "KB": 10**3,
+    "MB": 10**6,
+    "GB": 10**9,
+    "TB": 10**12,
+}
+
+
+def parse_size(value: str):
+    """Parse a size like `500KB`, `1.5GB` or `2048` (bytes). Used as an argparse type"""
+
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*", str(value))
+
+    if match is None or match.group(2).upper() not in SIZE_UNITS:
+        raise ArgumentTypeError(
+            f"invalid size: '{value}' (use a number of bytes or a unit like 500KB, 10MB or 1.5GB)"
+        )
+
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+def parse_date(value: str):
+    """Parse a date like `2024-01-31` or `2024-01-31T12:00`. Used as an argparse type"""
+
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ArgumentTypeError(
+            f"invalid date: '{value}' (use the format YYYY-MM-DD or YYYY-MM-DDTHH:MM)"
+        )
+
+
+def glob_to_regex(pattern: str):
+    """
+    Translate a glob pattern to a regular expression (with `/` as separator). `*` and `?` match within a single
+    name, `**` matches any number of directories and `[...]` matches a set of characters.
+    """
+
+    regex = ""
+    i = 0
+
+    while i < len(pattern):
+        char = pattern[i]
+
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            characters = pattern[i + 1 : end]
+
+            if characters.startswith("!"):
+                characters = "^" + characters[1:]
+
+            regex += "[" + characters.replace("\\", "\\\\") + "]"
+            i = end
+        else:
+            regex += re.escape(char)
+
+        i += 1
+
+    return regex
+
+
+def _compile_alternatives(regexes: list[str]):
+    if not regexes:
+        return None
+
+    return re.compile("|".join(f"(?:{regex})" for regex in regexes), re.IGNORECASE)
+
+
+class GlobSet:
+    """
+    Glob patterns compiled into two regular expressions (case insensitive), so each path is matched once instead of
+    once per pattern.
+
+    A pattern without `/` (like `@eaDir` or `*.lrdata`) matches the name of a file or directory at any depth, so
+    it is matched against the last name of the path only. A pattern with `/` (like `2019/*/raw`) matches the last
+    names of the path, and a pattern that starts with `/` matches the whole path. `PathRules` gives the paths
+    relative to the root of the scan (starting with `/`), so the directories above the root are never matched.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(patterns)
+
+        self._names = _compile_alternatives(
+            [glob_to_regex(pattern) for pattern in self.patterns if "/" not in pattern]
+        )
+        self._paths = _compile_alternatives(
+            [
+                ("^" if pattern.startswith("/") else "(?:^|/)")
+                + glob_to_regex(pattern)
+                + "$"
+                for pattern in self.patterns
+                if "/" in pattern
+            ]
+        )
+
+    def __bool__(self):
+        return len(self.patterns) > 0
+
+    def matches(self, path: str):
+        if os.sep != "/":
+            path = path.replace(os.sep, "/")
+
+        if self._names is not None and self._names.fullmatch(path, path.rfind("/") + 1):
+            return True
+
+        return self._paths is not None and self._paths.search(path) is not None
+
+
+class PathRules:
+    """
+    Rules of the files to scan: include and exclude glob patterns (see `GlobSet`), and ranges of size and
+    modification time.
+
+    The directories that match an exclude pattern are skipped by the scanner without listing them. If there are include
+    patterns, only the files that match one of them are scanned. A trailing `/` or `/**` in an exclude pattern is
+    ignored, so `cache/**` skips the `cache` directories too.
+
+    The patterns are matched against the paths relative to `root` (the input directory), so a pattern like
+    `DCIM/**` or `/2019/*` only matches inside it, and not the directories where the input directory is. Without a
+    `root`, they are matched against the whole path.
+    """
+
+    def __init__(
+        self,
+        include: Iterable[str] = (),
+        exclude: Iterable[str] = (),
+        *,
+        min_size: int | None = None,
+        max_size: int | None = None,
+        newer_than: datetime | None = None,
+        older_than: datetime | None = None,
+        root: str | None = None,
+    ):
+        self.include = [pattern.strip() for pattern in include if pattern.strip()]
+        self.exclude = [
+            re.sub(r"/(\*\*)?$", "", pattern.strip()) or pattern.strip()
+            for pattern in exclude
+            if pattern.strip()
+        ]
+        self.min_size = min_size
+        self.max_size = max_size
+        self.newer_than = newer_than
+        self.older_than = older_than
+        self.root = os.path.abspath(root) if root is not None else None
+
+        # Directories skipped with everything inside them, set with `excluding_directories`
+        self.excluded_directories: frozenset[str] = frozenset()
+
+        self._root_prefix = self.root.rstrip(os.sep) if self.root is not None else ""
+
+        self._include = GlobSet(self.include)
+        self._exclude = GlobSet(self.exclude)
+
+        self._newer_than_ns = (
+            int(newer_than.timestamp() * 10**9) if newer_than else None
+        )
+        self._older_than_ns = (
+            int(older_than.timestamp() * 10**9) if older_than else None
+        )
+
+    @property
+    def needs_stat(self):
+        """Whether the stat of each file is needed to check the rules"""
+
+        return any(
+            limit is not None
+            for limit in (
+                self.min_size,
+                self.max_size,
+                self.newer_than,
+                self.older_than,
+            )
+        )
+
+    def signature(self):
+        """Text that identifies the rules (e.g. to know if a saved scan used the same rules)"""
+
+        return json.dumps(
+            [
+                self.include,
+                self.exclude,
+                self.min_size,
+                self.max_size,
+                self._newer_than_ns,
+                self._older_than_ns,
+                self.root,
+                sorted(self.excluded_directories),
+            ]
+        )
+
+    def excluding_directories(self, directories: Iterable[str]):
+        """
+        Copy of the rules that also skips the given directories (e.g. the output directory, when it is inside the
+        input one), so the scanner never lists them.
+        """
+
+        rules = copy.copy(self)
+        rules.excluded_directories = self.excluded_directories | {
+            os.path.abspath(directory) for directory in directories
+        }
+
+        return rules
+
+    def _relative(self, path: str):
+        """The path relative to the root (starting with a separator), or the whole path if it is not inside the root"""
+
+        if self.root is not None and path.startswith(self._root_prefix + os.sep):
+            return path[len(self._root_prefix) :]
+
+        return path
+
+    def accepts_directory(self, path: str):
+        if path in self.excluded_directories:
+            return False
+
+        return not self._exclude.matches(self._relative(path))
+
+    def check_path(self, path: str):
+        """The rule that rejects a file by its path, or None if it is accepted"""
+
+        if self._exclude and self._exclude.matches(self._relative(path)):
+            return "❌ Excluded by a rule"
+
+        if self._include and not self._include.matches(self._relative(path)):
+            return "❌ Not included by a rule"
+
+        return None
+
+    def check_stat(self, file_stat: os.stat_result):
+        """The rule that rejects a file by its size or modification time, or None if it is accepted"""
+
+        if self.min_size is not None and file_stat.st_size < self.min_size:
+            return "❌ Smaller than the minimum size"
+
+        if self.max_size is not None and file_stat.st_size > self.max_size:
+            return "❌ Larger than the maximum size"
+
+        if (
+            self._newer_than_ns is not None
+            and file_stat.st_mtime_ns < self._newer_than_ns
+        ):
+            return "❌ Modified before the date range"
+
+        if (
+            self._older_than_ns is not None
+            and file_stat.st_mtime_ns >= self._older_than_ns
+        ):
+            return "❌ Modified after the date range"
+
+        return None
+
+
+def load_rules_file(rules_path: str):
+    """
+    Read the rules of a JSON file, with the same keys as the command line options (all of them optional):
+
+    ```
+    {
+        "exclude": ["@eaDir", ".thumbnails", "*.lrdata"],
+        "include": ["*.jpg", "*.heic"],
+        "min_size": "10KB",
+        "max_size": "2GB",
+        "newer_than": "2020-01-01",
+        "older_than": "2025-01-01"
+    }
+    ```
+    """
+
+    try:
+        with open(rules_path, encoding="utf-8") as f:
+            rules = json.load(f)
+    except (OSError, ValueError) as e:
+        print_error(f"The rules file {rules_path} can not be read", descr=str(e))
+
+    if not isinstance(rules, dict):
+        print_error(
+            f"The rules file {rules_path} is not valid",
+            descr="It must be a JSON object, with keys like `exclude`, `include`, `min_size` or `newer_than`.",
+        )
+
+    unknown_keys = set(rules) - {
+        "include",
+        "exclude",
+        "min_size",
+        "max_size",
+        "newer_than",
+        "older_than",
+    }
+
+    if unknown_keys:
+        print_error(
+            f"The rules file {rules_path} is not valid",
+            descr=f"Unknown keys: {', '.join(sorted(unknown_keys))}.",
+        )
+
+    try:
+        return {
+            "include": list(rules.get("include", [])),
+            "exclude": list(rules.get("exclude", [])),
+            **{
+                key: parse_size(rules[key])
+                for key in ("min_size", "max_size")
+                if rules.get(key) is not None
+            },
+            **{
+                key: parse_date(rules[key])
+                for key in ("newer_than", "older_than")
+                if rules.get(key) is not None
+            },
+        }
+    except ArgumentTypeError as e:
+        print_error(f"The rules file {rules_path} is not valid", descr=str(e))
+
+
+def path_rules_from_args(args: Namespace):
+    """
+    Rules of the `add_common_args` options, relative to the input path. The patterns of the command line are added to
+    the ones of the rules file, and the sizes and dates of the command line replace the ones of the file.
+    """
+
+    rules = load_rules_file(args.rules_file) if args.rules_file else {}
+
+    limits = {
+        key: rules.get(key) if getattr(args, key) is None else getattr(args, key)
+        for key in ("min_size", "max_size", "newer_than", "older_than")
+    }
+
+    return PathRules(
+        rules.get("include", []) + (args.include or []),
+        rules.get("exclude", []) + (args.exclude or []),
+        **limits,
+        root=args.input_path,
+    )
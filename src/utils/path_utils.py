@@ -1,74 +1,48 @@
 import os
 
+from src.utils.directory_scanner import scan_files
+from src.utils.media_filter import MediaFilter
+from src.utils.scan_manifest import ScanManifest
 
-def get_filepaths(path: str, recursive: bool):
+
+def get_filepaths(
+    path: str,
+    recursive: bool,
+    media_filter: MediaFilter | None = None,
+    manifest: ScanManifest | None = None,
+):
     """
-    Retrieve a list of file paths from the specified directory.
+    Retrieve a list of the media files of the specified directory, found with `scan_files`.
 
     Args:
         path (str): The directory path to search for files.
         recursive (bool): If True, search for files recursively in all subdirectories.
                           If False, search only in the specified directory.
+        media_filter (MediaFilter | None): Filter of the files. Defaults to the images and videos, by extension.
+        manifest (ScanManifest | None): If given, the directory is scanned incrementally with it (see `ScanManifest`),
+                                        and only the files added or modified since it was saved are returned.
 
     Returns:
         List[Tuple[str, str]]: A list of tuples where each tuple contains the absolute path
-                               to the directory and the file name.
+                               to the directory and the file name, in the order of `scan_files`.
     """
 
-    image_extensions = (
-        ".jpg",
-        ".jpeg",
-        ".png",
-        # ".gif",
-        ".bmp",
-        ".tiff",
-        ".tif",
-        ".orf",
-        ".sr2",
-        ".svg",
-        ".ico",
-        ".jfif",
-        ".webp",
-        ".heic",
-        ".heif",
-        ".raw",
-        ".arw",
-        ".cr2",
-        ".nef",
-    )
-
+    media_filter = media_filter or MediaFilter()
 
-    all_filepaths: list[tuple[str, str]] = []
+    if manifest is not None:
+        changes = manifest.scan(path, recursive, media_filter)
 
-    if not recursive:
-        all_filepaths += [
-            (path, f) for f in os.listdir(path) if os.path.isfile(os.path.join(path, f))
+        return [
+            (dirpath, filename)
+            for dirpath, filename, _ in changes.files
+            if os.path.join(dirpath, filename) in changes.changed
         ]
 
-    else:
-        for dirpath, dirnames, filenames in os.walk(path):
-            abspath = os.path.abspath(dirpath)
-            all_filepaths += [(abspath, f) for f in filenames if f.endswith(image_extensions) if not os.path.islink(os.path.join(abspath, f))]
-
-    return all_filepaths
-
-
-def filter_filepaths(filepaths: list[tuple[str, str]], allowed_ext: set[str]):
-    """
-    Filter file paths based on allowed file extensions.
-
-    Args:
-        filepaths (List[Tuple[str, str]]): A list of tuples where each tuple contains the
-                                           absolute path to the directory and the file name.
-        allowed_ext (Set[str]): A set of allowed file extensions (e.g., {'.txt', '.jpg'}).
-
-    Returns:
-        List[Tuple[str, str]]: A list of tuples containing only the file paths with the allowed extensions.
-    """
     return [
-        (fp, fn)
-        for fp, fn in filepaths
-        if os.path.splitext(fn)[-1].lower() in allowed_ext
+        (dirpath, filename)
+        for dirpath, filename, _ in scan_files(
+            path, recursive, media_filter=media_filter
+        )
     ]
 
 
@@ -0,0 +1,427 @@
+import os
+import sqlite3
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from hashlib import blake2b
+
+from src.utils.cache_dir import default_cache_dir
+from src.utils.directory_scanner import SCAN_WORKERS, ScanEntry, scan_directory
+from src.utils.media_filter import MediaFilter, MediaKind
+from src.utils.rich_console import console
+
+# Record of a file in the manifest: its size, modification time and inode
+FileRecord = tuple[int, int, int]
+
+# A file of a directory in the manifest: its name, its record and its kind if it was accepted by its content with
+# another extension (see `MediaFilter.content_kind`)
+FileRow = tuple[str, FileRecord, MediaKind | None]
+
+# State found by a scan: the signature of its options, the visited directories (with their parent and modification
+# time), the files of the directories listed and the modification time of the directories known by the manifest
+ScanState = tuple[
+    str,
+    dict[str, tuple[str | None, int]],
+    dict[str, list[FileRow]],
+    dict[str, int],
+]
+
+
+def default_manifest_path(tool: str, input_path: str, recursive: bool):
+    """Path of the manifest of a tool for an input directory, inside the user cache directory"""
+
+    digest = blake2b(
+        f"{os.path.abspath(input_path)}:{recursive}".encode("utf-8", "surrogateescape"),
+        digest_size=8,
+    ).hexdigest()
+
+    return os.path.join(default_cache_dir(), "manifests", f"{tool}-{digest}.db")
+
+
+class ScanChanges:
+    """Result of an incremental scan: every file found, and the files added, modified and removed since the last one"""
+
+    def __init__(
+        self,
+        files: list[ScanEntry],
+        added: set[str],
+        modified: set[str],
+        removed: set[str],
+    ):
+        self.files = files
+        self.added = added
+        self.modified = modified
+        self.removed = removed
+
+    @property
+    def changed(self):
+        return self.added | self.modified
+
+
+def print_changes(changes: ScanChanges):
+    console.print(
+        f"[blue bold][INFO]:[/blue bold] Since the last run: [bold]{len(changes.added)}[/bold] files added, [bold]{len(changes.modified)}[/bold] modified and [bold]{len(changes.removed)}[/bold] removed. Only the added and modified files will be processed\n"
+    )
+
+
+class ScanManifest:
+    """
+    Snapshot of a directory tree, stored in a SQLite database: the modification time of each directory and the
+    size, modification time and inode of each of its files (and the kind of the files accepted by their content).
+
+    Adding, removing or renaming a file changes the modification time of its directory, so in the next scan only
+    the directories whose modification time has changed are listed again. The rest of the directories are only
+    stat'ed, and their files are taken from the manifest. The files modified in place, without changing their
+    directory, are not found (most programs write a new file and rename it over the old one, which does).
+
+    The state saved by `save` is the one found by the scan at the start of the run, with the changes that the tool
+    has made itself (see `record_removed` and `record_written`), so the files added while the tool was running are
+    still reported by the next scan.
+    """
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self.db_path = db_path
+
+        self._connection = sqlite3.connect(db_path)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS settings (
+                signature TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS directories (
+                path TEXT PRIMARY KEY,
+                parent TEXT,
+                mtime_ns INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                directory TEXT NOT NULL,
+                name TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                kind TEXT,
+                PRIMARY KEY (directory, name)
+            );
+            """
+        )
+
+        if "kind" not in {
+            column[1]
+            for column in self._connection.execute("PRAGMA table_info(files)")
+        }:
+            # Manifests saved before the kinds were stored are listed again in full by the next scan
+            self._connection.execute("ALTER TABLE files ADD COLUMN kind TEXT")
+            self._connection.execute("DELETE FROM settings")
+            self._connection.commit()
+
+        # State found by the last scan and the changes made by the tool since then, saved by `save`
+        self._scan_state: ScanState | None = None
+        self._follow_symlinks = True
+        self._media_filter: MediaFilter | None = None
+        self._removed: set[str] = set()
+        self._written: dict[str, tuple[FileRecord, MediaKind | None]] = {}
+
+        self.last_changes: ScanChanges | None = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self._connection.commit()
+        self._connection.close()
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def _directory_files(
+        self, dirpath: str
+    ) -> dict[str, tuple[FileRecord, MediaKind | None]]:
+        return {
+            name: ((size, mtime_ns, inode), kind)
+            for name, size, mtime_ns, inode, kind in self._connection.execute(
+                "SELECT name, size, mtime_ns, inode, kind FROM files WHERE directory = ? ORDER BY name",
+                (dirpath,),
+            )
+        }
+
+    def scan(
+        self,
+        path: str,
+        recursive: bool,
+        media_filter: MediaFilter | None = None,
+        *,
+        save: bool = False,
+        workers: int = SCAN_WORKERS,
+    ):
+        """
+        Scan a directory, listing only the directories that have changed since the manifest was saved. Like
+        `scan_files`, the directories are stat'ed and listed by a pool of `workers` threads.
+
+        The manifest is only updated if `save` is True. If the manifest was saved with other options (`recursive`
+        or the rules of `media_filter`), every directory is listed again and every file is reported as added. The
+        kinds of the files of the unchanged directories that were accepted by their content are restored into
+        `media_filter`, so `MediaFilter.kind_of` gives the same kind as in the scan that listed them.
+
+        Returns:
+            ScanChanges: The files found, in the same order as `scan_files` (with their stat, if their directory has
+                been listed), and the changes.
+        """
+
+        path = os.path.abspath(path)
+
+        signature = f"{recursive}:{media_filter.signature() if media_filter else ''}"
+        stored_signature = self._connection.execute(
+            "SELECT signature FROM settings"
+        ).fetchone()
+
+        known_directories: dict[str, int] = {}
+        known_subdirectories: dict[str, list[str]] = {}
+
+        if stored_signature is not None and stored_signature[0] == signature:
+            for dirpath, parent, mtime_ns in self._connection.execute(
+                "SELECT path, parent, mtime_ns FROM directories"
+            ):
+                known_directories[dirpath] = mtime_ns
+                known_subdirectories.setdefault(parent, []).append(dirpath)
+
+            for subdirectories in known_subdirectories.values():
+                subdirectories.sort()
+
+        def visit(dirpath: str):
+            try:
+                mtime_ns = os.stat(dirpath).st_mtime_ns
+            except OSError:
+                return None, None, [], Counter()
+
+            if known_directories.get(dirpath) == mtime_ns:
+                # Nothing has been added or removed, so the files and subdirectories are the ones of the manifest
+                return mtime_ns, None, known_subdirectories.get(dirpath, []), Counter()
+
+            files, subdirectories, rule_counts = scan_directory(
+                dirpath,
+                recursive=recursive,
+                media_filter=media_filter,
+                with_stat=True,
+            )
+
+            return mtime_ns, files, subdirectories, rule_counts
+
+        files: list[ScanEntry] = []
+        added: set[str] = set()
+        modified: set[str] = set()
+        removed: set[str] = set()
+
+        # Visited directories, with their parent and modification time
+        visited: dict[str, tuple[str | None, int]] = {}
+        listed_files: dict[str, list[FileRow]] = {}
+
+        executor = ThreadPoolExecutor(max_workers=max(1, workers))
+
+        try:
+            # Directories submitted to the threads (with their parent), visited in the same order as `scan_files`
+            pending: deque[tuple[Future, str, str | None]] = deque(
+                [(executor.submit(visit, path), path, None)]
+            )
+
+            while pending:
+                future, dirpath, parent = pending.popleft()
+                mtime_ns, dir_files, subdirectories, rule_counts = future.result()
+
+                if media_filter is not None:
+                    media_filter.counts.update(rule_counts)
+
+                if mtime_ns is None:
+                    continue
+
+                visited[dirpath] = (parent, mtime_ns)
+
+                pending.extend(
+                    (executor.submit(visit, subdirectory), subdirectory, dirpath)
+                    for subdirectory in subdirectories
+                )
+
+                known_files = (
+                    self._directory_files(dirpath)
+                    if dirpath in known_directories
+                    else {}
+                )
+
+                if dir_files is None:
+                    files += [(dirpath, name, None) for name in known_files]
+
+                    if media_filter is not None and known_files:
+                        media_filter.counts["♻️ Unchanged directory"] += len(
+                            known_files
+                        )
+
+                        for name, (_, kind) in known_files.items():
+                            if kind is not None:
+                                media_filter.restore_content_kind(
+                                    os.path.join(dirpath, name), kind
+                                )
+
+                    continue
+
+                rows: list[FileRow] = []
+
+                for _, name, file_stat in dir_files:
+                    record = (
+                        file_stat.st_size,
+                        file_stat.st_mtime_ns,
+                        file_stat.st_ino,
+                    )
+
+                    filepath = os.path.join(dirpath, name)
+
+                    rows.append(
+                        (
+                            name,
+                            record,
+                            (
+                                media_filter.content_kind(filepath)
+                                if media_filter is not None
+                                else None
+                            ),
+                        )
+                    )
+
+                    if name not in known_files:
+                        added.add(filepath)
+                    elif known_files.pop(name)[0] != record:
+                        modified.add(filepath)
+
+                removed.update(os.path.join(dirpath, name) for name in known_files)
+
+                files += dir_files
+                listed_files[dirpath] = rows
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        # The files of the directories that no longer exist (or are no longer reachable) have been removed
+        for dirpath in known_directories.keys() - visited.keys():
+            removed.update(
+                os.path.join(dirpath, name) for name in self._directory_files(dirpath)
+            )
+
+        self._scan_state = (signature, visited, listed_files, known_directories)
+        self._follow_symlinks = not recursive
+        self._media_filter = media_filter
+        self._removed = set()
+        self._written = {}
+
+        if save:
+            self.save()
+
+        self.last_changes = ScanChanges(files, added, modified, removed)
+
+        return self.last_changes
+
+    def record_removed(self, filepath: str):
+        """Record a file removed by the tool, so it is not reported as removed by the next scan"""
+
+        filepath = os.path.abspath(filepath)
+
+        self._written.pop(filepath, None)
+        self._removed.add(filepath)
+
+    def record_written(self, filepath: str):
+        """
+        Record a file written by the tool (e.g. modified, moved or linked), so it is not reported as added or modified
+        by the next scan. Only the files in the directories found by the last scan are recorded: the files written in
+        new directories are reported as added.
+        """
+
+        filepath = os.path.abspath(filepath)
+
+        try:
+            file_stat = os.stat(filepath, follow_symlinks=self._follow_symlinks)
+        except OSError:
+            self.record_removed(filepath)
+            return
+
+        self._removed.discard(filepath)
+        self._written[filepath] = (
+            (
+                file_stat.st_size,
+                file_stat.st_mtime_ns,
+                file_stat.st_ino,
+            ),
+            (
+                self._media_filter.content_kind(filepath)
+                if self._media_filter is not None
+                else None
+            ),
+        )
+
+    def save(self):
+        """
+        Save the state found by the last scan, with the changes recorded since then. The directories keep the
+        modification time of the scan, so the directories changed during the run (by the tool or by anyone else) are
+        listed again by the next scan, and the files added to them in the meantime are reported.
+        """
+
+        if self._scan_state is None:
+            return
+
+        self._save(*self._scan_state)
+
+        visited = self._scan_state[1]
+
+        self._connection.executemany(
+            "DELETE FROM files WHERE directory = ? AND name = ?",
+            (os.path.split(filepath) for filepath in self._removed),
+        )
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (*os.path.split(filepath), *record, kind)
+                for filepath, (record, kind) in self._written.items()
+                if os.path.dirname(filepath) in visited
+            ),
+        )
+        self._connection.commit()
+
+        self._scan_state = None
+        self._removed = set()
+        self._written = {}
+
+    def _save(
+        self,
+        signature: str,
+        visited: dict[str, tuple[str | None, int]],
+        listed_files: dict[str, list[FileRow]],
+        known_directories: dict[str, int],
+    ):
+        connection = self._connection
+
+        if not known_directories:
+            # The manifest is empty or was saved with other options
+            connection.execute("DELETE FROM settings")
+            connection.execute("DELETE FROM directories")
+            connection.execute("DELETE FROM files")
+            connection.execute("INSERT INTO settings VALUES (?)", (signature,))
+
+        gone = [(dirpath,) for dirpath in known_directories.keys() - visited.keys()]
+        connection.executemany("DELETE FROM directories WHERE path = ?", gone)
+        connection.executemany("DELETE FROM files WHERE directory = ?", gone)
+
+        connection.executemany(
+            "INSERT OR REPLACE INTO directories VALUES (?, ?, ?)",
+            (
+                (dirpath, parent, mtime_ns)
+                for dirpath, (parent, mtime_ns) in visited.items()
+            ),
+        )
+
+        for dirpath, rows in listed_files.items():
+            connection.execute("DELETE FROM files WHERE directory = ?", (dirpath,))
+            connection.executemany(
+                "INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                ((dirpath, name, *record, kind) for name, record, kind in rows),
+            )
+
+        connection.commit()
@@ -0,0 +1,90 @@
+import os
+import threading
+
+import pytest
+
+from src.utils.directory_scanner import scan_files
+from src.utils.scan_manifest import ScanManifest
+
+RELATIVE_PATHS = [
+    "b.jpg",
+    "a.jpg",
+    "2020/z.jpg",
+    "2020/c.jpg",
+    "2019/b.jpg",
+    "2019/12/a.jpg",
+    "2019/01/a.jpg",
+    "2020/01/a.jpg",
+]
+
+
+@pytest.fixture
+def library(tmp_path):
+    for relative_path in RELATIVE_PATHS:
+        path = tmp_path / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"\xff\xd8\xff")
+
+    return tmp_path
+
+
+def relative_paths(root, entries):
+    return [
+        os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/")
+        for dirpath, name, _ in entries
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 8])
+def test_files_are_yielded_breadth_first_by_name(library, workers):
+    assert relative_paths(library, scan_files(str(library), True, workers=workers)) == [
+        "a.jpg",
+        "b.jpg",
+        "2019/b.jpg",
+        "2020/c.jpg",
+        "2020/z.jpg",
+        "2019/01/a.jpg",
+        "2019/12/a.jpg",
+        "2020/01/a.jpg",
+    ]
+
+
+def test_manifest_scan_keeps_the_order_of_the_scanner(library, tmp_path_factory):
+    expected = relative_paths(library, scan_files(str(library), True))
+
+    with ScanManifest(str(tmp_path_factory.mktemp("manifest") / "db")) as manifest:
+        # Every directory is listed by the first scan, and none by the second one
+        for _ in range(2):
+            changes = manifest.scan(str(library), True, save=True)
+
+            assert relative_paths(library, changes.files) == expected
+
+
+def test_files_are_yielded_before_the_scan_ends(library, monkeypatch):
+    blocked = str(library / "2019" / "12")
+    unblock = threading.Event()
+    scandir = os.scandir
+
+    def blocking_scandir(path):
+        if os.fspath(path) == blocked:
+            unblock.wait(10)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", blocking_scandir)
+
+    entries = scan_files(str(library), True)
+
+    try:
+        # The files of the directories before the blocked one are yielded while it is still being listed
+        assert relative_paths(library, [next(entries) for _ in range(6)]) == [
+            "a.jpg",
+            "b.jpg",
+            "2019/b.jpg",
+            "2020/c.jpg",
+            "2020/z.jpg",
+            "2019/01/a.jpg",
+        ]
+    finally:
+        unblock.set()
+
+    assert relative_paths(library, entries) == ["2019/12/a.jpg", "2020/01/a.jpg"]
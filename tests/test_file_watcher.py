@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from src.utils.file_watcher import InotifyWatcher, PollingWatcher
+from src.utils.path_rules import PathRules
+
+
+@pytest.fixture
+def library(tmp_path):
+    """Input directory with the output directory (the organized library) inside it"""
+
+    for relative_path in [
+        "new/a.jpg",
+        "new/b.jpg",
+        "library/2019/c.jpg",
+        "@eaDir/d.jpg",
+    ]:
+        path = tmp_path / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"\xff\xd8\xff")
+
+    return tmp_path
+
+
+@pytest.fixture
+def listed_directories(monkeypatch):
+    """Directories listed with `os.scandir`"""
+
+    listed: list[str] = []
+    scandir = os.scandir
+
+    def recording_scandir(path):
+        listed.append(os.fspath(path))
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", recording_scandir)
+
+    return listed
+
+
+@pytest.mark.parametrize("watcher_class", [PollingWatcher, InotifyWatcher])
+def test_excluded_directories_are_never_listed(
+    watcher_class, library, listed_directories
+):
+    try:
+        watcher = watcher_class(
+            str(library),
+            True,
+            exclude=[str(library / "library")],
+            rules=PathRules(exclude=["@eaDir"], root=str(library)),
+        )
+    except (OSError, AttributeError):
+        pytest.skip("inotify is not available")
+
+    try:
+        filepaths = watcher.read(0)
+    finally:
+        watcher.close()
+
+    assert sorted(filepaths) == [
+        str(library / "new" / "a.jpg"),
+        str(library / "new" / "b.jpg"),
+    ]
+    assert sorted(listed_directories) == [str(library), str(library / "new")]
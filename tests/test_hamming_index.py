@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from src.features.duplicates_remover.duplicates_remover import (
+    find_similar_pairs,
+    get_max_distance,
+    group_similar_pairs,
+)
+from src.features.duplicates_remover.hamming_index import hash_words
+
+IMAGES = 1500
+
+
+def make_hashes(hash_size: int, max_changed_bits: int):
+    """Random packed hashes, a third of them copies of another hash with up to `max_changed_bits` bits changed"""
+
+    rng = np.random.default_rng(hash_size * 100 + max_changed_bits)
+    nbits = hash_size**2
+
+    bits = rng.random((IMAGES, nbits)) < 0.5
+
+    for i in range(1, IMAGES, 3):
+        bits[i] = bits[rng.integers(i)]
+        bits[i, rng.integers(0, nbits, rng.integers(0, max_changed_bits + 1))] ^= True
+
+    packed = np.packbits(bits, axis=1, bitorder="little")
+    packed = np.pad(packed, ((0, 0), (0, hash_words(nbits) * 8 - packed.shape[1])))
+
+    return packed.view(np.uint64)
+
+
+def brute_force_pairs(hashes: np.ndarray, max_distance: int):
+    """Every pair of hashes whose XOR has at most `max_distance` bits set"""
+
+    pairs: set[tuple[int, int, int]] = set()
+
+    for i in range(len(hashes) - 1):
+        xor = hashes[i] ^ hashes[i + 1 :]
+        distances = np.unpackbits(xor.view(np.uint8), axis=1).sum(axis=1)
+
+        for j in np.flatnonzero(distances <= max_distance).tolist():
+            pairs.add((i, i + 1 + j, int(distances[j])))
+
+    return pairs
+
+
+@pytest.mark.parametrize("hash_size", [8, 12, 16])
+@pytest.mark.parametrize("similarity", [80, 90, 96, 99])
+def test_index_finds_the_same_pairs_and_groups_as_brute_force(hash_size, similarity):
+    hashes = make_hashes(hash_size, int(hash_size**2 * (1 - similarity / 100)) + 2)
+    paths = [f"/photos/{i:05d}.jpg" for i in range(IMAGES)]
+
+    expected = brute_force_pairs(hashes, get_max_distance(hash_size, similarity))
+    found = list(find_similar_pairs(hashes, hash_size, similarity, block_size=256))
+
+    assert len(found) == len(set(found))
+    assert set(found) == expected
+
+    assert sorted(group_similar_pairs(paths, found, hash_size**2)) == sorted(
+        group_similar_pairs(paths, expected, hash_size**2)
+    )
+
+
+def test_index_finds_the_pairs_of_some_rows():
+    hash_size, similarity = 16, 90
+    hashes = make_hashes(hash_size, 30)
+    rows = np.arange(0, IMAGES, 7)
+    row_set = set(rows.tolist())
+
+    expected = {
+        pair
+        for pair in brute_force_pairs(hashes, get_max_distance(hash_size, similarity))
+        if pair[0] in row_set or pair[1] in row_set
+    }
+    found = list(find_similar_pairs(hashes, hash_size, similarity, rows=rows))
+
+    assert len(found) == len(set(found))
+    assert set(found) == expected
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pytest
+from imagehash import ImageHash
+
+from src.features.duplicates_remover.hash_cache import HashCache
+
+IMG_HASH = ImageHash(np.random.default_rng(0).random((8, 8)) < 0.5)
+
+
+@pytest.fixture
+def photo(tmp_path):
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(b"\xff\xd8\xff" + bytes(1000))
+
+    return str(path)
+
+
+@pytest.fixture
+def cache(tmp_path, photo):
+    """Cache with the hash of the photo, reopened so the entry is read from disk"""
+
+    with HashCache(str(tmp_path / "hashes.db")) as cache:
+        cache.put(photo, os.stat(photo), "average_hash:draft", 8, IMG_HASH)
+
+    with HashCache(str(tmp_path / "hashes.db")) as cache:
+        yield cache
+
+
+def test_unchanged_file_hits(cache, photo):
+    assert cache.get(photo, os.stat(photo), "average_hash:draft", 8) == IMG_HASH
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_other_algorithm_or_hash_size_misses(cache, photo):
+    assert cache.get(photo, os.stat(photo), "phash:draft", 8) is None
+    assert cache.get(photo, os.stat(photo), "average_hash:draft", 16) is None
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_other_size_misses(cache, photo):
+    mtime_ns = os.stat(photo).st_mtime_ns
+
+    with open(photo, "ab") as f:
+        f.write(b"\x00")
+
+    os.utime(photo, ns=(mtime_ns, mtime_ns))
+
+    assert cache.get(photo, os.stat(photo), "average_hash:draft", 8) is None
+
+
+def test_other_mtime_misses(cache, photo):
+    mtime_ns = os.stat(photo).st_mtime_ns + 1_000_000_000
+    os.utime(photo, ns=(mtime_ns, mtime_ns))
+
+    assert cache.get(photo, os.stat(photo), "average_hash:draft", 8) is None
+
+
+def test_other_inode_misses(cache, photo, tmp_path):
+    # A file with the same size and modification time replaces the photo
+    original_stat = os.stat(photo)
+    replacement = tmp_path / "replacement.jpg"
+    replacement.write_bytes(b"\xff\xd8\xff" + bytes(999) + b"\x01")
+    os.utime(replacement, ns=(original_stat.st_mtime_ns, original_stat.st_mtime_ns))
+    os.replace(replacement, photo)
+
+    new_stat = os.stat(photo)
+
+    assert new_stat.st_ino != original_stat.st_ino
+    assert (new_stat.st_size, new_stat.st_mtime_ns) == (
+        original_stat.st_size,
+        original_stat.st_mtime_ns,
+    )
+    assert cache.get(photo, new_stat, "average_hash:draft", 8) is None
+
+
+def test_stale_entry_is_replaced(cache, photo):
+    mtime_ns = os.stat(photo).st_mtime_ns + 1_000_000_000
+    os.utime(photo, ns=(mtime_ns, mtime_ns))
+
+    cache.put(photo, os.stat(photo), "average_hash:draft", 8, IMG_HASH)
+
+    assert cache.evictions == 1
+    assert cache.get(photo, os.stat(photo), "average_hash:draft", 8) == IMG_HASH
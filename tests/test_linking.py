@@ -0,0 +1,55 @@
+import json
+import os
+import shutil
+
+from PIL import Image
+
+from src.features.duplicates_remover import duplicates_remover
+from src.features.duplicates_remover.linking import link_file
+
+
+def run(input_path: str, report_path: str):
+    duplicates_remover.main(
+        input_path,
+        hash_size=8,
+        similarity=90,
+        recursive=True,
+        verbose=False,
+        plot_disabled=True,
+        cache=False,
+        policy="keep-largest",
+        report_path=report_path,
+        link_mode="hardlink",
+    )
+
+
+def test_link_file_does_nothing_with_a_hardlink_to_the_kept_file(tmp_path):
+    kept_path = str(tmp_path / "kept.jpg")
+    path = str(tmp_path / "copy.jpg")
+
+    Image.new("RGB", (64, 48), (10, 120, 40)).save(kept_path)
+    os.link(kept_path, path)
+
+    assert link_file(kept_path, path, "hardlink") is None
+    assert os.path.samefile(kept_path, path)
+
+
+def test_hardlinked_copies_are_not_reported_again(tmp_path):
+    input_path = tmp_path / "photos"
+    input_path.mkdir()
+
+    Image.new("RGB", (64, 48), (10, 120, 40)).save(input_path / "photo.jpg")
+    shutil.copy2(input_path / "photo.jpg", input_path / "copy.jpg")
+
+    run(str(input_path), str(tmp_path / "first.jsonl"))
+
+    with open(tmp_path / "first.jsonl", encoding="utf-8") as f:
+        (group,) = [json.loads(line) for line in f]
+
+    assert sorted(file["action"] for file in group["files"]) == ["keep", "link"]
+    assert os.path.samefile(input_path / "photo.jpg", input_path / "copy.jpg")
+
+    # The hardlinks are the same file, so there are no duplicates left (and no report is written)
+    run(str(input_path), str(tmp_path / "second.jsonl"))
+
+    assert not os.path.exists(tmp_path / "second.jsonl")
@@ -0,0 +1,200 @@
+import contextlib
+import io
+import json
+import os
+import tracemalloc
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.features.duplicates_remover import duplicates_remover
+from src.features.duplicates_remover.duplicates_remover import (
+    find_similar_pairs,
+    get_max_distance,
+    group_similar_pairs,
+)
+from src.features.duplicates_remover.out_of_core import (
+    GROUPING_BYTES_PER_IMAGE,
+    GROUPING_BYTES_PER_PAIR,
+    SCANNED_BYTES_PER_FILE,
+    HashSpill,
+    find_similar_pairs_out_of_core,
+    group_spilled_pairs,
+)
+
+HASH_SIZE = 8
+SIMILARITY = 90
+IMAGES = 20_000
+
+# Budget of the search, small enough to split the hashes in many partitions
+MAX_MEMORY = 2**20
+
+# Images of the library searched end to end, in groups of 4: an image, an identical copy of it, a copy with one pixel
+# changed and a different image
+LIBRARY_IMAGES = 4000
+
+
+@pytest.fixture(scope="module")
+def hashes():
+    """Random 64-bit hashes, a quarter of them copies of another hash with up to 3 bits changed"""
+
+    rng = np.random.default_rng(0)
+
+    hashes = rng.integers(0, 2**64, size=(IMAGES, 1), dtype=np.uint64)
+
+    copies = rng.choice(IMAGES, IMAGES // 4, replace=False)
+    originals = rng.choice(IMAGES, IMAGES // 4)
+    hashes[copies] = hashes[originals]
+
+    for _ in range(3):
+        bits = rng.integers(0, 64, size=(IMAGES // 4, 1)).astype(np.uint64)
+        hashes[copies] ^= np.uint64(1) << bits
+
+    return hashes
+
+
+@pytest.fixture(scope="module")
+def paths():
+    return [f"/photos/{i:06d}.jpg" for i in range(IMAGES)]
+
+
+@pytest.fixture
+def spill(tmp_path, hashes, paths):
+    spill = HashSpill(str(tmp_path), HASH_SIZE**2)
+
+    for start in range(0, IMAGES, 10_000):
+        spill.append(paths[start : start + 10_000], hashes[start : start + 10_000])
+
+    spill.finish()
+
+    return spill
+
+
+def search_out_of_core(spill: HashSpill, work_dir: str):
+    return find_similar_pairs_out_of_core(
+        spill,
+        get_max_distance(HASH_SIZE, SIMILARITY),
+        work_dir=work_dir,
+        max_memory=MAX_MEMORY,
+    )
+
+
+def test_partitioned_pairs_match_in_memory_pairs(spill, tmp_path, hashes):
+    in_memory_pairs = list(find_similar_pairs(hashes, HASH_SIZE, SIMILARITY))
+    partitioned_pairs = list(search_out_of_core(spill, str(tmp_path)))
+
+    assert len(in_memory_pairs) > 0
+    assert len(partitioned_pairs) == len(set(partitioned_pairs))
+    assert set(partitioned_pairs) == set(in_memory_pairs)
+
+
+def test_partitioned_groups_match_in_memory_groups(spill, tmp_path, hashes, paths):
+    in_memory_groups = group_similar_pairs(
+        paths, find_similar_pairs(hashes, HASH_SIZE, SIMILARITY), HASH_SIZE**2
+    )
+    partitioned_groups = group_spilled_pairs(
+        spill, search_out_of_core(spill, str(tmp_path))
+    )
+
+    assert sorted(partitioned_groups) == sorted(in_memory_groups)
+
+
+def test_search_peak_memory_stays_within_budget(spill, tmp_path):
+    # The pairs are only counted, so the memory traced is the one of the search
+    tracemalloc.start()
+
+    try:
+        pairs = sum(1 for _ in search_out_of_core(spill, str(tmp_path)))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert pairs > 0
+    assert peak <= MAX_MEMORY
+
+
+def test_grouping_peak_memory_stays_within_estimate(spill, tmp_path):
+    pairs = list(search_out_of_core(spill, str(tmp_path)))
+    images = len({row for i, j, _ in pairs for row in (i, j)})
+
+    tracemalloc.start()
+
+    try:
+        groups = group_spilled_pairs(spill, iter(pairs))
+        next(groups)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert (
+        peak <= GROUPING_BYTES_PER_PAIR * len(pairs) + GROUPING_BYTES_PER_IMAGE * images
+    )
+
+
+@pytest.fixture(scope="module")
+def library(tmp_path_factory):
+    """Small PNG images of random noise, with widths that vary so most files have a different size"""
+
+    library = tmp_path_factory.mktemp("library")
+    rng = np.random.default_rng(0)
+
+    for i in range(LIBRARY_IMAGES):
+        directory = library / f"{i // 500:02d}"
+        directory.mkdir(exist_ok=True)
+
+        if i % 4 == 0:
+            original = rng.integers(0, 256, size=(16, 16 + i % 64, 3), dtype=np.uint8)
+            pixels = original
+        elif i % 4 == 2:
+            pixels = original.copy()
+            pixels[0, 0] ^= 1
+        elif i % 4 == 3:
+            pixels = rng.integers(0, 256, size=(16, 16 + i % 64, 3), dtype=np.uint8)
+
+        Image.fromarray(pixels).save(directory / f"{i:05d}.png")
+
+    return str(library)
+
+
+def test_main_peak_memory_stays_within_budget_and_estimates(library, tmp_path):
+    report_path = str(tmp_path / "report.jsonl")
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            duplicates_remover.main(
+                library,
+                hash_size=HASH_SIZE,
+                similarity=SIMILARITY,
+                recursive=True,
+                verbose=False,
+                plot_disabled=True,
+                cache=False,
+                report_path=report_path,
+                max_memory=MAX_MEMORY // 2**20,
+            )
+
+    # The first run imports the modules used by the search, which are not part of its memory
+    run()
+
+    tracemalloc.start()
+
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    with open(report_path, encoding="utf-8") as f:
+        groups = [json.loads(line) for line in f]
+
+    # Each group has an image, its identical copy and the copy with one pixel changed, found by a single pair
+    assert len(groups) == LIBRARY_IMAGES // 4
+    assert all(len(group["files"]) == 3 for group in groups)
+
+    assert peak <= (
+        MAX_MEMORY
+        + SCANNED_BYTES_PER_FILE * LIBRARY_IMAGES
+        + GROUPING_BYTES_PER_PAIR * len(groups)
+        + GROUPING_BYTES_PER_IMAGE * 2 * len(groups)
+    )
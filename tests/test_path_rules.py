@@ -0,0 +1,124 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from src.utils.directory_scanner import scan_files
+from src.utils.media_filter import MediaFilter
+from src.utils.path_rules import PathRules
+
+
+def make_files(root, relative_paths: list[str]):
+    for relative_path in relative_paths:
+        path = root / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"\xff\xd8\xff" + bytes(100))
+
+
+def scanned(root, rules: PathRules):
+    return sorted(
+        os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/")
+        for dirpath, name, _ in scan_files(
+            str(root), True, media_filter=MediaFilter(rules=rules)
+        )
+    )
+
+
+def test_exclude_names_at_any_depth(tmp_path):
+    make_files(
+        tmp_path,
+        [
+            "a.jpg",
+            "@eaDir/a.jpg/SYNOPHOTO_THUMB_XL.jpg",
+            "2019/@EADIR/b.jpg",
+            "2019/b.jpg",
+            "catalog.lrdata/preview.jpg",
+            "2020/old.LRDATA/preview.jpg",
+        ],
+    )
+
+    rules = PathRules(exclude=["@eaDir", "*.lrdata"], root=str(tmp_path))
+
+    assert scanned(tmp_path, rules) == ["2019/b.jpg", "a.jpg"]
+    assert not rules.accepts_directory(str(tmp_path / "2019" / "@eaDir"))
+    assert rules.accepts_directory(str(tmp_path / "2019"))
+
+
+def test_exclude_directory_with_trailing_globstar(tmp_path):
+    make_files(tmp_path, ["cache/a.jpg", "2019/cache/b.jpg", "2019/c.jpg"])
+
+    rules = PathRules(exclude=["cache/**"], root=str(tmp_path))
+
+    assert scanned(tmp_path, rules) == ["2019/c.jpg"]
+    assert not rules.accepts_directory(str(tmp_path / "2019" / "cache"))
+
+
+def test_patterns_do_not_match_above_the_root(tmp_path):
+    root = tmp_path / "cache" / "DCIM" / "photos"
+    make_files(root, ["a.jpg", "DCIM/b.jpg", "2019/cache/c.jpg", "2019/d.jpg"])
+
+    assert scanned(root, PathRules(include=["DCIM/**"], root=str(root))) == [
+        "DCIM/b.jpg"
+    ]
+    assert scanned(root, PathRules(exclude=["cache/*.jpg"], root=str(root))) == [
+        "2019/d.jpg",
+        "DCIM/b.jpg",
+        "a.jpg",
+    ]
+    assert scanned(root, PathRules(include=["/2019/**"], root=str(root))) == [
+        "2019/cache/c.jpg",
+        "2019/d.jpg",
+    ]
+
+
+@pytest.fixture
+def dated_files(tmp_path):
+    """Files of 100 bytes and 10KB, modified in 2019 and in 2021"""
+
+    paths = {}
+
+    for name, size, year in [
+        ("small-2019.jpg", 100, 2019),
+        ("large-2019.jpg", 10_000, 2019),
+        ("large-2021.jpg", 10_000, 2021),
+    ]:
+        path = tmp_path / name
+        path.write_bytes(bytes(size))
+
+        timestamp = datetime(year, 6, 1).timestamp()
+        os.utime(path, (timestamp, timestamp))
+        paths[name] = str(path)
+
+    return paths
+
+
+def accepted(rules: PathRules, paths: dict[str, str]):
+    return sorted(
+        name for name, path in paths.items() if rules.check_stat(os.stat(path)) is None
+    )
+
+
+def test_size_limits(dated_files):
+    assert accepted(PathRules(min_size=1000), dated_files) == [
+        "large-2019.jpg",
+        "large-2021.jpg",
+    ]
+    assert accepted(PathRules(max_size=1000), dated_files) == ["small-2019.jpg"]
+    assert PathRules(min_size=1000).needs_stat
+    assert not PathRules(exclude=["@eaDir"]).needs_stat
+
+
+def test_date_limits(dated_files):
+    assert accepted(PathRules(newer_than=datetime(2020, 1, 1)), dated_files) == [
+        "large-2021.jpg"
+    ]
+    assert accepted(PathRules(older_than=datetime(2020, 1, 1)), dated_files) == [
+        "large-2019.jpg",
+        "small-2019.jpg",
+    ]
+
+    # The end of the range is exclusive
+    assert accepted(PathRules(older_than=datetime(2021, 6, 1)), dated_files) == [
+        "large-2019.jpg",
+        "small-2019.jpg",
+    ]
@@ -0,0 +1,65 @@
+import contextlib
+import io
+import json
+import os
+
+import pytest
+
+from src.features.duplicates_remover import duplicates_remover
+
+
+@pytest.fixture
+def group(tmp_path):
+    """Group of three files, from the largest to the smallest"""
+
+    paths = []
+
+    for name, size in [("a.jpg", 300), ("b.jpg", 200), ("c.jpg", 100)]:
+        path = tmp_path / name
+        path.write_bytes(bytes(size))
+        paths.append(str(path))
+
+    return paths
+
+
+@pytest.fixture
+def locked(group, monkeypatch):
+    """The second file of the group can not be removed"""
+
+    remove = os.remove
+
+    def failing_remove(path):
+        if path == group[1]:
+            raise PermissionError(13, "Permission denied", path)
+        remove(path)
+
+    monkeypatch.setattr(os, "remove", failing_remove)
+
+    return group[1]
+
+
+def test_policy_reports_the_files_that_can_not_be_removed(group, locked, tmp_path):
+    report_path = str(tmp_path / "report.jsonl")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        duplicates_remover.apply_policy(
+            [(group, 90.0, 100.0)],
+            "keep-largest",
+            report_path=report_path,
+            verbose=False,
+        )
+
+    with open(report_path, encoding="utf-8") as f:
+        actions = [
+            (file["path"], file["action"]) for file in json.loads(f.read())["files"]
+        ]
+
+    assert actions == [(group[0], "keep"), (locked, "failed"), (group[2], "remove")]
+    assert [os.path.exists(path) for path in group] == [True, True, False]
+
+
+def test_remove_images_continues_after_a_failure(group, locked):
+    with contextlib.redirect_stdout(io.StringIO()):
+        duplicates_remover.remove_images(group[1:], False)
+
+    assert [os.path.exists(path) for path in group] == [True, True, False]
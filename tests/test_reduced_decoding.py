@@ -0,0 +1,49 @@
+import random
+
+import pytest
+from imagehash import average_hash
+from PIL import Image, ImageDraw
+
+from src.features.duplicates_remover.duplicates_remover import get_image_hash
+
+# Maximum distance between the hashes of the full and the reduced-scale decodes, as a fraction of the bits
+TOLERANCE = 0.02
+
+
+@pytest.fixture(scope="module")
+def photos(tmp_path_factory):
+    """JPEGs of random ellipses, large enough to be decoded at 1/8 of their size"""
+
+    directory = tmp_path_factory.mktemp("photos")
+    rng = random.Random(0)
+    paths = []
+
+    for i in range(6):
+        img = Image.new(
+            "RGB", (2400, 1600), tuple(rng.randint(0, 255) for _ in range(3))
+        )
+        draw = ImageDraw.Draw(img)
+
+        for _ in range(30):
+            x, y = rng.randint(0, 2400), rng.randint(0, 1600)
+            draw.ellipse(
+                [x, y, x + rng.randint(100, 800), y + rng.randint(100, 800)],
+                fill=tuple(rng.randint(0, 255) for _ in range(3)),
+            )
+
+        path = directory / f"{i}.jpg"
+        img.save(path, quality=90)
+        paths.append(str(path))
+
+    return paths
+
+
+@pytest.mark.parametrize("hash_size", [8, 16, 32])
+def test_reduced_decoding_hash_is_close_to_full_decoding(photos, hash_size):
+    for path in photos:
+        with Image.open(path) as img:
+            full_hash = average_hash(img, hash_size)
+
+        assert get_image_hash(path, hash_size) - full_hash <= int(
+            TOLERANCE * hash_size**2
+        )
@@ -0,0 +1,69 @@
+import json
+import os
+
+from PIL import Image
+
+from src.features.duplicates_remover import duplicates_remover
+from src.utils.media_filter import MediaFilter
+from src.utils.scan_manifest import ScanManifest
+
+
+def write_jpeg(path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new("RGB", (64, 48), (200, 30, 90)).save(path, format="JPEG")
+
+
+def test_unchanged_directories_keep_the_kind_found_by_content(tmp_path):
+    input_path = str(tmp_path / "photos")
+    photo = os.path.join(input_path, "a", "photo_noext")
+    write_jpeg(photo)
+
+    with ScanManifest(str(tmp_path / "manifest.db")) as manifest:
+        manifest.scan(input_path, True, MediaFilter(["image"], sniff=True), save=True)
+
+    write_jpeg(os.path.join(input_path, "b", "new.jpg"))
+
+    media_filter = MediaFilter(["image"], sniff=True)
+
+    with ScanManifest(str(tmp_path / "manifest.db")) as manifest:
+        changes = manifest.scan(input_path, True, media_filter)
+
+    # The directory of the photo has not changed, so it is not listed (nor sniffed) again
+    assert media_filter.counts["♻️ Unchanged directory"] == 1
+    assert changes.added == {os.path.join(input_path, "b", "new.jpg")}
+    assert media_filter.kind_of(photo) == "image"
+
+
+def test_changed_only_groups_a_new_copy_of_a_file_found_by_content(tmp_path):
+    input_path = str(tmp_path / "photos")
+    report_path = str(tmp_path / "report.jsonl")
+    write_jpeg(os.path.join(input_path, "a", "photo_noext"))
+
+    def run():
+        duplicates_remover.main(
+            input_path,
+            hash_size=8,
+            similarity=90,
+            recursive=True,
+            verbose=False,
+            plot_disabled=True,
+            cache=False,
+            report_path=report_path,
+            sniff=True,
+            changed_only=True,
+            manifest_path=str(tmp_path / "manifest.db"),
+        )
+
+    run()
+    write_jpeg(os.path.join(input_path, "b", "new.jpg"))
+    run()
+
+    with open(report_path, encoding="utf-8") as f:
+        groups = [json.loads(line) for line in f]
+
+    assert [sorted(file["path"] for file in group["files"]) for group in groups] == [
+        [
+            os.path.join(input_path, "a", "photo_noext"),
+            os.path.join(input_path, "b", "new.jpg"),
+        ]
+    ]
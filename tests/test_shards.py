@@ -0,0 +1,96 @@
+import contextlib
+import io
+import json
+import multiprocessing
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.features.duplicates_remover import duplicates_remover
+
+IMAGES = 240
+SHARDS = 2
+
+
+def run(input_path: str, report_path: str | None = None, **options):
+    with contextlib.redirect_stdout(io.StringIO()):
+        duplicates_remover.main(
+            input_path,
+            hash_size=8,
+            similarity=90,
+            recursive=True,
+            verbose=False,
+            plot_disabled=True,
+            cache=False,
+            report_path=report_path,
+            **options,
+        )
+
+
+def read_groups(report_path: str):
+    with open(report_path, encoding="utf-8") as f:
+        return sorted(
+            (
+                sorted(file["path"] for file in group["files"]),
+                group["min_similarity"],
+                group["max_similarity"],
+            )
+            for group in map(json.loads, f)
+        )
+
+
+@pytest.fixture(scope="module")
+def library(tmp_path_factory):
+    """Images of random noise in several directories, with identical copies and copies with a pixel changed"""
+
+    library = tmp_path_factory.mktemp("library")
+    rng = np.random.default_rng(0)
+
+    for i in range(IMAGES):
+        directory = library / f"{i % 5}"
+        directory.mkdir(exist_ok=True)
+
+        if i % 3 == 0:
+            original = rng.integers(0, 256, size=(16, 16 + i % 32, 3), dtype=np.uint8)
+            pixels = original
+        elif i % 6 == 1:
+            pixels = original
+        else:
+            pixels = original.copy()
+            pixels[i % 16, 0] ^= 1
+
+        Image.fromarray(pixels).save(directory / f"{i:04d}.png")
+
+    return str(library)
+
+
+def test_merged_shards_find_the_same_groups_as_a_single_run(library, tmp_path):
+    run(library, str(tmp_path / "single.jsonl"))
+
+    # Each shard runs in its own process, at the same time
+    shard_indexes = [str(tmp_path / f"{shard}.db") for shard in range(1, SHARDS + 1)]
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=run,
+            args=(library,),
+            kwargs={"shard": (shard, SHARDS), "shard_index": shard_index},
+        )
+        for shard, shard_index in enumerate(shard_indexes, 1)
+    ]
+
+    for process in processes:
+        process.start()
+
+    for process in processes:
+        process.join()
+
+    assert [process.exitcode for process in processes] == [0] * SHARDS
+
+    run(library, str(tmp_path / "merged.jsonl"), merge=shard_indexes)
+
+    single_groups = read_groups(str(tmp_path / "single.jsonl"))
+
+    assert len(single_groups) == IMAGES // 3
+    assert read_groups(str(tmp_path / "merged.jsonl")) == single_groups
@@ -0,0 +1,39 @@
+import pytest
+
+from src.features.duplicates_remover import video_duplicates
+from src.features.duplicates_remover.video_duplicates import (
+    SAMPLED_CHUNK_BYTES,
+    SAMPLED_CHUNKS,
+    find_video_duplicates,
+)
+
+SIZE = 4 * SAMPLED_CHUNKS * SAMPLED_CHUNK_BYTES
+
+
+@pytest.fixture
+def videos(tmp_path, monkeypatch):
+    """A video, an identical copy and a copy with a byte changed between the sampled chunks"""
+
+    # The metadata of every video is the same
+    monkeypatch.setattr(video_duplicates, "read_video_metadata", lambda filepaths: {})
+
+    content = bytearray(i % 251 for i in range(SIZE))
+    paths = []
+
+    for name in ["a.mp4", "b.mp4", "c.mp4"]:
+        if name == "c.mp4":
+            content[SAMPLED_CHUNK_BYTES + 1] ^= 1
+
+        path = tmp_path / name
+        path.write_bytes(content)
+        paths.append(str(path))
+
+    return paths
+
+
+def test_sampled_chunks_group_videos_that_differ_between_them(videos):
+    assert find_video_duplicates(videos) == [videos]
+
+
+def test_verify_only_groups_identical_videos(videos):
+    assert find_video_duplicates(videos, verify=True) == [videos[:2]]